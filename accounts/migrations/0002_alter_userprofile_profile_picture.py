@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-18 02:22
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='userprofile',
+            name='profile_picture',
+            field=models.ImageField(blank=True, null=True, storage=core.storage.get_blob_storage, upload_to='profile_pictures/'),
+        ),
+    ]
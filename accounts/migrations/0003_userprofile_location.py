@@ -0,0 +1,42 @@
+# Generated by Django 5.2.4 on 2026-10-18 02:30
+
+from django.db import migrations, models
+
+from core.geo import grid_cell, zip_centroid
+
+
+def geocode_profiles(apps, schema_editor):
+    UserProfile = apps.get_model('accounts', 'UserProfile')
+    profiles = UserProfile.objects.exclude(zip_code__isnull=True).exclude(zip_code='')
+    for profile in profiles.only('id', 'zip_code').iterator():
+        centroid = zip_centroid(profile.zip_code)
+        if centroid:
+            UserProfile.objects.filter(pk=profile.pk).update(
+                latitude=centroid[0], longitude=centroid[1], geo_cell=grid_cell(*centroid)
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_alter_userprofile_profile_picture'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='geo_cell',
+            field=models.IntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='latitude',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='longitude',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(geocode_profiles, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,9 @@
 from django.db import models
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, pre_save
 from django.dispatch import receiver
+from core.geo import grid_cell, zip_centroid
+from core.storage import get_blob_storage, track_blob_references
 
 class UserProfile(models.Model):
     """Extended user profile for additional information"""
@@ -11,8 +13,12 @@ class UserProfile(models.Model):
     city = models.CharField(max_length=100, blank=True, null=True)
     state = models.CharField(max_length=100, blank=True, null=True)
     zip_code = models.CharField(max_length=10, blank=True, null=True)
+    # Centroid of zip_code and its grid cell (see core.geo), kept in step on save.
+    latitude = models.FloatField(null=True, blank=True, editable=False)
+    longitude = models.FloatField(null=True, blank=True, editable=False)
+    geo_cell = models.IntegerField(null=True, blank=True, editable=False, db_index=True)
     bio = models.TextField(blank=True, null=True, help_text="Tell us about yourself and your experience with pets")
-    profile_picture = models.ImageField(upload_to='profile_pictures/', blank=True, null=True)
+    profile_picture = models.ImageField(upload_to='profile_pictures/', storage=get_blob_storage, blank=True, null=True)
     is_shelter = models.BooleanField(default=False, help_text="Check if this user represents a shelter")
     shelter_name = models.CharField(max_length=200, blank=True, null=True)
     shelter_description = models.TextField(blank=True, null=True)
@@ -26,6 +32,19 @@ class UserProfile(models.Model):
         verbose_name = "User Profile"
         verbose_name_plural = "User Profiles"
 
+track_blob_references(UserProfile, 'profile_picture')
+
+@receiver(pre_save, sender=UserProfile)
+def locate_user_profile(sender, instance, **kwargs):
+    """Geocode the profile's ZIP code from the bundled centroid table"""
+    location = (None, None, None)
+    centroid = zip_centroid(instance.zip_code)
+    if centroid:
+        location = (centroid[0], centroid[1], grid_cell(*centroid))
+    previous = (instance.latitude, instance.longitude, instance.geo_cell)
+    instance.latitude, instance.longitude, instance.geo_cell = location
+    instance._location_changed = location != previous
+
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     """Create a user profile when a new user is created"""
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import AdoptionRequest
+from .models import AdoptionRequest, ArchivedAdoptionRequest
 
 @admin.register(AdoptionRequest)
 class AdoptionRequestAdmin(admin.ModelAdmin):
@@ -45,3 +45,14 @@ class AdoptionRequestAdmin(admin.ModelAdmin):
         updated = queryset.update(status='rejected')
         self.message_user(request, f'{updated} adoption requests were successfully rejected.')
     reject_requests.short_description = "Reject selected adoption requests"
+
+
+@admin.register(ArchivedAdoptionRequest)
+class ArchivedAdoptionRequestAdmin(admin.ModelAdmin):
+    list_display = ('user', 'pet', 'status', 'created', 'archived_at')
+    list_filter = ('status', 'archived_at')
+    search_fields = ('user__username', 'user__email', 'pet__name')
+    readonly_fields = ('archived_at',)
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('user', 'pet')
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-18 02:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adoption', '0003_adoptionrequest_adoption_ad_status_b454c2_idx_and_more'),
+        ('pets', '0010_pet_shelter_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='adoptionrequest',
+            index=models.Index(fields=['pet', 'status', 'created'], name='adoption_ad_pet_id_f8aba3_idx'),
+        ),
+        # The composite index leads with the foreign key, so it replaces
+        # its single-column index; create it first so MySQL always has one.
+        migrations.AlterField(
+            model_name='adoptionrequest',
+            name='pet',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='pets.pet'),
+        ),
+    ]
@@ -1,6 +1,6 @@
 from django.contrib.auth import get_user_model
 from django.db import models
-from pets.models import Pet
+from pets.models import ArchivedPet, Pet
 
 User = get_user_model()
 
@@ -12,7 +12,8 @@ class AdoptionRequest(models.Model):
     ]
     
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    pet = models.ForeignKey(Pet, on_delete=models.CASCADE)
+    # Indexed by the (pet, status, created) composite index in Meta.
+    pet = models.ForeignKey(Pet, on_delete=models.CASCADE, db_index=False)
     reason = models.TextField()
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
     created = models.DateTimeField(auto_now_add=True)
@@ -23,6 +24,8 @@ class AdoptionRequest(models.Model):
         indexes = [
             models.Index(fields=['status', 'created']),
             models.Index(fields=['user', 'status']),
+            # Shelter dashboards reach requests through their shelter's pets.
+            models.Index(fields=['pet', 'status', 'created']),
         ]
         
     def clean(self):
@@ -34,3 +37,22 @@ class AdoptionRequest(models.Model):
         
     def __str__(self):
         return f"{self.user} -> {self.pet} ({self.status})"
+
+
+class ArchivedAdoptionRequest(models.Model):
+    """A decided request for an archived pet; same columns and id as the live row it replaced"""
+    STATUS_CHOICES = AdoptionRequest.STATUS_CHOICES
+
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_adoption_requests')
+    pet = models.ForeignKey(ArchivedPet, on_delete=models.CASCADE, related_name='adoption_requests')
+    reason = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES)
+    created = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created']
+
+    def __str__(self):
+        return f"{self.user} -> {self.pet} ({self.status}, archived)"
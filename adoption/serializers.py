@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from core.sparse import SparseFieldsMixin
 from .models import AdoptionRequest
 from pets.models import Pet
 from django.contrib.auth.models import User
@@ -15,7 +16,7 @@ class PetBasicSerializer(serializers.ModelSerializer):
         model = Pet
         fields = ['id', 'name', 'pet_type', 'breed', 'age', 'image']
 
-class AdoptionRequestSerializer(serializers.ModelSerializer):
+class AdoptionRequestSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Main adoption request serializer"""
     user = UserBasicSerializer(read_only=True)
     pet = PetBasicSerializer(read_only=True)
@@ -101,12 +102,13 @@ class AdoptionRequestUpdateSerializer(serializers.ModelSerializer):
         
         return super().update(instance, validated_data)
 
-class AdoptionRequestListSerializer(serializers.ModelSerializer):
+class AdoptionRequestListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Simplified serializer for listing adoption requests"""
     user_name = serializers.CharField(source='user.get_full_name', read_only=True)
     pet_name = serializers.CharField(source='pet.name', read_only=True)
     pet_type = serializers.CharField(source='pet.pet_type', read_only=True)
     status_display = serializers.CharField(source='get_status_display', read_only=True)
+    field_columns = {'user_name': ['user__first_name', 'user__last_name']}
     
     class Meta:
         model = AdoptionRequest
@@ -1,3 +1,139 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from pets.archive import archive_adopted_pets
+from pets.models import ArchivedPet, Pet
+from pets.statistics import build_statistics, reconcile_counters
+
+from .models import AdoptionRequest, ArchivedAdoptionRequest
+
+
+class ShelterIndexPlanTests(TestCase):
+    def test_shelter_dashboard_joins_through_pet_index(self):
+        shelter = User.objects.create_user('shelter', password='password')
+        plan = AdoptionRequest.objects.filter(pet__owner=shelter).explain()
+        index = next(i.name for i in AdoptionRequest._meta.indexes if i.fields == ['pet', 'status', 'created'])
+        self.assertIn(index, plan, plan)
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.shelter = User.objects.create_user('shelter', password='password')
+        self.shelter.profile.is_shelter = True
+        self.shelter.profile.save()
+        self.adopter = User.objects.create_user('adopter', password='password')
+        self.rival = User.objects.create_user('rival', password='password')
+
+        self.old = self._adopted_pet('Old', days_ago=200)
+        self.recent = self._adopted_pet('Recent', days_ago=5)
+        self.undecided = self._adopted_pet('Undecided', days_ago=200, pending=True)
+        self.available = Pet.objects.create(
+            name='Available', pet_type='dog', age=1, gender='male', owner=self.shelter
+        )
+
+    def _adopted_pet(self, name, days_ago, pending=False):
+        pet = Pet.objects.create(name=name, pet_type='cat', age=3, gender='female', owner=self.shelter)
+        AdoptionRequest.objects.create(user=self.adopter, pet=pet, reason='A loving home', status='approved')
+        AdoptionRequest.objects.create(
+            user=self.rival, pet=pet, reason='Another home', status='pending' if pending else 'rejected'
+        )
+        pet.status = 'adopted'
+        pet.save()
+        Pet.objects.filter(pk=pet.pk).update(updated_at=timezone.now() - timedelta(days=days_ago))
+        return pet
+
+    def test_moves_long_adopted_pets_and_their_requests(self):
+        self.assertEqual(archive_adopted_pets(older_than_days=90, batch_size=1), 1)
+
+        self.assertFalse(Pet.objects.filter(pk=self.old.pk).exists())
+        self.assertFalse(AdoptionRequest.objects.filter(pet_id=self.old.pk).exists())
+        archived = ArchivedPet.objects.get(pk=self.old.pk)
+        self.assertEqual((archived.name, archived.owner, archived.status), ('Old', self.shelter, 'adopted'))
+        self.assertEqual(
+            sorted(ArchivedAdoptionRequest.objects.filter(pet=archived).values_list('status', flat=True)),
+            ['approved', 'rejected'],
+        )
+        self.assertEqual(
+            set(Pet.objects.values_list('name', flat=True)), {'Recent', 'Undecided', 'Available'}
+        )
+
+    def test_statistics_still_count_archived_pets(self):
+        before = build_statistics()
+        archive_adopted_pets(older_than_days=90)
+        self.assertEqual(build_statistics()['adopted_pets'], before['adopted_pets'])
+        self.assertEqual(reconcile_counters(), 0)
+
+    def test_history_endpoints_include_archived_requests(self):
+        archive_adopted_pets(older_than_days=90)
+
+        self.client.force_login(self.adopter)
+        history = self.client.get('/api/adoptions/history/').json()
+        self.assertEqual(history['total_requests'], 3)
+        self.assertEqual({entry['pet_name'] for entry in history['adoption_history']}, {'Old', 'Recent', 'Undecided'})
+        self.assertEqual(
+            [entry['created'] for entry in history['adoption_history']],
+            sorted((entry['created'] for entry in history['adoption_history']), reverse=True),
+        )
+
+        self.client.force_login(self.shelter)
+        for url in ('/api/adoptions/shelter/', '/api/pets/shelter/adoptions/'):
+            requests = self.client.get(url).json()
+            self.assertEqual(len(requests), 6, url)
+        export = self.client.get('/api/pets/shelter/adoptions/export/')
+        self.assertEqual(len(b''.join(export.streaming_content).splitlines()), 6)
+
+    def test_own_requests_include_archived_ones(self):
+        archived_id = AdoptionRequest.objects.get(pet=self.old, user=self.adopter).pk
+        archive_adopted_pets(older_than_days=90)
+
+        self.client.force_login(self.adopter)
+        page = self.client.get('/api/adoptions/', {'ordering': 'created'}).json()
+        self.assertEqual((page['count'], page['count_mode']), (3, 'cached'))
+        self.assertEqual([entry['pet']['name'] for entry in page['results']], ['Old', 'Recent', 'Undecided'])
+        for count_mode in ['exact', 'none', 'estimated']:
+            page = self.client.get('/api/adoptions/', {'count_mode': count_mode}).json()
+            self.assertEqual([entry['pet']['name'] for entry in page['results']], ['Undecided', 'Recent', 'Old'])
+        approved = self.client.get('/api/adoptions/', {'status': 'approved', 'fields': 'pet'}).json()
+        self.assertEqual(approved['results'][-1], {'pet': {
+            'id': self.old.pk, 'name': 'Old', 'pet_type': 'cat', 'breed': '', 'age': 3, 'image': None,
+        }})
+
+        detail = self.client.get(f'/api/adoptions/{archived_id}/')
+        self.assertEqual((detail.status_code, detail.json()['status']), (200, 'approved'))
+        self.client.force_login(self.rival)
+        self.assertEqual(self.client.get(f'/api/adoptions/{archived_id}/').status_code, 404)
+
+
+class SparseFieldsetTests(TestCase):
+    def setUp(self):
+        self.adopter = User.objects.create_user('adopter', password='password', first_name='Ann', last_name='Lee')
+        pet = Pet.objects.create(name='Rex', pet_type='dog', age=2, gender='male')
+        self.adoption = AdoptionRequest.objects.create(user=self.adopter, pet=pet, reason='A loving home')
+        self.client.force_login(self.adopter)
+
+    def get(self, url, fields):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'fields': fields})
+        self.assertEqual(response.status_code, 200, response.content)
+        sql = ' '.join(query['sql'] for query in queries if 'adoption_adoptionrequest' in query['sql'])
+        return response.json()['results'], sql
+
+    def test_adoption_lists_select_only_requested_fields(self):
+        results, sql = self.get('/api/adoptions/', 'id,pet,status_display')
+        self.assertEqual(results, [{
+            'id': self.adoption.pk,
+            'pet': {'id': self.adoption.pet_id, 'name': 'Rex', 'pet_type': 'dog', 'breed': '', 'age': 2, 'image': None},
+            'status_display': 'Pending',
+        }])
+        self.assertNotIn('"reason"', sql)
+        self.assertNotIn('"email"', sql)
 
-# Create your tests here.
+        results, sql = self.get('/api/adoptions/admin/', 'user_name,pet_name')
+        self.assertEqual(results, [{'user_name': 'Ann Lee', 'pet_name': 'Rex'}])
+        self.assertNotIn('"reason"', sql)
+        self.assertNotIn('"pet_type"', sql)
@@ -3,18 +3,22 @@ from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db import transaction
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
-from .models import AdoptionRequest
+from .models import AdoptionRequest, ArchivedAdoptionRequest
+from core.sparse import SparseFieldsViewMixin
 from pets.models import Pet
+from pets.archive import load_union_page, union_with_archived, with_archived
+from pets.cache import invalidate_pet
 from .serializers import (
     AdoptionRequestSerializer, AdoptionRequestUpdateSerializer,
     AdoptionRequestListSerializer, AdoptionStatisticsSerializer
 )
 
 @method_decorator(csrf_exempt, name='dispatch')
-class AdoptionRequestListView(generics.ListCreateAPIView):
+class AdoptionRequestListView(SparseFieldsViewMixin, generics.ListCreateAPIView):
     """List and create adoption requests"""
     serializer_class = AdoptionRequestSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -22,10 +26,23 @@ class AdoptionRequestListView(generics.ListCreateAPIView):
     filterset_fields = ['status']
     ordering_fields = ['created']
     ordering = ['-created']
+    # See core.pagination; clients may ask for another mode with ?count_mode=.
+    count_mode = 'cached'
 
     def get_queryset(self):
         """Return user's own adoption requests"""
-        return AdoptionRequest.objects.filter(user=self.request.user)
+        return AdoptionRequest.objects.filter(user=self.request.user).select_related('user', 'pet')
+
+    def filter_queryset(self, queryset):
+        # Requests for archived pets stay listed, filtered and ordered the same
+        # way. Pages are cut from the union of both tables' ids, then loaded.
+        archived = ArchivedAdoptionRequest.objects.filter(user=self.request.user).select_related('user', 'pet')
+        self.live_requests = super().filter_queryset(queryset)
+        self.archived_requests = super().filter_queryset(archived)
+        return union_with_archived(self.live_requests, self.archived_requests, self.live_requests.query.order_by)
+
+    def paginate_queryset(self, queryset):
+        return load_union_page(super().paginate_queryset(queryset), self.live_requests, self.archived_requests)
     
     def perform_create(self, serializer):
         # The serializer already handles pet_id validation and conversion
@@ -41,15 +58,24 @@ class AdoptionRequestDetailView(generics.RetrieveAPIView):
         """Return user's own adoption requests"""
         return AdoptionRequest.objects.filter(user=self.request.user)
 
-class AdminAdoptionRequestListView(generics.ListAPIView):
+    def get_object(self):
+        # Archived requests keep their ids, so old links still resolve.
+        try:
+            return super().get_object()
+        except Http404:
+            return get_object_or_404(ArchivedAdoptionRequest, pk=self.kwargs['pk'], user=self.request.user)
+
+class AdminAdoptionRequestListView(SparseFieldsViewMixin, generics.ListAPIView):
     """Admin view: List all adoption requests"""
-    queryset = AdoptionRequest.objects.all()
+    queryset = AdoptionRequest.objects.select_related('user', 'pet')
     serializer_class = AdoptionRequestListSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['status']
     ordering_fields = ['created']
     ordering = ['-created']
+    # The whole table: an exact COUNT(*) per page would cost more than the page.
+    count_mode = 'estimated'
 
 class AdminAdoptionRequestDetailView(generics.RetrieveUpdateAPIView):
     """Admin view: Get and update adoption request"""
@@ -85,6 +111,8 @@ class AdminAdoptionRequestDetailView(generics.RetrieveUpdateAPIView):
                     pet=pet,
                     status='pending'
                 ).exclude(id=adoption.id).update(status='rejected')
+        
+        invalidate_pet(adoption.pet_id)
     
     def update(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -101,10 +129,16 @@ class AdminAdoptionRequestDetailView(generics.RetrieveUpdateAPIView):
 @permission_classes([permissions.IsAuthenticated])
 def adoption_statistics(request):
     """Get adoption statistics for admin dashboard"""
-    total_requests = AdoptionRequest.objects.count()
+    # Archived requests are all decided, so they never count as pending.
+    archived = ArchivedAdoptionRequest.objects
+    total_requests = AdoptionRequest.objects.count() + archived.count()
     pending_requests = AdoptionRequest.objects.filter(status='pending').count()
-    approved_requests = AdoptionRequest.objects.filter(status='approved').count()
-    rejected_requests = AdoptionRequest.objects.filter(status='rejected').count()
+    approved_requests = (
+        AdoptionRequest.objects.filter(status='approved').count() + archived.filter(status='approved').count()
+    )
+    rejected_requests = (
+        AdoptionRequest.objects.filter(status='rejected').count() + archived.filter(status='rejected').count()
+    )
     
     # Recent requests (last 10)
     recent_requests = AdoptionRequest.objects.select_related('user', 'pet').order_by('-created')[:10]
@@ -150,15 +184,17 @@ def bulk_update_adoptions(request):
     updated_count = 0
     for adoption_id in adoption_ids:
         try:
-            adoption = AdoptionRequest.objects.get(id=adoption_id)
-            adoption.status = new_status
-            adoption.save()
-            
-            # Update pet status if approved
-            if new_status == 'approved':
-                adoption.pet.status = 'adopted'
-                adoption.pet.save()
+            with transaction.atomic():
+                adoption = AdoptionRequest.objects.get(id=adoption_id)
+                adoption.status = new_status
+                adoption.save()
+                
+                # Update pet status if approved
+                if new_status == 'approved':
+                    adoption.pet.status = 'adopted'
+                    adoption.pet.save()
             
+            invalidate_pet(adoption.pet_id)
             updated_count += 1
         except AdoptionRequest.DoesNotExist:
             continue
@@ -171,8 +207,11 @@ def bulk_update_adoptions(request):
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def user_adoption_history(request):
-    """Get user's adoption history"""
-    user_requests = AdoptionRequest.objects.filter(user=request.user).select_related('pet').order_by('-created')
+    """Get user's adoption history, including requests for archived pets"""
+    user_requests = with_archived(
+        AdoptionRequest.objects.filter(user=request.user).select_related('pet'),
+        ArchivedAdoptionRequest.objects.filter(user=request.user).select_related('pet'),
+    )
     
     history = []
     for adoption in user_requests:
@@ -201,7 +240,10 @@ def shelter_adoption_requests(request):
         }, status=status.HTTP_403_FORBIDDEN)
     
     # Get adoption requests for pets owned by this shelter
-    adoption_requests = AdoptionRequest.objects.filter(pet__owner=request.user).select_related('user', 'pet')
+    adoption_requests = with_archived(
+        AdoptionRequest.objects.filter(pet__owner=request.user).select_related('user', 'pet'),
+        ArchivedAdoptionRequest.objects.filter(pet__owner=request.user).select_related('user', 'pet'),
+    )
     serializer = AdoptionRequestListSerializer(adoption_requests, many=True)
     return Response(serializer.data)
 
@@ -238,6 +280,8 @@ def approve_adoption_request(request, request_id):
             status='pending'
         ).exclude(id=adoption_request.id).update(status='rejected')
     
+    invalidate_pet(adoption_request.pet_id)
+    
     return Response({
         'message': 'Adoption request approved successfully',
         'adoption_request': AdoptionRequestSerializer(adoption_request).data
@@ -264,6 +308,7 @@ def reject_adoption_request(request, request_id):
     
     adoption_request.status = 'rejected'
     adoption_request.save()
+    invalidate_pet(adoption_request.pet_id)
     
     return Response({
         'message': 'Adoption request rejected successfully',
@@ -314,6 +359,8 @@ class AdoptionRequestUpdateView(generics.UpdateAPIView):
                 if not other_pending:
                     adoption.pet.status = 'available'
                     adoption.pet.save()
+        
+        invalidate_pet(adoption.pet_id)
     
     def update(self, request, *args, **kwargs):
         instance = self.get_object()
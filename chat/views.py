@@ -81,6 +81,8 @@ class ChatUserListView(generics.ListAPIView):
     """List all users for chat"""
     serializer_class = ChatUserSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # See core.pagination; the user list changes rarely.
+    count_mode = 'cached'
 
     def get_queryset(self):
         """Get all users except current user"""
@@ -0,0 +1,116 @@
+"""
+Offline ZIP-code geocoding and a fixed grid index for radius queries.
+
+Each ZIP code is resolved to its centroid from ``core/data/zip_centroids.csv.gz``
+and assigned an integer grid cell (``GRID_DEGREES`` square cells numbered
+row-major). Within one row of the grid, cells that are side by side have
+consecutive numbers. That lets a radius search become a handful of
+``cell BETWEEN lo AND hi`` index range scans, one per grid row. Only the rows
+found that way have their distance computed, using plain arithmetic (an
+equirectangular projection) rather than trigonometry on every row.
+Searches do not wrap around the antimeridian.
+"""
+import csv
+import gzip
+import math
+import os
+from functools import lru_cache
+
+from django.db.models import F, Q, Value
+
+ZIP_CENTROIDS_PATH = os.path.join(os.path.dirname(__file__), 'data', 'zip_centroids.csv.gz')
+GRID_DEGREES = 0.5
+GRID_COLUMNS = 1000
+KM_PER_DEGREE = 111.195
+MAX_RADIUS_KM = 500
+
+
+@lru_cache(maxsize=1)
+def _zip_table():
+    with gzip.open(ZIP_CENTROIDS_PATH, 'rt', encoding='ascii', newline='') as handle:
+        return {
+            row['zip_code']: (float(row['latitude']), float(row['longitude']))
+            for row in csv.DictReader(handle)
+        }
+
+
+def normalize_zip(zip_code):
+    """'02139-4307' -> '02139'; None for anything that is not a US ZIP"""
+    digits = (zip_code or '').strip().split('-')[0]
+    if len(digits) == 5 and digits.isdigit():
+        return digits
+    return None
+
+
+def zip_centroid(zip_code):
+    """(latitude, longitude) of a ZIP code's centroid, or None if unknown"""
+    zip_code = normalize_zip(zip_code)
+    return _zip_table().get(zip_code) if zip_code else None
+
+
+def _row(latitude):
+    return min(int((latitude + 90) // GRID_DEGREES), int(180 // GRID_DEGREES))
+
+
+def _column(longitude):
+    return min(int((longitude + 180) // GRID_DEGREES), int(360 // GRID_DEGREES))
+
+
+def grid_cell(latitude, longitude):
+    return _row(latitude) * GRID_COLUMNS + _column(longitude)
+
+
+def cell_ranges(latitude, longitude, radius_km):
+    """Inclusive (low, high) cell ranges, one per grid row, covering the circle"""
+    lat_span = radius_km / KM_PER_DEGREE
+    south = max(latitude - lat_span, -90.0)
+    north = min(latitude + lat_span, 90.0)
+    # Longitude degrees are shortest at the edge furthest from the equator.
+    widest = math.cos(math.radians(min(max(abs(south), abs(north)), 89.9)))
+    lon_span = min(lat_span / widest, 180.0)
+    west = _column(max(longitude - lon_span, -180.0))
+    east = _column(min(longitude + lon_span, 180.0))
+    return [
+        (row * GRID_COLUMNS + west, row * GRID_COLUMNS + east)
+        for row in range(_row(south), _row(north) + 1)
+    ]
+
+
+def squared_distance_expression(prefix, latitude, longitude):
+    """
+    SQL expression for the squared distance in degrees of latitude between
+    the point stored under ``prefix`` and the origin. It orders rows by
+    distance; distance_km() turns it into kilometres.
+    """
+    scale = math.cos(math.radians(latitude))
+    d_lat = F(f'{prefix}latitude') - Value(latitude)
+    d_lon = (F(f'{prefix}longitude') - Value(longitude)) * Value(scale)
+    return d_lat * d_lat + d_lon * d_lon
+
+
+def distance_km(squared_distance):
+    return math.sqrt(max(squared_distance, 0.0)) * KM_PER_DEGREE
+
+
+def approximate_distance_km(origin_latitude, origin_longitude, latitude, longitude):
+    """Python counterpart of squared_distance_expression(), in kilometres"""
+    d_lat = latitude - origin_latitude
+    d_lon = (longitude - origin_longitude) * math.cos(math.radians(origin_latitude))
+    return distance_km(d_lat * d_lat + d_lon * d_lon)
+
+
+def within_radius(queryset, prefix, latitude, longitude, radius_km, annotation='distance'):
+    """
+    Narrow ``queryset`` to rows whose ``<prefix>geo_cell`` / latitude /
+    longitude lie within ``radius_km`` of the origin, annotated with the
+    squared distance under ``annotation``
+    """
+    cells = Q()
+    for low, high in cell_ranges(latitude, longitude, radius_km):
+        cells |= Q(**{f'{prefix}geo_cell__range': (low, high)})
+    limit = (radius_km / KM_PER_DEGREE) ** 2
+    return (
+        queryset.filter(cells)
+        .annotate(**{annotation: squared_distance_expression(prefix, latitude, longitude)})
+        .filter(**{f'{annotation}__lte': limit})
+    )
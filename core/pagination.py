@@ -0,0 +1,176 @@
+"""
+Page-number pagination with a choice of how the total is counted.
+
+``PageNumberPagination`` runs an exact ``COUNT(*)`` for every page, which
+on a large table costs more than fetching the page. ``CountModePagination``
+keeps the same ``?page=`` interface but lets each view pick a count mode
+(``count_mode`` attribute), which clients may override per request with
+``?count_mode=``:
+
+- ``exact``: the stock behaviour, one ``COUNT(*)`` per page;
+- ``none``: no count at all (``count`` is null);
+- ``cached``: the exact count, cached per query for
+  ``PAGINATION_COUNT_CACHE_TIMEOUT`` seconds;
+- ``estimated``: the query planner's row estimate from ``EXPLAIN`` on
+  MySQL (and PostgreSQL); other backends fall back to ``cached``.
+
+In every mode but ``exact`` the page is fetched with one extra row to
+decide whether there is a next page, so navigation never depends on the
+count, which is informational only and flagged by ``count_mode`` in the
+response.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+COUNT_MODES = ('exact', 'none', 'cached', 'estimated')
+COUNT_CACHE_KEY = 'pagination:count:{digest}'
+
+
+def count_cache_key(queryset):
+    sql, params = queryset.order_by().query.get_compiler(queryset.db).as_sql()
+    digest = hashlib.md5(f'{queryset.db}:{sql}:{params!r}'.encode('utf-8')).hexdigest()
+    return COUNT_CACHE_KEY.format(digest=digest)
+
+
+def cached_count(queryset, timeout=None):
+    """Exact count of ``queryset``, reused for ``timeout`` seconds by identical queries"""
+    if timeout is None:
+        timeout = getattr(settings, 'PAGINATION_COUNT_CACHE_TIMEOUT', 60)
+    key = count_cache_key(queryset)
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, timeout)
+    return count
+
+
+def estimated_count(queryset):
+    """The planner's estimate of the number of rows of ``queryset``, or None if the backend has none"""
+    connection = connections[queryset.db]
+    sql, params = queryset.order_by().query.get_compiler(queryset.db).as_sql()
+    if connection.vendor == 'mysql':
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN ' + sql, params)
+            columns = [column[0] for column in cursor.description]
+            plan = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        # Rows produced by the outermost SELECT: the product over its joined
+        # tables of the rows examined times the share kept by the WHERE clause.
+        estimate = 1.0
+        for step in plan:
+            if step['id'] == plan[0]['id']:
+                estimate *= (step['rows'] or 1) * float(step.get('filtered') or 100) / 100
+        return int(estimate)
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+    return None
+
+
+class CountModePagination(PageNumberPagination):
+    """PageNumberPagination whose total count can be exact, cached, estimated or skipped"""
+
+    count_mode_query_param = 'count_mode'
+    default_count_mode = 'exact'
+
+    def get_count_mode(self, request, view):
+        requested = request.query_params.get(self.count_mode_query_param)
+        if requested in COUNT_MODES:
+            return requested
+        return getattr(view, 'count_mode', self.default_count_mode)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count_mode = self.get_count_mode(request, view)
+        if self.count_mode == 'exact':
+            return super().paginate_queryset(queryset, request, view)
+
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        self.request = request
+        self.page_size = page_size
+        raw_page = request.query_params.get(self.page_query_param, 1)
+        try:
+            self.page_number = int(raw_page)
+        except ValueError:
+            self.page_number = 0
+        if self.page_number < 1:
+            self.invalid_page(raw_page, 'That page number is not a positive integer')
+
+        offset = (self.page_number - 1) * page_size
+        rows = list(queryset[offset:offset + page_size + 1])
+        if not rows and self.page_number > 1:
+            self.invalid_page(raw_page, 'That page contains no results')
+        self.has_next = len(rows) > page_size
+
+        self.count = None
+        if self.count_mode == 'estimated':
+            self.count = estimated_count(queryset)
+            if self.count is None:
+                self.count_mode = 'cached'
+        if self.count_mode == 'cached':
+            self.count = cached_count(queryset)
+        if self.count is not None:
+            # The count is never less than the rows actually seen.
+            self.count = max(self.count, offset + min(len(rows), page_size) + self.has_next)
+        return rows[:page_size]
+
+    def invalid_page(self, page_number, message):
+        raise NotFound(self.invalid_page_message.format(page_number=page_number, message=message))
+
+    def get_next_link(self):
+        if self.count_mode == 'exact':
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.page_query_param, self.page_number + 1)
+
+    def get_previous_link(self):
+        if self.count_mode == 'exact':
+            return super().get_previous_link()
+        if self.page_number <= 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, self.page_number - 1)
+
+    def get_paginated_response(self, data):
+        if self.count_mode == 'exact':
+            return super().get_paginated_response(data)
+        return Response({
+            'count': self.count,
+            'count_mode': self.count_mode,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count']['nullable'] = True
+        response_schema['properties']['count_mode'] = {
+            'type': 'string', 'enum': list(COUNT_MODES), 'description': 'Absent when the count is exact',
+        }
+        return response_schema
+
+    def get_html_context(self):
+        if self.count_mode == 'exact':
+            return super().get_html_context()
+        return {
+            'previous_url': self.get_previous_link(),
+            'next_url': self.get_next_link(),
+            'page_links': [],
+        }
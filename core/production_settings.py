@@ -34,6 +34,26 @@ DATABASES = {
     }
 }
 
+# Read replicas: DB_REPLICA_HOSTS=host[:port],... with the primary's credentials
+# unless DB_REPLICA_USER / DB_REPLICA_PASSWORD are set
+DATABASE_REPLICAS = []
+for index, address in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(','))):
+    host, _, port = address.strip().partition(':')
+    alias = f'replica_{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'USER': os.environ.get('DB_REPLICA_USER', DATABASES['default']['USER']),
+        'PASSWORD': os.environ.get('DB_REPLICA_PASSWORD', DATABASES['default']['PASSWORD']),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+DATABASE_REPLICA_STICKY_SECONDS = int(os.environ.get('DB_REPLICA_STICKY_SECONDS', 5))
+
+# Full-text search on the InnoDB FULLTEXT index
+PET_SEARCH_BACKEND = 'pets.search.MySQLFullTextSearchBackend'
+
 # Static files
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
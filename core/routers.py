@@ -0,0 +1,95 @@
+"""
+Read replicas with read-your-writes stickiness.
+
+``ReplicaRouter`` sends every write to the primary (``default``). Reads go
+to a random alias in ``settings.DATABASE_REPLICAS``, but only while
+``ReplicaStickinessMiddleware`` allows it for the current request:
+
+- safe (GET/HEAD/OPTIONS) requests read from a replica;
+- unsafe requests read from the primary throughout, so a view sees the rows
+  it has just written;
+- a request that wrote sets a short-lived cookie. The client's requests then
+  stay on the primary for ``DATABASE_REPLICA_STICKY_SECONDS``, long enough
+  for the replicas to catch up with what it just changed.
+
+Sessions live on the primary only. Saving one is bookkeeping rather than a
+change the client will read back, so it does not pin the client; reading it
+from the primary means a session written moments ago is never missed.
+
+Everything outside a request reads from the primary: management commands,
+background threads and ``transaction.on_commit`` work after the response.
+Code that must not see replication lag can also use ``use_primary()``.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+PRIMARY = 'default'
+STICKY_COOKIE = 'db_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# Apps whose tables are read from and written to the primary without pinning the client.
+PRIMARY_ONLY_APPS = {'sessions'}
+
+_replica_reads = ContextVar('replica_reads', default=False)
+_wrote = ContextVar('wrote', default=False)
+
+
+def get_replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+@contextmanager
+def use_primary():
+    """Read from the primary inside the block, whatever the request allows"""
+    token = _replica_reads.set(False)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+class ReplicaRouter:
+    """Writes to the primary; reads to a replica when the current request allows it"""
+
+    def db_for_read(self, model, **hints):
+        replicas = get_replicas()
+        if replicas and _replica_reads.get() and model._meta.app_label not in PRIMARY_ONLY_APPS:
+            return random.choice(replicas)
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label not in PRIMARY_ONLY_APPS:
+            _wrote.set(True)
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every alias holds the same data.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive schema changes through replication.
+        return db not in get_replicas()
+
+
+class ReplicaStickinessMiddleware:
+    """Decide per request whether reads may go to a replica, and pin writers to the primary"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sticky_seconds = getattr(settings, 'DATABASE_REPLICA_STICKY_SECONDS', 5)
+
+    def __call__(self, request):
+        sticky = request.method not in SAFE_METHODS or STICKY_COOKIE in request.COOKIES
+        replica_reads = _replica_reads.set(not sticky)
+        wrote = _wrote.set(False)
+        try:
+            response = self.get_response(request)
+            did_write = _wrote.get()
+        finally:
+            _replica_reads.reset(replica_reads)
+            _wrote.reset(wrote)
+        if did_write:
+            response.set_cookie(STICKY_COOKIE, '1', max_age=self.sticky_seconds, httponly=True, samesite='Lax')
+        return response
@@ -58,6 +58,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.routers.ReplicaStickinessMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -98,6 +99,13 @@ DATABASES = {
     }
 }
 
+# Read replicas: aliases in DATABASES that safe requests may read from (see core/routers.py)
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+DATABASE_REPLICAS = []
+
+# Seconds a client that just wrote keeps reading from the primary
+DATABASE_REPLICA_STICKY_SECONDS = 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -138,6 +146,44 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Cache (per-process memory in development; production uses Redis when REDIS_URL is set)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'pet-adoption',
+    }
+}
+
+# Seconds a cached pet response may be served before it is rebuilt
+PET_CACHE_TIMEOUT = 300
+
+# Deferred work on pets (see pets/deferred.py) is queued in the database and
+# processed by `python manage.py process_pet_work --loop`. When inline, each
+# request also processes its own work after commit, so development needs no worker.
+PET_DEFERRED_WORK_INLINE = os.getenv("PET_DEFERRED_WORK_INLINE", str(DEBUG)) == "True"
+PET_DEFERRED_WORK_MAX_ATTEMPTS = 5
+
+# Widths of the pet photo variants cut by the deferred-work worker
+PET_IMAGE_VARIANT_WIDTHS = (320, 640, 1280)
+
+# "Similar pets": suggestions kept per pet
+PET_SIMILAR_TOP_K = 10
+
+# Serialize pet listings from .values() rows instead of model instances
+PET_LIST_FAST_SERIALIZER = True
+
+# Serve public pet listings from the PetCatalogEntry read model (see pets/catalog.py)
+PET_CATALOG_READ_MODEL = True
+
+# Days a pet stays adopted in the live table before archive_adopted_pets moves it out
+PET_ARCHIVE_AFTER_DAYS = 90
+
+# Days the pet change feed (/api/pets/changes/) keeps entries; see prune_pet_changes
+PET_CHANGE_FEED_RETENTION_DAYS = 30
+
+# Full-text search engine for pet listings (SQLite FTS5 in development)
+PET_SEARCH_BACKEND = 'pets.search.SQLiteFTS5SearchBackend'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -157,10 +203,13 @@ REST_FRAMEWORK = {
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.CountModePagination',
     'PAGE_SIZE': 12,
 }
 
+# Seconds a "cached" pagination count is reused (see core/pagination.py)
+PAGINATION_COUNT_CACHE_TIMEOUT = 60
+
 # JWT Settings
 from datetime import timedelta
 SIMPLE_JWT = {
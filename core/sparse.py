@@ -0,0 +1,170 @@
+"""
+Sparse fieldsets: ``?fields=id,name,image_url``.
+
+``requested_fields()`` reads the parameter and checks it against the
+fields a serializer can output. A serializer with ``SparseFieldsMixin``
+then drops every other field from its output, and ``sparse_queryset()``
+narrows the query with ``.only()`` to the columns those fields read, so
+large columns such as ``Pet.description`` are never loaded.
+
+The columns behind a field follow from its ``source``: model fields,
+``get_<field>_display``, paths through foreign keys and nested model
+serializers are resolved automatically. Anything else (method fields,
+model methods) must be listed in the serializer's ``field_columns``;
+without that entry the query is left unpruned.
+"""
+import re
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import permissions, serializers
+from rest_framework.exceptions import ValidationError
+
+FIELDS_QUERY_PARAM = 'fields'
+DISPLAY_METHOD = re.compile(r'get_(\w+)_display')
+
+
+def requested_fields(request, available):
+    """
+    The fields named by ``?fields=``, in the order of ``available``, or
+    None when the parameter is absent; unknown names are a 400
+    """
+    raw = request.query_params.get(FIELDS_QUERY_PARAM)
+    if raw is None:
+        return None
+    names = {name.strip() for name in raw.split(',') if name.strip()}
+    unknown = sorted(names - set(available))
+    if unknown or not names:
+        problem = f"Unknown fields: {', '.join(unknown)}." if unknown else 'No fields given.'
+        raise ValidationError({FIELDS_QUERY_PARAM: [f"{problem} Available fields: {', '.join(available)}."]})
+    return [name for name in available if name in names]
+
+
+def readable_fields(serializer_class):
+    return [name for name, field in serializer_class().fields.items() if not field.write_only]
+
+
+def _source_columns(model, source):
+    """ORM paths read through the dotted ``source`` on ``model``, or None if it is not a plain column"""
+    *relations, attribute = source.split('.')
+    for name in relations:
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return None
+        if not (field.many_to_one or field.one_to_one) or not field.concrete:
+            return None
+        model = field.related_model
+    display = DISPLAY_METHOD.fullmatch(attribute)
+    if display:
+        attribute = display.group(1)
+    if attribute == 'pk':
+        attribute = model._meta.pk.name
+    try:
+        field = model._meta.get_field(attribute)
+    except FieldDoesNotExist:
+        return None
+    if not field.concrete or field.many_to_many:
+        return None
+    return ['__'.join([*relations, attribute])]
+
+
+def serializer_columns(serializer, names=None):
+    """
+    ORM paths that the fields ``names`` (default: every readable field) of
+    a model serializer read, or None if some field's columns are unknown
+    """
+    model = serializer.Meta.model
+    field_columns = getattr(serializer, 'field_columns', {})
+    if names is None:
+        names = [name for name, field in serializer.fields.items() if not field.write_only]
+
+    columns = []
+    for name in names:
+        if name in field_columns:
+            columns.extend(field_columns[name])
+            continue
+        field = serializer.fields[name]
+        if isinstance(field, serializers.ModelSerializer):
+            nested = serializer_columns(field)
+            prefix = _source_columns(model, field.source)
+            if nested is None or prefix is None:
+                return None
+            columns.extend(f'{prefix[0]}__{column}' for column in nested)
+            continue
+        found = _source_columns(model, field.source) if field.source != '*' else None
+        if found is None:
+            return None
+        columns.extend(found)
+    return columns
+
+
+def ordering_columns(queryset):
+    """Concrete columns the queryset is ordered on, which cursor pagination reads back"""
+    columns = []
+    for name in queryset.query.order_by or queryset.model._meta.ordering:
+        if isinstance(name, str):
+            found = _source_columns(queryset.model, name.lstrip('-'))
+            if found and '__' not in found[0]:
+                columns.extend(found)
+    return columns
+
+
+def sparse_queryset(queryset, serializer_class, fields):
+    """
+    Restrict ``queryset`` to the columns ``serializer_class`` reads for
+    ``fields`` (all fields when None) and join exactly the relations they use
+    """
+    if fields is None:
+        return queryset
+    columns = serializer_columns(serializer_class(), fields)
+    if columns is None:
+        return queryset
+    relations = set()
+    for column in columns:
+        parts = column.split('__')[:-1]
+        relations.update('__'.join(parts[:i + 1]) for i in range(len(parts)))
+    queryset = queryset.select_related(None)
+    if relations:
+        queryset = queryset.select_related(*relations)
+    return queryset.only('pk', *relations, *ordering_columns(queryset), *columns)
+
+
+class SparseFieldsMixin:
+    """
+    Serializer mixin that outputs only the fields listed in
+    ``context['fields']`` (every field when it is absent or None)
+    """
+
+    # Output field name -> ORM paths it reads, for fields whose source is not a column.
+    field_columns = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = self.context.get('fields')
+        if fields is not None:
+            for name, field in list(self.fields.items()):
+                if name not in fields and not field.write_only:
+                    self.fields.pop(name)
+
+
+class SparseFieldsViewMixin:
+    """
+    Generic view mixin applying ``?fields=`` to reads: the serializer gets
+    the fields in its context and ``filter_queryset()`` prunes the columns
+    """
+
+    def get_sparse_fields(self):
+        if self.request.method not in permissions.SAFE_METHODS:
+            return None
+        if not hasattr(self, '_sparse_fields'):
+            self._sparse_fields = requested_fields(self.request, readable_fields(self.get_serializer_class()))
+        return self._sparse_fields
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fields'] = self.get_sparse_fields()
+        return context
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        return sparse_queryset(queryset, self.get_serializer_class(), self.get_sparse_fields())
@@ -0,0 +1,274 @@
+"""
+Content-addressed, deduplicated media storage.
+
+Uploads are streamed to a temporary file while being hashed and then moved
+to ``blobs/<aa>/<bb>/<sha256><ext>``, so the same photo uploaded twice is
+stored once. Files derived from a blob (image variants) are stored next to
+it under a name built from its hash. Each blob has a ``pets.StoredBlob``
+row whose ``ref_count`` tracks how many model fields point at it; blobs
+that drop to zero are removed in batches by ``manage.py gc_media_blobs``
+instead of on delete, because another row may still share the file.
+
+A writer locks (or creates) the blob's row before it places the file, and
+the collector deletes rows and files in one transaction while holding the
+row locks, so an upload racing a collection either keeps the row alive or
+writes the file again. Files whose row never committed (the upload's
+transaction rolled back) are swept by the collector once they are older
+than the grace period.
+"""
+import hashlib
+import os
+import tempfile
+from datetime import timedelta
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.utils import timezone
+
+BLOB_PREFIX = 'blobs'
+TEMP_PREFIX = '.upload-'
+
+
+def _blob_model():
+    return apps.get_model('pets', 'StoredBlob')
+
+
+def is_blob_name(name):
+    return bool(name) and name.startswith(BLOB_PREFIX + '/')
+
+
+def blob_name(digest, suffix):
+    """Storage name of the blob with SHA-256 ``digest``; ``suffix`` is its extension, or a derivative's"""
+    return '/'.join([BLOB_PREFIX, digest[:2], digest[2:4], digest + suffix])
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that names files after the SHA-256 of their content"""
+
+    chunk_size = 64 * 1024
+
+    def get_available_name(self, name, max_length=None):
+        # The final name is derived from the content in _save().
+        return name
+
+    def _save(self, name, content):
+        extension = os.path.splitext(name)[1].lower()
+        digest = hashlib.sha256()
+        size = 0
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        temp_path = self._temp_path()
+        try:
+            with open(temp_path, 'wb') as temp_file:
+                for chunk in content.chunks(self.chunk_size):
+                    digest.update(chunk)
+                    temp_file.write(chunk)
+                    size += len(chunk)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        name = blob_name(digest.hexdigest(), extension)
+        self._place(name, temp_path, size)
+        return name
+
+    def save_derived(self, name, content):
+        """Store ``content`` (bytes) under a blob ``name`` chosen by the caller, see blob_name()"""
+        temp_path = self._temp_path()
+        try:
+            with open(temp_path, 'wb') as temp_file:
+                temp_file.write(content)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        self._place(name, temp_path, len(content))
+        return name
+
+    def register_existing(self, name):
+        """Claim a blob file that is already stored; returns False if there is no such file"""
+        with transaction.atomic():
+            if not self.exists(name):
+                return False
+            self._register(name, self.size(name))
+            if not self.exists(name):
+                # Collected while we waited for the row lock.
+                transaction.set_rollback(True)
+                return False
+            os.utime(self.path(name))
+        return True
+
+    def _temp_path(self):
+        blob_dir = os.path.join(self.location, BLOB_PREFIX)
+        os.makedirs(blob_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=blob_dir, prefix=TEMP_PREFIX)
+        os.close(fd)
+        return temp_path
+
+    def _place(self, name, temp_path, size):
+        """Move ``temp_path`` to ``name`` unless a live copy is there already"""
+        try:
+            with transaction.atomic():
+                created = self._register(name, size)
+                full_path = self.path(name)
+                # A new row may be racing a collection of the old file: always write.
+                if created or not os.path.exists(full_path):
+                    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                    os.replace(temp_path, full_path)
+                    if self.file_permissions_mode is not None:
+                        os.chmod(full_path, self.file_permissions_mode)
+                else:
+                    os.remove(temp_path)
+                    # Keep the orphan sweep off a file whose row has not committed yet.
+                    os.utime(full_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def _register(self, name, size):
+        """Lock or create the blob's row and touch it; returns True if the row is new"""
+        StoredBlob = _blob_model()
+        # The lock makes a concurrent collection of this blob finish (or wait) first.
+        if list(StoredBlob.objects.select_for_update().filter(name=name).values_list('id', flat=True)):
+            # Touch the blob so a concurrent GC pass leaves a fresh upload alone.
+            StoredBlob.objects.filter(name=name).update(updated_at=timezone.now())
+            return False
+        try:
+            with transaction.atomic():
+                StoredBlob.objects.create(name=name, size=size)
+        except IntegrityError:
+            StoredBlob.objects.filter(name=name).update(updated_at=timezone.now())
+            return False
+        return True
+
+    def delete(self, name):
+        # Blobs may be shared; they are reclaimed by gc_media_blobs once
+        # their reference count reaches zero.
+        pass
+
+    def purge(self, name):
+        """Physically remove a blob file (used by garbage collection)"""
+        super().delete(name)
+
+
+_blob_storage = None
+
+
+def get_blob_storage():
+    global _blob_storage
+    if _blob_storage is None:
+        _blob_storage = ContentAddressedStorage()
+    return _blob_storage
+
+
+def adjust_blob_references(name, delta):
+    if is_blob_name(name):
+        _blob_model().objects.filter(name=name).update(
+            ref_count=F('ref_count') + delta, updated_at=timezone.now()
+        )
+
+
+def track_blob_references(model, field_name):
+    """Keep StoredBlob.ref_count in step with ``model.<field_name>``"""
+    loaded_attr = f'_loaded_{field_name}'
+    uid = f'blob-refs-{model._meta.label_lower}-{field_name}'
+
+    def remember_loaded(sender, instance, **kwargs):
+        if field_name in instance.__dict__:
+            value = instance.__dict__[field_name]
+            instance.__dict__[loaded_attr] = getattr(value, 'name', value) or ''
+
+    def load_deferred(sender, instance, **kwargs):
+        # Rows loaded with the field deferred have no snapshot; read it now,
+        # while the stored value is still the old one.
+        if loaded_attr not in instance.__dict__ and instance.pk and not instance._state.adding:
+            stored = sender.objects.filter(pk=instance.pk).values_list(field_name, flat=True).first()
+            instance.__dict__[loaded_attr] = stored or ''
+
+    def update_references(sender, instance, created, **kwargs):
+        current = getattr(instance, field_name).name or ''
+        previous = '' if created else instance.__dict__.get(loaded_attr, '')
+        if previous != current:
+            adjust_blob_references(previous, -1)
+            adjust_blob_references(current, 1)
+        instance.__dict__[loaded_attr] = current
+
+    def release_references(sender, instance, **kwargs):
+        adjust_blob_references(getattr(instance, field_name).name, -1)
+
+    post_init.connect(remember_loaded, sender=model, weak=False, dispatch_uid=uid)
+    pre_save.connect(load_deferred, sender=model, weak=False, dispatch_uid=uid)
+    post_save.connect(update_references, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(release_references, sender=model, weak=False, dispatch_uid=uid)
+
+
+def collect_garbage(batch_size=500, grace_seconds=3600):
+    """
+    Delete unreferenced blobs older than the grace period, one batch at a
+    time, then files under ``blobs/`` that have no row; returns (blobs_removed, bytes_freed)
+    """
+    StoredBlob = _blob_model()
+    storage = get_blob_storage()
+    cutoff = timezone.now() - timedelta(seconds=grace_seconds)
+    removed = freed = 0
+    last_id = 0
+    while True:
+        batch = list(
+            StoredBlob.objects.filter(ref_count__lte=0, updated_at__lt=cutoff, id__gt=last_id)
+            .order_by('id').values_list('id', 'name', 'size')[:batch_size]
+        )
+        if not batch:
+            break
+        last_id = batch[-1][0]
+        with transaction.atomic():
+            # Re-check inside the transaction in case a row picked up a reference.
+            doomed = list(
+                StoredBlob.objects.select_for_update()
+                .filter(id__in=[row[0] for row in batch], ref_count__lte=0, updated_at__lt=cutoff)
+                .values_list('id', 'name', 'size')
+            )
+            StoredBlob.objects.filter(id__in=[row[0] for row in doomed]).delete()
+            # Purge while the rows are still locked: an upload of the same
+            # content waits for this transaction, then writes the file again.
+            for _, name, size in doomed:
+                storage.purge(name)
+                removed += 1
+                freed += size
+
+    orphans_removed, orphans_freed = _collect_orphans(storage, cutoff.timestamp(), batch_size)
+    return removed + orphans_removed, freed + orphans_freed
+
+
+def _collect_orphans(storage, cutoff, batch_size):
+    """Remove blob files and stale temporary uploads, older than ``cutoff``, that have no row"""
+    root = storage.path(BLOB_PREFIX)
+    candidates = []
+    for directory, _, files in os.walk(root):
+        for file_name in files:
+            path = os.path.join(directory, file_name)
+            if os.path.getmtime(path) < cutoff:
+                name = '/'.join([BLOB_PREFIX, *os.path.relpath(path, root).split(os.sep)])
+                candidates.append((name, path))
+
+    StoredBlob = _blob_model()
+    removed = freed = 0
+    for start in range(0, len(candidates), batch_size):
+        batch = candidates[start:start + batch_size]
+        known = set(
+            StoredBlob.objects.filter(name__in=[name for name, _ in batch]).values_list('name', flat=True)
+        )
+        for name, path in batch:
+            if name in known:
+                continue
+            try:
+                # An upload reusing the file touches it before its row commits.
+                if os.path.getmtime(path) >= cutoff:
+                    continue
+                size = os.path.getsize(path)
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            removed += 1
+            freed += size
+    return removed, freed
@@ -0,0 +1,240 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import connections
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from adoption.models import AdoptionRequest
+from pets.models import Pet, StoredBlob
+
+from .routers import STICKY_COOKIE, ReplicaStickinessMiddleware, use_primary
+from .storage import collect_garbage, get_blob_storage
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], PET_DEFERRED_WORK_INLINE=True)
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    The test database is the primary; a second SQLite file is the replica.
+    "Replication" is an explicit VACUUM INTO snapshot, so anything written
+    after it shows up only on the primary, like a lagging replica.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Registered after the test runner has set up its databases, so Django
+        # does not create a test copy of it; replicate() rewrites it for each test.
+        cls.databases = cls.databases | {'replica'}
+        cls.directory = tempfile.mkdtemp()
+        cls.replica_path = os.path.join(cls.directory, 'replica.sqlite3')
+        configured = connections.configure_settings({
+            'default': connections.settings['default'],
+            'replica': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': cls.replica_path},
+        })
+        connections.settings['replica'] = configured['replica']
+
+    @classmethod
+    def tearDownClass(cls):
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        shutil.rmtree(cls.directory)
+        super().tearDownClass()
+
+    def replicate(self):
+        connections['replica'].close()
+        if os.path.exists(self.replica_path):
+            os.remove(self.replica_path)
+        with connections['default'].cursor() as cursor:
+            cursor.execute('VACUUM INTO %s', [self.replica_path])
+
+    def setUp(self):
+        self.user = User.objects.create_user('adopter', password='password')
+        self.pet = Pet.objects.create(name='Rex', pet_type='dog', age=2, gender='male')
+        self.client.force_login(self.user)
+        self.replicate()
+        self.pet.name = 'Rex II'
+        self.pet.save()
+
+    def listed_names(self):
+        return [pet['name'] for pet in self.client.get('/api/pets/').json()['results']]
+
+    def test_safe_requests_read_from_a_replica(self):
+        self.assertEqual(self.listed_names(), ['Rex'])
+
+    def test_writes_go_to_the_primary_and_pin_the_client_to_it(self):
+        response = self.client.post(
+            '/api/pets/saved-searches/', {'criteria': {'pet_type': 'dog'}}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.cookies[STICKY_COOKIE]['max-age'], 5)
+        with use_primary():
+            self.assertTrue(self.user.saved_searches.exists())
+        self.assertFalse(self.user.saved_searches.using('replica').exists())
+
+        # Read-your-writes: the sticky cookie keeps the next reads on the primary.
+        self.assertEqual(self.listed_names(), ['Rex II'])
+        self.client.cookies.pop(STICKY_COOKIE)
+        self.assertEqual(self.listed_names(), ['Rex'])
+
+    def test_reads_outside_requests_use_the_primary(self):
+        self.assertEqual(Pet.objects.get(pk=self.pet.pk).name, 'Rex II')
+
+    def test_session_writes_do_not_pin_the_client(self):
+        def view(request):
+            request.session['seen_pets'] = [self.pet.pk]
+            return HttpResponse()
+
+        middleware = ReplicaStickinessMiddleware(SessionMiddleware(view))
+        response = middleware(RequestFactory().get('/api/pets/'))
+        self.assertIn(settings.SESSION_COOKIE_NAME, response.cookies)
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+        # The session exists only on the primary, and is read from there.
+        session_key = response.cookies[settings.SESSION_COOKIE_NAME].value
+        request = RequestFactory().get('/api/pets/', HTTP_COOKIE=f'{settings.SESSION_COOKIE_NAME}={session_key}')
+        middleware = ReplicaStickinessMiddleware(SessionMiddleware(
+            lambda request: HttpResponse(request.session['seen_pets'])
+        ))
+        self.assertEqual(middleware(request).content, str(self.pet.pk).encode())
+
+
+@override_settings(PET_DEFERRED_WORK_INLINE=True)
+class CountModePaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('adopter', password='password')
+        for i in range(15):
+            pet = Pet.objects.create(name=f'Pet {i}', pet_type='dog', age=2, gender='male')
+            AdoptionRequest.objects.create(user=cls.user, pet=pet, reason='A loving home')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def page(self, path, **params):
+        response = self.client.get(path, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def counted_page(self, path, **params):
+        """The page, and whether a COUNT query was run for it"""
+        with CaptureQueriesContext(connections['default']) as queries:
+            page = self.page(path, **params)
+        return page, any('COUNT(' in query['sql'] for query in queries)
+
+    def test_exact_count_keeps_the_stock_response(self):
+        page = self.page('/api/adoptions/', count_mode='exact', page=2)
+        self.assertEqual(set(page), {'count', 'next', 'previous', 'results'})
+        self.assertEqual((page['count'], len(page['results']), page['next']), (15, 3, None))
+
+    def test_count_free_pages_skip_the_count_query(self):
+        page, counted = self.counted_page('/api/adoptions/', count_mode='none')
+        self.assertFalse(counted)
+        self.assertEqual((page['count'], page['count_mode'], len(page['results'])), (None, 'none', 12))
+        self.assertTrue(page['next'].endswith('page=2'))
+        page = self.page('/api/adoptions/', count_mode='none', page=2)
+        self.assertEqual((len(page['results']), page['next']), (3, None))
+        self.assertEqual(self.client.get('/api/adoptions/', {'count_mode': 'none', 'page': 3}).status_code, 404)
+
+    def test_cached_count_is_reused(self):
+        page, counted = self.counted_page('/api/adoptions/')
+        self.assertEqual((page['count'], counted), (15, True))
+        Pet.objects.all().delete()
+        page, counted = self.counted_page('/api/adoptions/')
+        self.assertFalse(counted)
+        # A stale count never falls below the rows actually seen.
+        self.assertEqual((page['count'], page['count_mode'], page['results']), (15, 'cached', []))
+
+    def test_estimated_count_falls_back_to_cached_without_planner_estimates(self):
+        page = self.page('/api/adoptions/admin/')
+        self.assertEqual((page['count'], page['count_mode']), (15, 'cached'))
+
+
+class BlobStorageTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        self.storage = get_blob_storage()
+
+    def age(self, name):
+        """Make a blob and its file older than the grace period"""
+        StoredBlob.objects.filter(name=name).update(updated_at=timezone.now() - timedelta(days=1))
+        os.utime(self.storage.path(name), (0, 0))
+
+    def test_same_content_is_stored_once(self):
+        first = self.storage.save('a.png', ContentFile(b'same bytes'))
+        second = self.storage.save('b.PNG', ContentFile(b'same bytes'))
+        self.assertEqual(first, second)
+        self.assertTrue(first.startswith('blobs/') and first.endswith('.png'))
+        self.assertEqual(StoredBlob.objects.get(name=first).size, len(b'same bytes'))
+        self.assertEqual(os.listdir(os.path.dirname(self.storage.path(first))), [os.path.basename(first)])
+
+    def test_garbage_collection_removes_unreferenced_blobs_and_orphan_files(self):
+        kept = self.storage.save('kept.png', ContentFile(b'kept'))
+        StoredBlob.objects.filter(name=kept).update(ref_count=1)
+        dropped = self.storage.save('dropped.png', ContentFile(b'dropped'))
+        fresh = self.storage.save('fresh.png', ContentFile(b'fresh'))
+        # A file whose row was rolled back with its upload.
+        orphan = self.storage.save('orphan.png', ContentFile(b'orphan'))
+        for name in (kept, dropped, orphan):
+            self.age(name)
+        StoredBlob.objects.filter(name=orphan).delete()
+
+        self.assertEqual(collect_garbage(), (2, len(b'dropped') + len(b'orphan')))
+        self.assertEqual(set(StoredBlob.objects.values_list('name', flat=True)), {kept, fresh})
+        for name, exists in [(kept, True), (fresh, True), (dropped, False), (orphan, False)]:
+            self.assertEqual(self.storage.exists(name), exists, name)
+
+    def test_upload_racing_a_collection_keeps_its_file(self):
+        name = self.storage.save('a.png', ContentFile(b'content'))
+        self.age(name)
+        # The collector has deleted the row; the file may or may not be purged yet.
+        for purged in (False, True):
+            with self.subTest(purged=purged):
+                StoredBlob.objects.filter(name=name).delete()
+                if purged:
+                    os.remove(self.storage.path(name))
+                self.assertEqual(self.storage.save('b.png', ContentFile(b'content')), name)
+                self.assertEqual(collect_garbage(), (0, 0))
+                with open(self.storage.path(name), 'rb') as stored:
+                    self.assertEqual(stored.read(), b'content')
+        self.assertFalse([f for f in os.listdir(self.storage.path('blobs')) if f.startswith('.upload-')])
+
+    def refs(self, name):
+        return StoredBlob.objects.get(name=name).ref_count
+
+    def test_pet_images_are_reference_counted(self):
+        refs = self.refs
+        rex = Pet.objects.create(
+            name='Rex', pet_type='dog', age=2, gender='male', image=ContentFile(b'photo', 'rex.jpg')
+        )
+        ivy = Pet.objects.create(
+            name='Ivy', pet_type='cat', age=1, gender='female', image=ContentFile(b'photo', 'ivy.jpg')
+        )
+        shared = rex.image.name
+        self.assertEqual((ivy.image.name, refs(shared)), (shared, 2))
+
+        ivy.image = ContentFile(b'other photo', 'ivy.jpg')
+        ivy.save()
+        self.assertEqual((refs(shared), refs(ivy.image.name)), (1, 1))
+
+        # Instances loaded with the image deferred still release the old file.
+        rex = Pet.objects.defer('image').get(pk=rex.pk)
+        rex.image = ''
+        rex.save()
+        self.assertEqual(refs(shared), 0)
+        self.age(shared)
+        self.assertEqual(collect_garbage(), (1, len(b'photo')))
+        self.assertFalse(self.storage.exists(shared))
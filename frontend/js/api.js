@@ -262,6 +262,49 @@ class APIService {
     return await this.handleResponse(response);
   }
 
+  // Up to 200 pets in one request, in the order given; unknown ids come back in `missing`.
+  async getPetsBatch(petIds) {
+    const ids = petIds.filter((id) => id && !isNaN(id));
+    if (ids.length === 0) {
+      return { results: [], missing: [] };
+    }
+
+    const response = await this.makeRequest(`${API_BASE_URL}/pets/batch/`, {
+      method: "POST",
+      headers: this.getHeaders(false),
+      body: JSON.stringify({ ids }),
+    });
+
+    return await this.handleResponse(response);
+  }
+
+  async getSimilarPets(petId) {
+    if (!petId || isNaN(petId)) {
+      throw new Error("Invalid pet ID");
+    }
+
+    const response = await this.makeRequest(`${API_BASE_URL}/pets/${petId}/similar/`, {
+      headers: this.getHeaders(false),
+    });
+
+    return await this.handleResponse(response);
+  }
+
+  async autocompletePets(query, limit = 8) {
+    if (!query || query.trim().length === 0) {
+      return { query: "", results: [] };
+    }
+
+    const response = await this.makeRequest(
+      `${API_BASE_URL}/pets/autocomplete/?q=${encodeURIComponent(query.trim())}&limit=${limit}`,
+      {
+        headers: this.getHeaders(false),
+      }
+    );
+
+    return await this.handleResponse(response);
+  }
+
   async searchPets(query) {
     if (!query || query.trim().length === 0) {
       throw new Error("Search query is required");
@@ -3,6 +3,9 @@
  * Handles all API interactions and database connections
  */
 
+// localStorage key of the replica kept by syncPets()
+const AVAILABLE_PETS_KEY = "availablePetReplica";
+
 class DataManager {
   constructor() {
     this.apiBase = "http://localhost:8000/api";
@@ -172,6 +175,70 @@ class DataManager {
     }
   }
 
+  /**
+   * Bring the local copy of the available pets up to date from the change feed.
+   * The first call downloads every pet; later calls only what changed.
+   * The feed covers pets of every status, so pets that are not available are
+   * dropped, matching the listing the copy is reloaded from when the cursor expires.
+   * Returns the pets as an object keyed by id.
+   */
+  async syncPets() {
+    const replica = JSON.parse(localStorage.getItem(AVAILABLE_PETS_KEY) || "null") || {
+      cursor: 0,
+      pets: {},
+    };
+    try {
+      let hasMore = true;
+      while (hasMore) {
+        const response = await fetch(
+          `${this.apiBase}/pets/changes/?since=${replica.cursor}`,
+          { headers: this.getAuthHeaders(), credentials: "include" }
+        );
+        const data = await response.json();
+        if (response.status === 410) {
+          // Our cursor is too old: reload the listing, then follow the feed from now on.
+          replica.pets = await this.fetchAllPets();
+          replica.cursor = data.cursor;
+          continue;
+        }
+        if (!response.ok) {
+          return { success: false, error: data.error || "Failed to sync pets" };
+        }
+        for (const change of data.changes) {
+          if (change.action === "deleted" || change.pet.status !== "available") {
+            delete replica.pets[change.id];
+          } else {
+            replica.pets[change.id] = change.pet;
+          }
+        }
+        replica.cursor = data.cursor;
+        hasMore = data.has_more;
+      }
+      localStorage.setItem(AVAILABLE_PETS_KEY, JSON.stringify(replica));
+      return { success: true, data: replica.pets };
+    } catch (error) {
+      return { success: false, error: "Failed to sync pets" };
+    }
+  }
+
+  // Every available pet, as listed by /api/pets/.
+  async fetchAllPets() {
+    const pets = {};
+    let url = `${this.apiBase}/pets/?page_size=100`;
+    while (url) {
+      const response = await fetch(url, {
+        headers: this.getAuthHeaders(),
+        credentials: "include",
+      });
+      const data = await response.json();
+      for (const pet of data.results) {
+        pets[pet.id] = pet;
+      }
+      url = data.next;
+    }
+    return pets;
+  }
+
   // Adoption Methods
   async createAdoptionRequest(petId, reason) {
     try {
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Pet
+from .models import ArchivedPet, Breed, BreedAlias, Pet
 
 @admin.register(Pet)
 class PetAdmin(admin.ModelAdmin):
@@ -32,3 +32,24 @@ class PetAdmin(admin.ModelAdmin):
         if not change:  # If creating a new pet
             obj.owner = request.user
         super().save_model(request, obj, form, change)
+
+
+@admin.register(ArchivedPet)
+class ArchivedPetAdmin(admin.ModelAdmin):
+    list_display = ('name', 'pet_type', 'breed', 'owner', 'created_at', 'archived_at')
+    list_filter = ('pet_type', 'archived_at')
+    search_fields = ('name', 'breed', 'owner__username')
+    readonly_fields = ('archived_at',)
+
+
+class BreedAliasInline(admin.TabularInline):
+    model = BreedAlias
+    extra = 1
+
+
+@admin.register(Breed)
+class BreedAdmin(admin.ModelAdmin):
+    list_display = ('name', 'pet_type', 'created_at')
+    list_filter = ('pet_type',)
+    search_fields = ('name', 'aliases__alias')
+    inlines = [BreedAliasInline]
@@ -0,0 +1,64 @@
+"""
+NumPy scoring kernel for personalized recommendations.
+
+Kept free of Django imports so that worker processes, which may be started
+with the "spawn" method, can import it without setting up Django. The
+parent process hands every worker the weighted attribute matrix of all pets
+once (``init_worker``); each task is then a chunk of users in CSR form.
+"""
+import numpy as np
+
+_state = {}
+
+
+def init_worker(pet_matrix, candidate_positions, top_n):
+    """Per-process setup: ``pet_matrix`` rows are unit attribute vectors"""
+    candidate_index = np.full(len(pet_matrix), -1, dtype=np.int64)
+    candidate_index[candidate_positions] = np.arange(len(candidate_positions))
+    _state.update(
+        pets=pet_matrix,
+        candidates=np.ascontiguousarray(pet_matrix[candidate_positions].T),
+        candidate_positions=candidate_positions,
+        candidate_index=candidate_index,
+        top_n=top_n,
+    )
+
+
+def score_users(task):
+    """
+    ``task`` is (user_ids, indptr, positions): the pets user ``user_ids[i]``
+    applied for are ``positions[indptr[i]:indptr[i + 1]]`` (rows of the pet
+    matrix). Returns [(user_id, [pet position, ...]), ...], best first.
+    """
+    user_ids, indptr, positions = task
+    if not len(user_ids):
+        return []
+    pets = _state['pets']
+    # Affinity: the sum of the attribute vectors of every pet a user applied for.
+    affinity = np.add.reduceat(pets[positions], indptr[:-1], axis=0)
+    norms = np.linalg.norm(affinity, axis=1, keepdims=True)
+    np.divide(affinity, norms, out=affinity, where=norms > 0)
+
+    candidates = _state['candidates']
+    if candidates.shape[1] == 0:
+        return [(int(user_id), []) for user_id in user_ids]
+    scores = affinity @ candidates
+
+    # Never recommend a pet the user has already applied for.
+    owners = np.repeat(np.arange(len(user_ids)), np.diff(indptr))
+    columns = _state['candidate_index'][positions]
+    applied = columns >= 0
+    scores[owners[applied], columns[applied]] = -np.inf
+
+    count = min(_state['top_n'], scores.shape[1])
+    best = np.argpartition(-scores, count - 1, axis=1)[:, :count]
+    best_scores = np.take_along_axis(scores, best, axis=1)
+    order = np.argsort(-best_scores, axis=1, kind='stable')
+    best = np.take_along_axis(best, order, axis=1)
+    best_scores = np.take_along_axis(best_scores, order, axis=1)
+
+    candidate_positions = _state['candidate_positions']
+    return [
+        (int(user_id), candidate_positions[best[i][best_scores[i] > 0]].tolist())
+        for i, user_id in enumerate(user_ids)
+    ]
@@ -0,0 +1,121 @@
+"""
+Hot/cold split for adopted pets.
+
+Adopted pets are never listed again, but they used to stay in ``pets_pet``
+forever, growing every index that listing queries probe. ``archive_adopted_pets``
+(``manage.py archive_adopted_pets``) moves pets that have been adopted for
+longer than ``PET_ARCHIVE_AFTER_DAYS`` into ``ArchivedPet``, and their
+adoption requests into ``adoption.ArchivedAdoptionRequest``. Both keep their
+original ids. The job works in batches, one transaction each. Pets that
+still have a pending request are left alone until it is decided.
+
+The live rows are removed with an ordinary delete. Their signals therefore
+drop the pet from the search index, the caches and the similar-pets lists.
+Two side effects are compensated inside the same transaction:
+
+- the archive row takes over the photo's blob reference;
+- the pet stays counted as adopted in ``PetCounter``.
+
+``with_archived`` merges live and archived adoption requests for the
+history endpoints. Paginated lists use ``union_with_archived`` instead, which
+merges them in SQL, and ``load_union_page`` to fetch the page's rows.
+"""
+import heapq
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import BooleanField, Exists, OuterRef, Value
+from django.utils import timezone
+
+from core.storage import adjust_blob_references
+
+from .models import ArchivedPet, Pet
+from .statistics import adjust_counter
+
+ARCHIVE_AFTER_DAYS = getattr(settings, 'PET_ARCHIVE_AFTER_DAYS', 90)
+ARCHIVED_PET_FIELDS = (
+    'id', 'name', 'pet_type', 'breed', 'age', 'gender', 'description', 'status',
+    'image', 'owner_id', 'created_at', 'updated_at',
+)
+ARCHIVED_REQUEST_FIELDS = ('id', 'user_id', 'pet_id', 'reason', 'status', 'created')
+
+
+def archivable_pets(cutoff):
+    """Adopted pets untouched since ``cutoff`` with no pending request"""
+    from adoption.models import AdoptionRequest
+
+    pending = AdoptionRequest.objects.filter(pet=OuterRef('pk'), status='pending')
+    # A pet's row is last written when it is adopted, so updated_at dates the adoption.
+    return Pet.objects.filter(status='adopted', updated_at__lt=cutoff).filter(~Exists(pending))
+
+
+def _archive_batch(pet_ids, cutoff):
+    from adoption.models import AdoptionRequest, ArchivedAdoptionRequest
+
+    with transaction.atomic():
+        # Re-check under lock, in case a pet changed since it was picked.
+        pets = list(
+            archivable_pets(cutoff).select_for_update().filter(pk__in=pet_ids).values(*ARCHIVED_PET_FIELDS)
+        )
+        if not pets:
+            return 0
+        ids = [pet['id'] for pet in pets]
+        requests = AdoptionRequest.objects.filter(pet_id__in=ids).values(*ARCHIVED_REQUEST_FIELDS)
+
+        ArchivedPet.objects.bulk_create([ArchivedPet(**pet) for pet in pets])
+        ArchivedAdoptionRequest.objects.bulk_create([ArchivedAdoptionRequest(**row) for row in requests])
+        for pet in pets:
+            adjust_blob_references(pet['image'], 1)
+        for pet_type, count in Counter(pet['pet_type'] for pet in pets).items():
+            adjust_counter('adopted', pet_type, count)
+
+        # Cascades to the requests just copied and to the pet's derived rows.
+        Pet.objects.filter(pk__in=ids).delete()
+    return len(ids)
+
+
+def archive_adopted_pets(older_than_days=ARCHIVE_AFTER_DAYS, batch_size=500):
+    """Move long-adopted pets and their requests to the archive tables; returns the number of pets moved"""
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    archived = 0
+    last_id = 0
+    while True:
+        batch = list(
+            archivable_pets(cutoff).filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not batch:
+            return archived
+        last_id = batch[-1]
+        archived += _archive_batch(batch, cutoff)
+
+
+def with_archived(live, archived):
+    """Merge live and archived adoption requests, newest first, into one list"""
+    ordering = ('-created', '-id')
+    return list(heapq.merge(
+        live.order_by(*ordering), archived.order_by(*ordering),
+        key=lambda request: (request.created, request.id), reverse=True,
+    ))
+
+
+def union_with_archived(live, archived, ordering=('-created',)):
+    """
+    The ids of live and archived adoption requests as one queryset, ordered
+    by ``ordering`` then id; each row also says which table it comes from
+    """
+    ordering = [*ordering, '-id' if ordering[0].startswith('-') else 'id']
+    # Compound statements cannot order their parts on every backend.
+    live = live.order_by().values('id', 'created', archived=Value(False, output_field=BooleanField()))
+    archived = archived.order_by().values('id', 'created', archived=Value(True, output_field=BooleanField()))
+    return live.union(archived, all=True).order_by(*ordering)
+
+
+def load_union_page(rows, live, archived):
+    """The requests behind ``rows`` of union_with_archived(), in the same order"""
+    loaded = {
+        False: live.in_bulk([row['id'] for row in rows if not row['archived']]),
+        True: archived.in_bulk([row['id'] for row in rows if row['archived']]),
+    }
+    return [loaded[row['archived']][row['id']] for row in rows]
@@ -0,0 +1,198 @@
+"""
+Typeahead suggestions for pet names and breeds, served from memory.
+
+Each process keeps a ``PrefixIndex`` of the names and breeds of available
+pets. Every distinct value (compared by its normalized tokens) is one
+suggestion, weighted by the number of available pets that carry it. The
+index holds a sorted array of ``(key, kind, value)`` entries with one key
+per word suffix of the value, so "golden re" and "retr" both find "Golden
+Retriever". A lookup is two bisections and a scan of the matching range;
+results are memoized per prefix until the index next changes.
+
+The index is loaded on first use. Pet signals append the ids of changed
+pets to a change log in the Django cache and bump a shared sequence
+number (``record_changes()``). Before answering, each process compares the
+sequence with the one it last applied and re-reads only the pets logged in
+between. A full reload happens when log entries are missing (evicted or
+not written yet) or too far behind.
+"""
+import heapq
+import threading
+from bisect import bisect_left, insort
+
+from django.core.cache import cache
+from django.db import transaction
+
+from core.routers import use_primary
+
+from .models import Pet
+from .search import tokenize
+
+SEQUENCE_KEY = 'pets:autocomplete:sequence'
+CHANGE_KEY = 'pets:autocomplete:change:{seq}'
+# Log entries only need to outlive the gap between two lookups in a process.
+CHANGE_TIMEOUT = 3600
+MAX_REPLAY = 500
+
+DEFAULT_LIMIT = 8
+MAX_LIMIT = 20
+KINDS = ('name', 'breed')
+MEMO_SIZE = 2048
+
+
+def normalize(text):
+    return ' '.join(tokenize(text))
+
+
+def _suffixes(phrase):
+    words = phrase.split(' ')
+    return [' '.join(words[i:]) for i in range(len(words))]
+
+
+def get_sequence():
+    return cache.get(SEQUENCE_KEY, 0)
+
+
+def record_changes(pet_ids):
+    """Log changed pets for every process's index once the transaction commits"""
+    pet_ids = sorted(set(pet_ids))
+    if not pet_ids:
+        return
+
+    def log():
+        if cache.add(SEQUENCE_KEY, 1, None):
+            seq = 1
+        else:
+            try:
+                seq = cache.incr(SEQUENCE_KEY)
+            except ValueError:
+                cache.set(SEQUENCE_KEY, 1, None)
+                seq = 1
+        cache.set(CHANGE_KEY.format(seq=seq), pet_ids, CHANGE_TIMEOUT)
+
+    transaction.on_commit(log)
+
+
+class PrefixIndex:
+    """Weighted name and breed suggestions of available pets, looked up by prefix"""
+
+    def __init__(self):
+        self.sequence = None
+        self.entries = []      # sorted (key, kind, normalized value)
+        self.weights = {}      # (kind, normalized value) -> number of available pets
+        self.labels = {}       # (kind, normalized value) -> value as first seen
+        self.pets = {}         # pet id -> ((kind, normalized value), ...)
+        self.memo = {}
+        self.lock = threading.Lock()
+
+    def sync(self):
+        """Apply logged changes, or reload, if the shared sequence has moved"""
+        current = get_sequence()
+        if current == self.sequence:
+            return
+        with self.lock:
+            if current == self.sequence:
+                return
+            if self.sequence is None or not 0 < current - self.sequence <= MAX_REPLAY:
+                self._reload(current)
+                return
+            seqs = range(self.sequence + 1, current + 1)
+            logged = cache.get_many([CHANGE_KEY.format(seq=seq) for seq in seqs])
+            if len(logged) < len(seqs):
+                self._reload(current)
+                return
+            self._apply({pet_id for pet_ids in logged.values() for pet_id in pet_ids})
+            self.sequence = current
+
+    def _values(self, pets):
+        for pet_id, name, breed in pets:
+            keys = []
+            for kind, value in (('name', name), ('breed', breed)):
+                normalized = normalize(value)
+                if normalized:
+                    keys.append(((kind, normalized), value.strip()))
+            yield pet_id, keys
+
+    def _reload(self, sequence):
+        with use_primary():
+            # Oldest pet first, so its spelling labels a shared suggestion.
+            pets = list(
+                Pet.objects.filter(status='available').order_by('id').values_list('id', 'name', 'breed')
+            )
+        weights, labels, by_pet = {}, {}, {}
+        for pet_id, keys in self._values(pets):
+            for suggestion, label in keys:
+                weights[suggestion] = weights.get(suggestion, 0) + 1
+                labels.setdefault(suggestion, label)
+            by_pet[pet_id] = tuple(suggestion for suggestion, _ in keys)
+        self.entries = sorted(
+            (key, kind, value) for kind, value in weights for key in _suffixes(value)
+        )
+        self.weights, self.labels, self.pets = weights, labels, by_pet
+        self.memo = {}
+        self.sequence = sequence
+
+    def _apply(self, pet_ids):
+        with use_primary():
+            pets = list(
+                Pet.objects.filter(pk__in=pet_ids, status='available').values_list('id', 'name', 'breed')
+            )
+        # Copy-on-write, so lookups running on other threads see a consistent index.
+        entries, weights, labels, by_pet = list(self.entries), dict(self.weights), dict(self.labels), dict(self.pets)
+        for pet_id in pet_ids:
+            for suggestion in by_pet.pop(pet_id, ()):
+                weights[suggestion] -= 1
+        for pet_id, keys in self._values(pets):
+            for suggestion, label in keys:
+                if suggestion not in weights:
+                    kind, value = suggestion
+                    for key in _suffixes(value):
+                        insort(entries, (key, kind, value))
+                weights[suggestion] = weights.get(suggestion, 0) + 1
+                if not labels.get(suggestion):
+                    labels[suggestion] = label
+            by_pet[pet_id] = tuple(suggestion for suggestion, _ in keys)
+        # Suggestions whose last pet went away keep their entries at weight 0
+        # until the next reload; lookups skip them.
+        self.entries, self.weights, self.labels, self.pets = entries, weights, labels, by_pet
+        self.memo = {}
+
+    def lookup(self, query, limit=DEFAULT_LIMIT, kind=None):
+        """Best ``limit`` suggestions whose words start with ``query``, most pets first"""
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        memo_key = (prefix, limit, kind)
+        memo = self.memo
+        if memo_key in memo:
+            return memo[memo_key]
+
+        entries, weights, labels = self.entries, self.weights, self.labels
+        lo = bisect_left(entries, (prefix,))
+        hi = bisect_left(entries, (prefix + '\U0010ffff',), lo)
+        found = set()
+        for _, entry_kind, value in entries[lo:hi]:
+            if kind is None or entry_kind == kind:
+                found.add((entry_kind, value))
+        best = heapq.nsmallest(
+            limit,
+            (suggestion for suggestion in found if weights.get(suggestion, 0) > 0),
+            key=lambda suggestion: (-weights[suggestion], suggestion[1], suggestion[0]),
+        )
+        results = [
+            {'text': labels[suggestion], 'kind': suggestion[0], 'count': weights[suggestion]}
+            for suggestion in best
+        ]
+        if len(memo) >= MEMO_SIZE:
+            memo.clear()
+        memo[memo_key] = results
+        return results
+
+
+index = PrefixIndex()
+
+
+def suggest(query, limit=DEFAULT_LIMIT, kind=None):
+    """Autocomplete ``query`` from this process's index, syncing it first"""
+    index.sync()
+    return index.lookup(query, limit, kind)
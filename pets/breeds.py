@@ -0,0 +1,166 @@
+"""
+Normalized breeds.
+
+``Pet.breed`` is free text, so one breed turns up as "Lab", "labrador" and
+"Labrador Retriever". Each spelling is normalized (lowercase words without
+accents, single spaces) and looked up in ``BreedAlias``, first as is and
+then without generic words such as "dog". The matching ``Breed`` is stored
+on the pet as ``breed_ref``, which listings filter on with an equality
+lookup and facets count exactly. The migration seeds common breeds and
+their usual spellings from ``BREEDS``.
+
+A spelling with no alias is not turned into a breed: the pet keeps its
+text and no ``breed_ref``, which queues it for review. ``manage.py
+backfill_breeds --unmatched`` lists the queued spellings; once an admin
+adds an alias for one, ``manage.py backfill_breeds`` resolves its pets.
+
+Pets are resolved when saved (see pets.signals), before ``bulk_create``
+in the bulk import, and in batches by ``backfill_breeds()``.
+"""
+import unicodedata
+from collections import Counter
+
+from django.db import transaction
+
+from .autocomplete import record_changes
+from .cache import invalidate_listings
+from .catalog import refresh_catalog
+from .changes import log_changes
+from .models import Breed, BreedAlias, Pet
+from .search import tokenize
+
+# (name, pet type, other spellings). The name's own spelling is always an alias.
+BREEDS = [
+    ('Labrador Retriever', 'dog', ['lab', 'labrador', 'lab retriever']),
+    ('Golden Retriever', 'dog', ['golden']),
+    ('German Shepherd', 'dog', ['german shepherd dog', 'gsd', 'alsatian']),
+    ('Beagle', 'dog', []),
+    ('Bulldog', 'dog', ['english bulldog', 'british bulldog']),
+    ('French Bulldog', 'dog', ['frenchie']),
+    ('Poodle', 'dog', ['standard poodle']),
+    ('Rottweiler', 'dog', ['rottie']),
+    ('Yorkshire Terrier', 'dog', ['yorkie']),
+    ('Boxer', 'dog', []),
+    ('Dachshund', 'dog', ['doxie', 'sausage dog', 'wiener dog']),
+    ('Siberian Husky', 'dog', ['husky']),
+    ('Chihuahua', 'dog', []),
+    ('Shih Tzu', 'dog', ['shihtzu']),
+    ('Border Collie', 'dog', []),
+    ('Pit Bull Terrier', 'dog', ['pit bull', 'pitbull', 'american pit bull terrier']),
+    ('Australian Shepherd', 'dog', ['aussie']),
+    ('Cocker Spaniel', 'dog', []),
+    ('Great Dane', 'dog', []),
+    ('Pug', 'dog', []),
+    ('Domestic Shorthair', 'cat', ['dsh', 'domestic short hair']),
+    ('Domestic Longhair', 'cat', ['dlh', 'domestic long hair']),
+    ('Siamese', 'cat', []),
+    ('Persian', 'cat', []),
+    ('Maine Coon', 'cat', []),
+    ('Ragdoll', 'cat', []),
+    ('Bengal', 'cat', []),
+    ('British Shorthair', 'cat', []),
+    ('Sphynx', 'cat', []),
+    ('Holland Lop', 'rabbit', []),
+    ('Netherland Dwarf', 'rabbit', []),
+    ('Lionhead', 'rabbit', []),
+    ('Budgerigar', 'bird', ['budgie', 'parakeet']),
+    ('Cockatiel', 'bird', []),
+    ('Goldfish', 'fish', []),
+    ('Betta', 'fish', ['betta fish', 'siamese fighting fish']),
+    ('Mixed Breed', '', ['mixed', 'mix', 'mutt']),
+]
+
+
+# Words that say nothing about the breed ("beagle dog", "persian cat").
+GENERIC_WORDS = {'dog', 'puppy', 'cat', 'kitten', 'breed', 'purebred'}
+
+
+def normalize_breed(text):
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ' '.join(tokenize(''.join(char for char in decomposed if not unicodedata.combining(char))))
+
+
+def _without_generic_words(normalized):
+    return ' '.join(word for word in normalized.split(' ') if word not in GENERIC_WORDS)
+
+
+def seed_breeds(breed_model=Breed, alias_model=BreedAlias):
+    """Create the breeds in BREEDS; takes the models so migrations can pass historical ones"""
+    for name, pet_type, spellings in BREEDS:
+        breed, _ = breed_model.objects.get_or_create(name=name, defaults={'pet_type': pet_type})
+        for alias in {normalize_breed(name), *spellings}:
+            alias_model.objects.get_or_create(alias=alias, defaults={'breed': breed})
+
+
+def resolve_breeds(texts):
+    """
+    Map the normalized form of each breed text to the id of the Breed it is
+    an alias of; spellings without an alias are left out
+    """
+    wanted = {normalize_breed(text) for text in texts} - {''}
+    if not wanted:
+        return {}
+    fallbacks = {normalized: _without_generic_words(normalized) for normalized in wanted}
+    aliases = dict(
+        BreedAlias.objects.filter(alias__in=wanted | set(fallbacks.values())).values_list('alias', 'breed_id')
+    )
+    resolved = {}
+    for normalized in wanted:
+        breed_id = aliases.get(normalized) or aliases.get(fallbacks[normalized])
+        if breed_id:
+            resolved[normalized] = breed_id
+    return resolved
+
+
+def unmatched_breeds(limit=None):
+    """(normalized spelling, number of pets) for breed texts no alias resolves, most used first"""
+    counts = Counter()
+    rows = Pet.objects.filter(breed_ref__isnull=True).exclude(breed='').values_list('breed', flat=True)
+    for text in rows.iterator():
+        normalized = normalize_breed(text)
+        if normalized:
+            counts[normalized] += 1
+    return counts.most_common(limit)
+
+
+def assign_breeds(pets):
+    """Set ``breed_ref`` on unsaved or about-to-be-saved Pet instances"""
+    resolved = resolve_breeds(pet.breed for pet in pets)
+    for pet in pets:
+        pet.breed_ref_id = resolved.get(normalize_breed(pet.breed))
+
+
+def backfill_breeds(batch_size=1000, everything=False):
+    """
+    Resolve ``breed_ref`` for pets that lack it (or for every pet when
+    ``everything``), one transaction per batch; returns the number of pets changed.
+    The writes skip the Pet signals, so each batch updates the catalog, the
+    change feed, the autocomplete log and the listing caches itself.
+    """
+    pets = Pet.objects.all() if everything else Pet.objects.filter(breed_ref__isnull=True).exclude(breed='')
+    changed = 0
+    last_id = 0
+    while True:
+        rows = list(
+            pets.filter(id__gt=last_id).order_by('id')
+            .values_list('id', 'breed', 'breed_ref_id')[:batch_size]
+        )
+        if not rows:
+            return changed
+        last_id = rows[-1][0]
+        with transaction.atomic():
+            resolved = resolve_breeds(breed for _, breed, _ in rows)
+            moves = {}
+            for pet_id, breed, current in rows:
+                target = resolved.get(normalize_breed(breed))
+                if target != current:
+                    moves.setdefault(target, []).append(pet_id)
+            for target, pet_ids in moves.items():
+                Pet.objects.filter(pk__in=pet_ids).update(breed_ref_id=target)
+            pet_ids = [pet_id for ids in moves.values() for pet_id in ids]
+            if pet_ids:
+                refresh_catalog(pet_ids)
+                log_changes(pet_ids)
+                record_changes(pet_ids)
+                invalidate_listings()
+        changed += len(pet_ids)
@@ -0,0 +1,171 @@
+"""
+Versioned response cache for public pet endpoints.
+
+Cached payloads are keyed on a version number rather than deleted: every
+pet has its own version, and a global "listing generation" covers
+responses that depend on many pets. Pet signals and adoption status
+transitions bump those versions, which makes the old entries unreachable
+until they expire from the configured cache backend.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from core.routers import use_primary
+
+LISTING_GENERATION_KEY = 'pets:listing:generation'
+LISTING_CHANGED_AT_KEY = 'pets:listing:changed_at'
+PET_VERSION_KEY = 'pets:pet:{pk}:version'
+STATS_KEY = 'pets:cache:{name}:{outcome}'
+
+CACHE_TIMEOUT = getattr(settings, 'PET_CACHE_TIMEOUT', 300)
+
+
+def _fresh_version():
+    # Millisecond clock so a version key evicted from the cache can never
+    # come back with a number that still has entries stored under it.
+    return int(time.time() * 1000)
+
+
+def _get_version(key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _fresh_version(), None)
+        version = cache.get(key) or _fresh_version()
+    return version
+
+
+def _bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _fresh_version(), None)
+
+
+def get_listing_generation():
+    return _get_version(LISTING_GENERATION_KEY)
+
+
+def get_listing_changed_at():
+    """Unix time of the last pet change seen by this cache, or None"""
+    return cache.get(LISTING_CHANGED_AT_KEY)
+
+
+def get_pet_version(pk):
+    return _get_version(PET_VERSION_KEY.format(pk=pk))
+
+
+def _bump_listings():
+    _bump_version(LISTING_GENERATION_KEY)
+    cache.set(LISTING_CHANGED_AT_KEY, int(time.time()), None)
+
+
+def invalidate_pet(pk):
+    """Expire cached responses for one pet and for every pet listing"""
+    def bump():
+        _bump_version(PET_VERSION_KEY.format(pk=pk))
+        _bump_listings()
+
+    transaction.on_commit(bump)
+
+
+def invalidate_listings():
+    """Expire every cached pet listing (new pets have no per-pet entries yet)"""
+    transaction.on_commit(_bump_listings)
+
+
+def _origin(request):
+    # Image URLs are absolute, so responses differ per scheme and host.
+    return hashlib.md5(request.build_absolute_uri('/').encode('utf-8')).hexdigest()[:12]
+
+
+def featured_pets_key(request):
+    return f'pets:featured:g{get_listing_generation()}:{_origin(request)}'
+
+
+def _detail_key(pk, version, request, fields):
+    key = f'pets:detail:{pk}:v{version}:{_origin(request)}'
+    if fields is not None:
+        # Sparse fieldsets (?fields=) are cached apart from the full representation.
+        key += ':f' + hashlib.md5(','.join(fields).encode('utf-8')).hexdigest()[:12]
+    return key
+
+
+def pet_detail_key(request, pk, fields=None):
+    return _detail_key(pk, get_pet_version(pk), request, fields)
+
+
+def pet_detail_keys(request, pks, fields=None):
+    """``{pk: pet_detail_key(request, pk, fields)}``, reading the pet versions in one round trip"""
+    versions = cache.get_many([PET_VERSION_KEY.format(pk=pk) for pk in pks])
+    return {
+        pk: _detail_key(
+            pk, versions.get(PET_VERSION_KEY.format(pk=pk)) or get_pet_version(pk), request, fields
+        )
+        for pk in pks
+    }
+
+
+def _record(name, outcome, count=1):
+    key = STATS_KEY.format(name=name, outcome=outcome)
+    if not cache.add(key, count, None):
+        try:
+            cache.incr(key, count)
+        except ValueError:
+            cache.set(key, count, None)
+
+
+def get_or_build(name, key, builder):
+    """
+    Return ``(data, hit)`` for ``key``, calling ``builder`` on a miss.
+    ``builder`` may return None to signal that the result must not be cached.
+    """
+    data = cache.get(key)
+    if data is not None:
+        _record(name, 'hits')
+        return data, True
+    _record(name, 'misses')
+    # A lagging replica would otherwise fill the cache with stale data for a whole timeout.
+    with use_primary():
+        data = builder()
+    if data is not None:
+        cache.set(key, data, CACHE_TIMEOUT)
+    return data, False
+
+
+def get_or_build_many(name, keys, builder):
+    """
+    Batch get_or_build(): ``keys`` maps ids to cache keys and ``builder``
+    takes the ids that missed and returns ``{id: data}`` for those it could
+    build. Returns ``{id: data}`` for every id found or built.
+    """
+    cached = cache.get_many(list(keys.values()))
+    found = {pk: cached[key] for pk, key in keys.items() if key in cached}
+    missing = [pk for pk in keys if pk not in found]
+    if found:
+        _record(name, 'hits', len(found))
+    if not missing:
+        return found
+    _record(name, 'misses', len(missing))
+    with use_primary():
+        built = builder(missing)
+    cache.set_many({keys[pk]: data for pk, data in built.items()}, CACHE_TIMEOUT)
+    return {**found, **built}
+
+
+def get_cache_stats(names=('featured', 'detail')):
+    """Hit/miss counters and hit ratio for each cached endpoint"""
+    stats = {}
+    for name in names:
+        hits = cache.get(STATS_KEY.format(name=name, outcome='hits'), 0)
+        misses = cache.get(STATS_KEY.format(name=name, outcome='misses'), 0)
+        total = hits + misses
+        stats[name] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / total, 4) if total else None,
+        }
+    return stats
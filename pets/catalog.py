@@ -0,0 +1,148 @@
+"""
+Denormalized read model for the public pet catalog.
+
+``PetCatalogEntry`` has one row per available pet. Each row holds
+everything a listing shows: display labels, the shelter's name and
+location, the photo and its variant names, and the number of pending
+adoption requests. ``PetListView``, ``featured_pets`` and ``search_pets``
+can then page through a single table on its own indexes, with no joins to
+the owner, profile, variant or request tables and no per-row label lookups.
+
+Entries are rebuilt from the source tables by ``refresh_catalog()``, which
+Pet, AdoptionRequest and UserProfile signals call inside the writing
+transaction (see pets.signals). The derivative pipeline calls it too, since
+it writes with ``bulk_create``/``update``. ``rebuild_catalog()`` (``manage.py
+rebuild_pet_catalog``) recreates the whole table.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import Pet, PetCatalogEntry, PetImageVariant
+
+CATALOG_FIELDS = [
+    field.name for field in PetCatalogEntry._meta.concrete_fields if field.name != 'id'
+]
+PET_COLUMNS = (
+    'id', 'name', 'pet_type', 'breed', 'breed_ref_id', 'age', 'gender', 'status', 'description',
+    'image', 'image_width', 'image_height', 'owner_id', 'created_at',
+    'owner__profile__shelter_name', 'owner__profile__latitude',
+    'owner__profile__longitude', 'owner__profile__geo_cell',
+)
+PET_TYPE_LABELS = dict(Pet.PET_TYPES)
+GENDER_LABELS = dict(Pet.GENDER_CHOICES)
+
+
+def catalog_enabled():
+    return getattr(settings, 'PET_CATALOG_READ_MODEL', True)
+
+
+def _srcsets(pets):
+    """{pet id: {format: {width: name}}} for the variants cut from each pet's current photo"""
+    photos = {pet['id']: pet['image'] for pet in pets if pet['image']}
+    srcsets = {}
+    rows = (
+        PetImageVariant.objects.filter(pet_id__in=list(photos))
+        .order_by('width', 'format')
+        .values_list('pet_id', 'source', 'format', 'width', 'image')
+    )
+    for pet_id, source, format_name, width, name in rows:
+        if source == photos[pet_id]:
+            srcsets.setdefault(pet_id, {}).setdefault(format_name, {})[str(width)] = name
+    return srcsets
+
+
+def _pending_counts(pet_ids):
+    from adoption.models import AdoptionRequest
+
+    return dict(
+        AdoptionRequest.objects.filter(pet_id__in=pet_ids, status='pending')
+        .order_by().values('pet_id').annotate(total=Count('id')).values_list('pet_id', 'total')
+    )
+
+
+def build_entries(queryset):
+    """Unsaved catalog entries for the pets in ``queryset``"""
+    pets = list(queryset.order_by().values(*PET_COLUMNS))
+    srcsets = _srcsets(pets)
+    pending = _pending_counts([pet['id'] for pet in pets])
+    return [
+        PetCatalogEntry(
+            id=pet['id'],
+            name=pet['name'],
+            pet_type=pet['pet_type'],
+            pet_type_display=PET_TYPE_LABELS.get(pet['pet_type'], pet['pet_type']),
+            breed=pet['breed'],
+            breed_id=pet['breed_ref_id'],
+            age=pet['age'],
+            gender=pet['gender'],
+            gender_display=GENDER_LABELS.get(pet['gender'], pet['gender']),
+            status=pet['status'],
+            description=pet['description'],
+            image=pet['image'] or '',
+            image_width=pet['image_width'],
+            image_height=pet['image_height'],
+            image_srcset=srcsets.get(pet['id'], {}),
+            shelter_id=pet['owner_id'],
+            shelter_name=pet['owner__profile__shelter_name'] or '',
+            latitude=pet['owner__profile__latitude'],
+            longitude=pet['owner__profile__longitude'],
+            geo_cell=pet['owner__profile__geo_cell'],
+            pending_requests=pending.get(pet['id'], 0),
+            created_at=pet['created_at'],
+        )
+        for pet in pets
+    ]
+
+
+def _write(entries):
+    PetCatalogEntry.objects.bulk_create(
+        entries,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=['id'],
+        update_fields=CATALOG_FIELDS,
+    )
+
+
+def refresh_catalog(pet_ids):
+    """Bring the entries of ``pet_ids`` in line with the source tables"""
+    pet_ids = set(pet_ids)
+    if not pet_ids:
+        return
+    entries = build_entries(Pet.objects.filter(pk__in=pet_ids, status='available'))
+    PetCatalogEntry.objects.filter(pk__in=pet_ids - {entry.id for entry in entries}).delete()
+    _write(entries)
+
+
+def refresh_shelter(profile):
+    """Copy a shelter's name and location onto its entries; returns the number changed"""
+    values = {
+        'shelter_name': profile.shelter_name or '',
+        'latitude': profile.latitude,
+        'longitude': profile.longitude,
+        'geo_cell': profile.geo_cell,
+    }
+    # Profiles are saved on every login; leave entries alone unless something moved.
+    return (
+        PetCatalogEntry.objects.filter(shelter_id=profile.user_id).exclude(**values)
+        .update(**values, updated_at=timezone.now())
+    )
+
+
+def rebuild_catalog(batch_size=1000):
+    """Recreate every entry from the source tables; returns the number of entries"""
+    available = Pet.objects.filter(status='available')
+    total = 0
+    with transaction.atomic():
+        PetCatalogEntry.objects.all().delete()
+        last_id = 0
+        while True:
+            ids = list(available.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size])
+            if not ids:
+                return total
+            last_id = ids[-1]
+            entries = build_entries(Pet.objects.filter(pk__in=ids))
+            _write(entries)
+            total += len(entries)
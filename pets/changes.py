@@ -0,0 +1,91 @@
+"""
+Delta-sync change feed for pets.
+
+Every pet write appends a ``PetChange`` row from the Pet signals (and from
+the code paths that write with ``update()``/``bulk_create``), so the entry
+commits or rolls back with the write itself; adoption approvals save the
+pet inside their own transaction. The row's auto-increment id is the
+cursor: ``changes_since(cursor)`` returns each pet changed after it once,
+in its current list shape, or as a tombstone when the pet is gone.
+
+Ids are handed out at insert time but become visible at commit, so a
+slower transaction can commit a lower id after a higher one has been
+served. The feed therefore stops in front of a gap in the ids until the
+entries after the gap are ``SETTLE_SECONDS`` old; by then the missing id
+belongs to a transaction that rolled back. ``prune_changes()`` (``manage.py
+prune_pet_changes``) drops old entries; a cursor from before the oldest
+remaining entry is expired and the client has to start over.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Pet, PetChange
+
+RETENTION_DAYS = getattr(settings, 'PET_CHANGE_FEED_RETENTION_DAYS', 30)
+SETTLE_SECONDS = 5
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 1000
+
+
+class CursorExpired(Exception):
+    """The entries after the cursor have been pruned"""
+
+
+def log_changes(pet_ids, action='updated'):
+    """Append feed entries for ``pet_ids`` in the current transaction"""
+    PetChange.objects.bulk_create([PetChange(pet_id=pet_id, action=action) for pet_id in pet_ids])
+
+
+def latest_cursor():
+    return PetChange.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+
+def _settled(entries, since):
+    """The leading run of ``entries`` that no still-open transaction can slip into"""
+    settled_before = timezone.now() - timedelta(seconds=SETTLE_SECONDS)
+    expected = since + 1
+    for i, (change_id, _, _, created_at) in enumerate(entries):
+        if change_id != expected and created_at > settled_before:
+            return entries[:i]
+        expected = change_id + 1
+    return entries
+
+
+def changes_since(since, limit=DEFAULT_LIMIT):
+    """
+    ``(changes, cursor, has_more)`` for feed entries after ``since``.
+    ``changes`` holds ``(action, pet id)`` pairs, newest action per pet, in
+    cursor order; a pet that no longer exists is reported as deleted.
+    """
+    oldest = PetChange.objects.order_by('id').values_list('id', flat=True).first()
+    if oldest is not None and since < oldest - 1:
+        raise CursorExpired()
+
+    fetched = list(
+        PetChange.objects.filter(id__gt=since).order_by('id')
+        .values_list('id', 'pet_id', 'action', 'created_at')[:limit + 1]
+    )
+    entries = _settled(fetched[:limit], since)
+    # When held back at a gap the client should come back later, not right away.
+    has_more = len(fetched) > limit and len(entries) == limit
+    if not entries:
+        return [], since, has_more
+
+    latest = {}
+    for change_id, pet_id, action, _ in entries:
+        latest.pop(pet_id, None)
+        latest[pet_id] = action
+    existing = set(Pet.objects.filter(pk__in=list(latest)).values_list('id', flat=True))
+    changes = [
+        (action if pet_id in existing else 'deleted', pet_id) for pet_id, action in latest.items()
+    ]
+    return changes, entries[-1][0], has_more
+
+
+def prune_changes(older_than_days=RETENTION_DAYS):
+    """Delete entries older than ``older_than_days``, always keeping the newest; returns the count"""
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    deleted, _ = PetChange.objects.filter(created_at__lt=cutoff, id__lt=latest_cursor()).delete()
+    return deleted
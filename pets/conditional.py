@@ -0,0 +1,75 @@
+"""
+ETag / Last-Modified support for the pets API.
+
+Pet validators come from ``Pet.updated_at`` with a primary-key query.
+Listings are fingerprinted without querying the pets at all: every pet
+change bumps the listing generation kept in the cache (see pets.cache), so
+the generation and the query string identify a listing's content. A client
+revalidating an unchanged resource gets a 304 without the pets ever being
+read or serialized.
+"""
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .cache import get_listing_changed_at, get_listing_generation
+from .models import Pet
+
+
+def _timestamp(value):
+    return int(value.timestamp()) if value else None
+
+
+def _listing_timestamp(latest):
+    # A pet leaving a listing (deleted, adopted) does not move the listing's
+    # own max(updated_at), so fold in the time of the last pet change.
+    stamps = [stamp for stamp in (_timestamp(latest), get_listing_changed_at()) if stamp]
+    return max(stamps) if stamps else None
+
+
+def _etag(*parts):
+    digest = hashlib.md5(':'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    # Weak: the tag identifies the data, not the exact bytes of the body.
+    return f'W/"{digest}"'
+
+
+def pet_validators(pk):
+    """(etag, last_modified) for one pet, or (None, None) if it does not exist"""
+    updated_at = Pet.objects.filter(pk=pk).values_list('updated_at', flat=True).first()
+    if updated_at is None:
+        return None, None
+    return _etag('pet', pk, updated_at.isoformat()), _timestamp(updated_at)
+
+
+def listing_validators(request):
+    """Fingerprint a listing by the listing generation, the last pet change and the query string"""
+    # An evicted generation comes back as a fresh one, so the tag can only
+    # change too often, never too rarely.
+    changed_at = get_listing_changed_at()
+    return _etag('list', get_listing_generation(), changed_at or '', request.get_full_path()), changed_at
+
+
+def rows_validators(rows):
+    """Fingerprint a short list of (id, updated_at) pairs"""
+    rows = list(rows)
+    latest = max((updated_at for _, updated_at in rows), default=None)
+    return (
+        _etag('rows', *(f'{pk}@{updated_at.isoformat()}' for pk, updated_at in rows)),
+        _listing_timestamp(latest),
+    )
+
+
+def not_modified(request, etag, last_modified):
+    """Return a 304/412 response if the client's validators still match, else None"""
+    if etag is None:
+        return None
+    return get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+
+def set_validators(response, etag, last_modified):
+    if etag is not None:
+        response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
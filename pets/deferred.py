@@ -0,0 +1,118 @@
+"""
+Deferred work on pets, queued in the database.
+
+Some derived data is too slow to build inside the request that changes a
+pet: image variants, for example. ``queue_work(kind, pet_ids)`` records a
+``PendingPetWork`` row per pet in the caller's transaction, so the work is
+queued exactly when the change commits and survives restarts.
+``process_work()`` (``manage.py process_pet_work``) hands queued pets to the
+handler registered for their kind, in batches, and deletes the rows once it
+succeeds. Run a single worker, e.g. ``process_pet_work --loop``.
+
+Queuing a pet that is already queued bumps the row's ``version``; a worker
+only deletes rows still at the version it read, so a change made while its
+handler ran is processed again on the next pass. A failing batch keeps its
+rows with the error and is retried on later passes, up to ``MAX_ATTEMPTS``.
+
+With ``PET_DEFERRED_WORK_INLINE`` the request also runs its own work right
+after commit. Failures then stay queued for the worker as above.
+"""
+import logging
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import PendingPetWork
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = getattr(settings, 'PET_DEFERRED_WORK_MAX_ATTEMPTS', 5)
+
+# kind -> (handler taking a list of pet ids, pets per call or None for all queued)
+_handlers = {}
+
+
+def register_work(kind, handler, batch_size=None):
+    """Have ``handler(pet_ids)`` process queued work of ``kind``"""
+    _handlers[kind] = (handler, batch_size)
+
+
+def queue_work(kind, pet_ids):
+    """Queue ``kind`` for ``pet_ids`` in the current transaction"""
+    pet_ids = sorted(set(pet_ids))
+    if not pet_ids:
+        return
+    now = timezone.now()
+    PendingPetWork.objects.filter(kind=kind, pet_id__in=pet_ids).update(
+        version=F('version') + 1, queued_at=now, attempts=0, last_error='',
+    )
+    PendingPetWork.objects.bulk_create(
+        [PendingPetWork(kind=kind, pet_id=pet_id, queued_at=now) for pet_id in pet_ids],
+        ignore_conflicts=True,
+    )
+    if getattr(settings, 'PET_DEFERRED_WORK_INLINE', False):
+        transaction.on_commit(lambda: process_work([kind], pet_ids))
+
+
+def pending_work(kinds=None):
+    """Queued work that has not used up its attempts"""
+    rows = PendingPetWork.objects.filter(attempts__lt=MAX_ATTEMPTS)
+    if kinds is not None:
+        rows = rows.filter(kind__in=kinds)
+    return rows
+
+
+def run_batch(kind, pet_ids=None, skip=()):
+    """
+    Process the oldest batch of ``kind`` (only ``pet_ids``, if given; never
+    the rows in ``skip``). Returns the number of pets in the batch and the
+    ids of its rows if it failed.
+    """
+    handler, batch_size = _handlers[kind]
+    rows = pending_work([kind]).exclude(id__in=skip)
+    if pet_ids is not None:
+        rows = rows.filter(pet_id__in=pet_ids)
+    rows = list(rows.order_by('queued_at', 'id').values_list('id', 'pet_id', 'version')[:batch_size])
+    if not rows:
+        return 0, []
+
+    ids = [row_id for row_id, _, _ in rows]
+    try:
+        handler([pet_id for _, pet_id, _ in rows])
+    except Exception as exc:
+        logger.exception('Deferred %s work failed for pets %s', kind, [pet_id for _, pet_id, _ in rows])
+        PendingPetWork.objects.filter(id__in=ids).update(
+            attempts=F('attempts') + 1, last_error=f'{type(exc).__name__}: {exc}',
+        )
+        return len(rows), ids
+
+    by_version = defaultdict(list)
+    for row_id, _, version in rows:
+        by_version[version].append(row_id)
+    for version, row_ids in by_version.items():
+        PendingPetWork.objects.filter(id__in=row_ids, version=version).delete()
+    return len(rows), []
+
+
+def process_work(kinds=None, pet_ids=None):
+    """
+    Drain the queue of ``kinds`` (default: every registered kind), or only
+    the entries of ``pet_ids``. Failed batches are left for the next call.
+    Returns {kind: pets processed}.
+    """
+    processed = {}
+    for kind in kinds or list(_handlers):
+        processed[kind] = 0
+        failed = []
+        while True:
+            count, failed_ids = run_batch(kind, pet_ids, skip=failed)
+            if not count:
+                break
+            if failed_ids:
+                failed.extend(failed_ids)
+            else:
+                processed[kind] += count
+    return processed
@@ -0,0 +1,133 @@
+"""
+Facet counts for the pet filters.
+
+A single grouped query counts pets per (pet_type, gender, status, age,
+breed) for the search scope; every facet is then rolled up in Python while
+ignoring its own filter, so the counts tell the user what each option would
+return given the rest of the current selection. Breeds are counted by their
+normalized ``Breed`` (see pets.breeds), so spellings of one breed add up.
+"""
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.db.models import Count
+
+from .cache import CACHE_TIMEOUT, get_listing_generation
+from .models import Breed, Pet
+from .search import pets_near, search_pets_queryset, tokenize
+
+AGE_BUCKETS = (
+    ('0-1', 0, 1),
+    ('2-3', 2, 3),
+    ('4-7', 4, 7),
+    ('8+', 8, None),
+)
+
+CHOICE_FACETS = {
+    'pet_type': Pet.PET_TYPES,
+    'gender': Pet.GENDER_CHOICES,
+    'status': Pet.STATUS_CHOICES,
+}
+
+
+def age_bucket(age):
+    for label, low, high in AGE_BUCKETS:
+        if age >= low and (high is None or age <= high):
+            return label
+    return None
+
+
+def normalize_selection(params):
+    """Keep only recognised filter values so equivalent requests share a cache entry"""
+    selection = {}
+    for field, choices in CHOICE_FACETS.items():
+        value = params.get(field)
+        if value in dict(choices):
+            selection[field] = value
+    for field in ('breed_id', 'min_age', 'max_age'):
+        try:
+            selection[field] = int(params.get(field))
+        except (TypeError, ValueError):
+            continue
+    return selection
+
+
+def _matches(row, selection, ignore):
+    for field in CHOICE_FACETS:
+        if field != ignore and field in selection and row[field] != selection[field]:
+            return False
+    if ignore != 'breed' and 'breed_id' in selection and row['breed_ref'] != selection['breed_id']:
+        return False
+    if ignore != 'age':
+        if 'min_age' in selection and row['age'] < selection['min_age']:
+            return False
+        if 'max_age' in selection and row['age'] > selection['max_age']:
+            return False
+    return True
+
+
+def compute_facets(queryset, selection):
+    rows = list(
+        queryset.order_by().values('pet_type', 'gender', 'status', 'age', 'breed_ref').annotate(total=Count('id'))
+    )
+    facets = {}
+    for field, choices in CHOICE_FACETS.items():
+        counts = {value: 0 for value, _ in choices}
+        for row in rows:
+            if _matches(row, selection, field):
+                counts[row[field]] = counts.get(row[field], 0) + row['total']
+        facets[field] = counts
+
+    ages = {label: 0 for label, _, _ in AGE_BUCKETS}
+    for row in rows:
+        if _matches(row, selection, 'age'):
+            bucket = age_bucket(row['age'])
+            if bucket:
+                ages[bucket] += row['total']
+    facets['age'] = ages
+
+    breeds = {}
+    for row in rows:
+        if row['breed_ref'] is not None and _matches(row, selection, 'breed'):
+            breeds[row['breed_ref']] = breeds.get(row['breed_ref'], 0) + row['total']
+    names = dict(Breed.objects.filter(pk__in=list(breeds)).values_list('id', 'name'))
+    facets['breed'] = sorted(
+        ({'id': breed_id, 'name': names.get(breed_id, ''), 'count': count} for breed_id, count in breeds.items()),
+        key=lambda item: (-item['count'], item['name']),
+    )
+    return facets
+
+
+def get_facets(params, search=None, available_only=False, near=None):
+    """
+    Facet counts for the given filter params, cached per normalized signature
+    and listing generation so any pet change expires them. ``near`` is an
+    optional (latitude, longitude, radius_km) proximity restriction.
+    """
+    selection = normalize_selection(params)
+    signature = {
+        'search': ' '.join(tokenize(search)),
+        'available_only': available_only,
+        'selection': selection,
+        'near': list(near) if near else None,
+    }
+    digest = hashlib.md5(json.dumps(signature, sort_keys=True).encode('utf-8')).hexdigest()
+    key = f'pets:facets:g{get_listing_generation()}:{digest}'
+
+    facets = cache.get(key)
+    if facets is None:
+        queryset = Pet.objects.all()
+        if available_only:
+            queryset = queryset.filter(status='available')
+        if signature['search']:
+            queryset = search_pets_queryset(queryset, search)
+        if near:
+            queryset = pets_near(queryset, *near)
+        facets = compute_facets(queryset, selection)
+        cache.set(key, facets, CACHE_TIMEOUT)
+    return facets
+
+
+def wants_facets(value):
+    return str(value).lower() in ('1', 'true', 'yes')
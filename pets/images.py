@@ -0,0 +1,169 @@
+"""
+Derivative pipeline for pet photos.
+
+After a pet's image changes, the pet is queued for the deferred-work worker
+(see pets.deferred), which cuts resized JPEG and WebP copies with Pillow and
+records the original's dimensions on the pet. Listings then point browsers
+at a ``srcset`` of small variants instead of the full-size upload. The
+``generate_image_derivatives`` command backfills pets whose variants are
+missing.
+
+Variants are content-addressed blobs (see core.storage) named after the
+original's hash, width and format, so pets sharing a photo share its
+variants and a variant that already exists is not cut again. The files are
+written before the rows that reference them; if that transaction fails
+they stay unreferenced and ``gc_media_blobs`` reclaims them.
+"""
+import hashlib
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from PIL import ExifTags, Image, ImageOps
+
+from core.storage import adjust_blob_references, blob_name, is_blob_name
+
+from .cache import invalidate_pet
+from .catalog import refresh_catalog
+from .changes import log_changes
+from .deferred import queue_work, register_work
+from .models import Pet, PetImageVariant
+
+VARIANT_WIDTHS = getattr(settings, 'PET_IMAGE_VARIANT_WIDTHS', (320, 640, 1280))
+VARIANT_FORMATS = {
+    'jpeg': {'format': 'JPEG', 'extension': 'jpg', 'options': {'quality': 82, 'optimize': True, 'progressive': True}},
+    'webp': {'format': 'WEBP', 'extension': 'webp', 'options': {'quality': 80, 'method': 4}},
+}
+
+def target_widths(original_width):
+    """Variant widths to cut; never upscale, but always produce at least one variant"""
+    widths = [width for width in VARIANT_WIDTHS if width < original_width]
+    return widths or [original_width]
+
+
+def variant_name(digest, width, format_name):
+    """Blob name of the variant of the original with SHA-256 ``digest``"""
+    return blob_name(digest, f"_{width}w.{VARIANT_FORMATS[format_name]['extension']}")
+
+
+def _source_digest(image_file):
+    # Blob names carry the hash; photos stored before deduplication are hashed here.
+    if is_blob_name(image_file.name):
+        return os.path.splitext(os.path.basename(image_file.name))[0]
+    digest = hashlib.sha256()
+    with image_file.open('rb') as original:
+        for chunk in original.chunks():
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _oriented_size(image):
+    """(width, height) after EXIF rotation, read without decoding the pixels"""
+    width, height = image.size
+    if image.getexif().get(ExifTags.Base.Orientation) in (5, 6, 7, 8):
+        return height, width
+    return width, height
+
+
+def _encode(image, width, format_name):
+    spec = VARIANT_FORMATS[format_name]
+    height = max(1, round(image.height * width / image.width))
+    resized = image.resize((width, height), Image.LANCZOS) if width != image.width else image
+    if spec['format'] == 'JPEG' and resized.mode not in ('RGB', 'L'):
+        resized = resized.convert('RGB')
+    buffer = BytesIO()
+    resized.save(buffer, spec['format'], **spec['options'])
+    return buffer.getvalue(), height
+
+
+def generate_derivatives(pet_id):
+    """Cut all variants for one pet; returns the number of variants recorded"""
+    pet = Pet.objects.filter(pk=pet_id).first()
+    if pet is None:
+        return 0
+    if not pet.image:
+        with transaction.atomic():
+            PetImageVariant.objects.filter(pet=pet).delete()
+            # updated_at moves too: it is what the pet's ETag and Last-Modified derive from.
+            Pet.objects.filter(pk=pet.pk).update(image_width=None, image_height=None, updated_at=timezone.now())
+            refresh_catalog([pet.pk])
+            log_changes([pet.pk])
+            invalidate_pet(pet.pk)
+        return 0
+
+    source = pet.image.name
+    storage = PetImageVariant._meta.get_field('image').storage
+    digest = _source_digest(pet.image)
+    with pet.image.open('rb') as original:
+        image = Image.open(original)
+        width, height = _oriented_size(image)
+        planned = [
+            (variant_width, format_name, variant_name(digest, variant_width, format_name))
+            for variant_width in target_widths(width)
+            for format_name in VARIANT_FORMATS
+        ]
+        # Another pet with the same photo may have had these cut already.
+        missing = [plan for plan in planned if not storage.register_existing(plan[2])]
+        if missing:
+            image = ImageOps.exif_transpose(image)
+            image.load()
+            for variant_width, format_name, name in missing:
+                content, _ = _encode(image, variant_width, format_name)
+                storage.save_derived(name, content)
+
+    created = [
+        PetImageVariant(
+            pet=pet, source=source, format=format_name, width=variant_width,
+            height=max(1, round(height * variant_width / width)), file_size=storage.size(name), image=name,
+        )
+        for variant_width, format_name, name in planned
+    ]
+    with transaction.atomic():
+        # Replace whatever was cut from an earlier image in one step.
+        for stale in PetImageVariant.objects.filter(pet=pet):
+            stale.delete()
+        PetImageVariant.objects.bulk_create(created)
+        for variant in created:
+            adjust_blob_references(variant.image.name, 1)
+        Pet.objects.filter(pk=pet.pk).update(image_width=width, image_height=height, updated_at=timezone.now())
+        # None of the writes above send post_save, so the catalog and change feed are updated here.
+        refresh_catalog([pet.pk])
+        log_changes([pet.pk])
+        invalidate_pet(pet.pk)
+    return len(created)
+
+
+def schedule_derivatives(pet_ids):
+    """Queue ``pet_ids`` for variants, in the current transaction"""
+    queue_work('derivatives', pet_ids)
+
+
+def missing_derivatives():
+    """Pets with a photo that has no variants cut from it yet"""
+    current = PetImageVariant.objects.filter(pet=OuterRef('pk'), source=OuterRef('image'))
+    return Pet.objects.exclude(image='').exclude(image__isnull=True).exclude(Exists(current))
+
+
+def schedule_missing_derivatives():
+    """Queue every pet lacking variants"""
+    schedule_derivatives(missing_derivatives().values_list('id', flat=True))
+
+
+def _generate_each(pet_ids):
+    for pet_id in pet_ids:
+        generate_derivatives(pet_id)
+
+
+# One pet per batch, so a photo that cannot be decoded only holds up itself.
+register_work('derivatives', _generate_each, batch_size=1)
+
+
+def build_srcset(variants, build_url):
+    """Map format -> {width: url} for a pet's prefetched variants"""
+    srcset = {}
+    for variant in variants:
+        srcset.setdefault(variant.format, {})[str(variant.width)] = build_url(variant.image.url)
+    return srcset
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from pets.archive import ARCHIVE_AFTER_DAYS, archive_adopted_pets
+
+
+class Command(BaseCommand):
+    help = 'Move long-adopted pets and their adoption requests to the archive tables (run periodically, e.g. from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=ARCHIVE_AFTER_DAYS,
+            help='Archive pets adopted more than this many days ago',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Pets moved per transaction',
+        )
+
+    def handle(self, *args, **options):
+        archived = archive_adopted_pets(options['days'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Archived {archived} adopted pets'))
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from pets.breeds import backfill_breeds, unmatched_breeds
+
+
+class Command(BaseCommand):
+    help = 'Resolve the free-text breed of pets to normalized Breed rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Pets resolved per transaction',
+        )
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Re-resolve every pet, not only those without a breed yet (e.g. after editing aliases)',
+        )
+        parser.add_argument(
+            '--unmatched', action='store_true',
+            help='Only list the breed spellings no alias resolves, with their number of pets',
+        )
+
+    def handle(self, *args, **options):
+        if options['unmatched']:
+            for spelling, count in unmatched_breeds():
+                self.stdout.write(f'{count:>8}  {spelling}')
+            return
+
+        started = time.perf_counter()
+        changed = backfill_breeds(batch_size=options['batch_size'], everything=options['all'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Resolved the breed of {changed} pets in {time.perf_counter() - started:.1f}s'
+        ))
@@ -0,0 +1,77 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from pets.models import Pet
+from pets.serializers import PetListFastSerializer, PetListSerializer
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare PetListSerializer with PetListFastSerializer on generated pets. '
+        'The pets are created inside a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Number of pets to generate')
+        parser.add_argument('--repeat', type=int, default=3, help='Timed runs per serializer (best is reported)')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options['rows'], options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, rows, repeat):
+        owner = User.objects.create(username='__benchmark_shelter__')
+        types = [value for value, _ in Pet.PET_TYPES]
+        genders = [value for value, _ in Pet.GENDER_CHOICES]
+        Pet.objects.bulk_create(
+            [
+                Pet(
+                    name=f'Pet {i}', pet_type=types[i % len(types)], breed='Mixed',
+                    age=i % 15, gender=genders[i % len(genders)], owner=owner,
+                    image=f'pets/pet_{i}.jpg' if i % 2 else '',
+                )
+                for i in range(rows)
+            ],
+            batch_size=1000,
+        )
+        request = Request(APIRequestFactory().get('/api/pets/'))
+        queryset = Pet.objects.filter(owner=owner).order_by('-created_at', '-id')
+        renderer = JSONRenderer()
+
+        def classic():
+            pets = queryset.prefetch_related('image_variants')
+            return PetListSerializer(pets, many=True, context={'request': request}).data
+
+        def fast():
+            return PetListFastSerializer(PetListFastSerializer.values(queryset), context={'request': request}).data
+
+        if renderer.render(classic()) != renderer.render(fast()):
+            raise CommandError('Fast serializer output differs from PetListSerializer')
+
+        results = {}
+        for label, serialize in (('PetListSerializer', classic), ('PetListFastSerializer', fast)):
+            best = None
+            for _ in range(repeat):
+                started = time.perf_counter()
+                serialize()
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            results[label] = rows / best
+            self.stdout.write(f'{label:<24} {rows / best:>12,.0f} rows/sec ({best * 1000:.1f} ms)')
+
+        speedup = results['PetListFastSerializer'] / results['PetListSerializer']
+        self.stdout.write(self.style.SUCCESS(f'Output identical; fast path is {speedup:.1f}x faster'))
@@ -0,0 +1,107 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.pagination import COUNT_MODES, CountModePagination, count_cache_key
+from pets.models import Pet
+from pets.pagination import PetKeysetPagination
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare page latency of the pagination count modes (and keyset pagination) '
+        'on generated pets. The pets are created inside a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Number of pets to generate')
+        parser.add_argument('--pages', type=int, nargs='+', default=[1, 100], help='Page numbers to time')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per page (best is reported)')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options['rows'], options['pages'], options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def generate(self, rows):
+        owner = User.objects.create(username='__benchmark_shelter__')
+        types = [value for value, _ in Pet.PET_TYPES]
+        genders = [value for value, _ in Pet.GENDER_CHOICES]
+        batch = 10000
+        for start in range(0, rows, batch):
+            Pet.objects.bulk_create(
+                [
+                    Pet(
+                        name=f'Pet {i}', pet_type=types[i % len(types)], breed='Mixed',
+                        age=i % 15, gender=genders[i % len(genders)], owner=owner,
+                    )
+                    for i in range(start, min(start + batch, rows))
+                ],
+                batch_size=1000,
+            )
+        if connection.vendor == 'mysql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE TABLE pets_pet')
+        return owner
+
+    def best_of(self, repeat, paginate, queryset):
+        best = None
+        for _ in range(repeat):
+            # Time a cold count cache; the warm case is reported separately.
+            cache.delete(count_cache_key(queryset))
+            started = time.perf_counter()
+            paginate()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def run(self, rows, pages, repeat):
+        started = time.perf_counter()
+        owner = self.generate(rows)
+        self.stdout.write(f'Generated {rows:,} pets in {time.perf_counter() - started:.1f}s')
+        queryset = Pet.objects.filter(owner=owner).order_by('-created_at', '-id')
+        factory = APIRequestFactory()
+
+        header = f'{"mode":<12}' + ''.join(f'{"page " + str(page):>14}' for page in pages)
+        self.stdout.write(header)
+        for mode in COUNT_MODES:
+            timings = []
+            for page in pages:
+                def paginate():
+                    request = Request(factory.get('/api/pets/', {'page': page, 'count_mode': mode}))
+                    paginator = CountModePagination()
+                    paginator.paginate_queryset(queryset, request)
+                    return paginator.get_paginated_response([]).data
+                timings.append(self.best_of(repeat, paginate, queryset))
+            self.stdout.write(f'{mode:<12}' + ''.join(f'{seconds * 1000:>11.1f} ms' for seconds in timings))
+
+        if connection.vendor not in ('mysql', 'postgresql'):
+            self.stdout.write(f'(no planner estimates on {connection.vendor}: "estimated" fell back to "cached")')
+
+        # Pets are listed with keyset pagination: the cost of page n is that of page 1.
+        def keyset():
+            request = Request(factory.get('/api/pets/'))
+            PetKeysetPagination().paginate_queryset(queryset, request)
+        seconds = self.best_of(repeat, keyset, queryset)
+        self.stdout.write(f'{"keyset":<12}{seconds * 1000:>11.1f} ms (any page)')
+
+        # A cached count is paid for once per TTL; show a warm-cache page too.
+        request = Request(factory.get('/api/pets/', {'count_mode': 'cached'}))
+        CountModePagination().paginate_queryset(queryset, request)
+        started = time.perf_counter()
+        CountModePagination().paginate_queryset(queryset, request)
+        self.stdout.write(self.style.SUCCESS(
+            f'cached count, warm: {(time.perf_counter() - started) * 1000:.1f} ms for page 1'
+        ))
@@ -0,0 +1,122 @@
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+
+from accounts.models import UserProfile
+from core.geo import _zip_table, distance_km, grid_cell
+from pets.models import Pet
+from pets.search import pets_near
+
+EARTH_RADIUS_KM = 6371.0
+
+
+class Rollback(Exception):
+    pass
+
+
+def haversine_expression(latitude, longitude):
+    lat = Radians(F('owner__profile__latitude'))
+    lon = Radians(F('owner__profile__longitude'))
+    origin_lat = Radians(Value(latitude, output_field=FloatField()))
+    origin_lon = Radians(Value(longitude, output_field=FloatField()))
+    a = Power(Sin((lat - origin_lat) / 2), 2) + Cos(origin_lat) * Cos(lat) * Power(Sin((lon - origin_lon) / 2), 2)
+    return 2 * EARTH_RADIUS_KM * ASin(Sqrt(a))
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the grid-indexed proximity search with computing haversine on every row. '
+        'The shelters and pets are created inside a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pets', type=int, default=100000, help='Number of pets to generate')
+        parser.add_argument('--shelters', type=int, default=2000, help='Number of shelters to spread them over')
+        parser.add_argument('--radius', type=float, default=50, help='Search radius in km')
+        parser.add_argument('--queries', type=int, default=20, help='Number of random search origins')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(**options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, pets, shelters, radius, queries, seed, **options):
+        rng = random.Random(seed)
+        zips = sorted(_zip_table().items())
+        started = time.perf_counter()
+        User.objects.bulk_create(
+            [User(username=f'__benchmark_shelter_{i}__') for i in range(shelters)], batch_size=1000
+        )
+        # Re-read rather than trust bulk_create() to set primary keys (MySQL doesn't).
+        users = list(User.objects.filter(username__startswith='__benchmark_shelter_').order_by('id'))
+        profiles = []
+        for user in users:
+            zip_code, (latitude, longitude) = rng.choice(zips)
+            profiles.append(UserProfile(
+                user=user, is_shelter=True, zip_code=zip_code,
+                latitude=latitude, longitude=longitude, geo_cell=grid_cell(latitude, longitude),
+            ))
+        UserProfile.objects.bulk_create(profiles, batch_size=1000)
+        types = [value for value, _ in Pet.PET_TYPES]
+        Pet.objects.bulk_create(
+            [
+                Pet(name=f'Pet {i}', pet_type=types[i % len(types)], age=i % 15, gender='unknown',
+                    owner=users[rng.randrange(len(users))])
+                for i in range(pets)
+            ],
+            batch_size=2000,
+        )
+        self.stdout.write(f'Generated {pets:,} pets at {shelters:,} shelters in {time.perf_counter() - started:.1f}s')
+
+        base = Pet.objects.filter(status='available')
+        grid_time = scan_time = 0.0
+        grid_rows = scan_rows = 0
+        mismatched = 0
+        for _ in range(queries):
+            _, (latitude, longitude) = rng.choice(zips)
+
+            started = time.perf_counter()
+            grid = list(
+                pets_near(base, latitude, longitude, radius)
+                .order_by('distance', '-created_at').values_list('id', 'distance')
+            )
+            grid_time += time.perf_counter() - started
+
+            started = time.perf_counter()
+            scan = list(
+                base.annotate(distance_km=haversine_expression(latitude, longitude))
+                .filter(distance_km__lte=radius)
+                .order_by('distance_km', '-created_at').values_list('id', 'distance_km')
+            )
+            scan_time += time.perf_counter() - started
+
+            grid_rows += len(grid)
+            scan_rows += len(scan)
+            # The grid search uses a flat-earth distance; only rows right on
+            # the boundary may legitimately differ.
+            grid_ids = {pk for pk, _ in grid}
+            scan_ids = {pk for pk, _ in scan}
+            boundary = {pk for pk, d in grid if abs(distance_km(d) - radius) < 0.5}
+            boundary |= {pk for pk, d in scan if abs(d - radius) < 0.5}
+            mismatched += len((grid_ids ^ scan_ids) - boundary)
+
+        self.stdout.write(
+            f'{"Grid index":<22} {grid_time / queries * 1000:>9.1f} ms/query  {grid_rows / queries:>8.0f} rows/query'
+        )
+        self.stdout.write(
+            f'{"Haversine every row":<22} {scan_time / queries * 1000:>9.1f} ms/query  {scan_rows / queries:>8.0f} rows/query'
+        )
+        if mismatched:
+            self.stdout.write(self.style.WARNING(f'{mismatched} rows differ away from the radius boundary'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Results agree; grid index is {scan_time / max(grid_time, 1e-9):.1f}x faster at {radius:g} km'
+        ))
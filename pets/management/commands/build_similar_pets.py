@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from pets.deferred import process_work
+from pets.similarity import TOP_K, rebuild_similarity
+
+
+class Command(BaseCommand):
+    help = 'Recompute the feature vectors and "similar pets" neighbour lists for every pet'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top-k', type=int, default=TOP_K,
+            help='Number of suggestions stored per pet',
+        )
+        parser.add_argument(
+            '--incremental', action='store_true',
+            help='Only refresh the pets queued for it since the last run, instead of every pet',
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        if options['incremental']:
+            indexed = process_work(['similarity'])['similarity']
+        else:
+            indexed = rebuild_similarity(k=options['top_k'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Computed similar pets for {indexed} pets in {time.perf_counter() - started:.1f}s'
+        ))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from core.storage import collect_garbage
+
+
+class Command(BaseCommand):
+    help = 'Delete content-addressed media blobs that are no longer referenced'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Number of blobs examined and deleted per batch',
+        )
+        parser.add_argument(
+            '--grace-minutes', type=int, default=60,
+            help='Only delete blobs unreferenced for at least this long (protects in-flight uploads)',
+        )
+
+    def handle(self, *args, **options):
+        removed, freed = collect_garbage(
+            batch_size=options['batch_size'],
+            grace_seconds=options['grace_minutes'] * 60,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Removed {removed} unreferenced blobs ({freed / (1024 * 1024):.1f} MB freed)'
+        ))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from pets.images import generate_derivatives, missing_derivatives
+from pets.models import Pet
+
+
+class Command(BaseCommand):
+    help = 'Generate resized JPEG/WebP variants for pet photos that do not have them yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Regenerate variants for every pet with a photo, not only missing ones',
+        )
+
+    def handle(self, *args, **options):
+        if options['all']:
+            pets = Pet.objects.exclude(image='').exclude(image__isnull=True)
+        else:
+            pets = missing_derivatives()
+
+        processed = failed = 0
+        for pet_id in pets.values_list('id', flat=True).iterator():
+            try:
+                generate_derivatives(pet_id)
+                processed += 1
+            except Exception as exc:
+                failed += 1
+                self.stderr.write(f'Pet {pet_id}: {exc}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated variants for {processed} pets ({failed} failed)'
+        ))
@@ -0,0 +1,52 @@
+import json
+import zipfile
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from pets.bulk_import import ImportFormatError, PetImporter, detect_format
+
+
+class Command(BaseCommand):
+    help = 'Bulk import pets for a shelter from a CSV or JSONL file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSONL file with one pet per row')
+        parser.add_argument('--owner', required=True, help='Username of the shelter that owns the pets')
+        parser.add_argument('--images', help='Zip archive with the photos referenced by the "image" column')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Input format (default: from file extension)')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Pets inserted per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Validate only, do not insert')
+
+    def handle(self, *args, **options):
+        try:
+            owner = User.objects.get(username=options['owner'])
+        except User.DoesNotExist:
+            raise CommandError(f"User \"{options['owner']}\" does not exist")
+
+        try:
+            fmt = detect_format(options['path'], options['format'])
+        except ImportFormatError as exc:
+            raise CommandError(str(exc))
+
+        images = open(options['images'], 'rb') if options['images'] else None
+        try:
+            with open(options['path'], 'rb') as source:
+                importer = PetImporter(
+                    owner, images=images, chunk_size=options['chunk_size'], dry_run=options['dry_run'],
+                )
+                report = importer.run(source, fmt)
+        except zipfile.BadZipFile:
+            raise CommandError(f"\"{options['images']}\" is not a zip archive")
+        except ImportFormatError as exc:
+            raise CommandError(f"{exc} {importer.created} pets were imported before the error.")
+        finally:
+            if images:
+                images.close()
+
+        for error in report['errors']:
+            self.stderr.write(f"Row {error['row']}: {json.dumps(error['errors'])}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report['created']} pets, {report['failed']} rows failed"
+            + (' (dry run)' if report['dry_run'] else '')
+        ))
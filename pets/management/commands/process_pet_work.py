@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from pets.deferred import MAX_ATTEMPTS, process_work
+from pets.models import PendingPetWork
+
+
+class Command(BaseCommand):
+    help = 'Process queued deferred work on pets (run as a single worker with --loop, or from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--kind', action='append', choices=[kind for kind, _ in PendingPetWork.KIND_CHOICES],
+            help='Only process this kind of work (repeatable; default: every kind)',
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep polling the queue instead of exiting once it is drained',
+        )
+        parser.add_argument(
+            '--interval', type=float, default=2.0,
+            help='Seconds between polls with --loop; work queued meanwhile is processed in one batch',
+        )
+        parser.add_argument(
+            '--retry-failed', action='store_true',
+            help=f'First requeue work that failed {MAX_ATTEMPTS} times',
+        )
+
+    def handle(self, *args, **options):
+        if options['retry_failed']:
+            retried = PendingPetWork.objects.filter(attempts__gte=MAX_ATTEMPTS).update(attempts=0)
+            self.stdout.write(f'Requeued {retried} failed entries')
+
+        while True:
+            processed = process_work(options['kind'])
+            if any(processed.values()):
+                done = ', '.join(f'{kind}: {count}' for kind, count in processed.items() if count)
+                self.stdout.write(self.style.SUCCESS(f'Processed {done}'))
+            if not options['loop']:
+                break
+            close_old_connections()
+            time.sleep(options['interval'])
+
+        failed = PendingPetWork.objects.filter(attempts__gt=0).count()
+        if failed:
+            self.stderr.write(f'{failed} entries failed and stay queued; see PendingPetWork.last_error')
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from pets.changes import RETENTION_DAYS, prune_changes
+
+
+class Command(BaseCommand):
+    help = 'Delete old pet change feed entries (run periodically, e.g. from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=RETENTION_DAYS,
+            help='Keep entries from the last this many days',
+        )
+
+    def handle(self, *args, **options):
+        deleted = prune_changes(options['days'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} pet change feed entries'))
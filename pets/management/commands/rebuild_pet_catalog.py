@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from pets.cache import invalidate_listings
+from pets.catalog import rebuild_catalog
+
+
+class Command(BaseCommand):
+    help = 'Recreate the public pet catalog read model (PetCatalogEntry) from the pets tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Pets read per query',
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        total = rebuild_catalog(batch_size=options['batch_size'])
+        invalidate_listings()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt the pet catalog with {total} entries in {time.perf_counter() - started:.1f}s'
+        ))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from pets.statistics import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = 'Recompute pet statistics counters from the pets table (run periodically, e.g. from cron)'
+
+    def handle(self, *args, **options):
+        corrections = reconcile_counters()
+        self.stdout.write(self.style.SUCCESS(
+            f'Reconciled pet statistics ({corrections} counters corrected)'
+        ))
@@ -0,0 +1,34 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    from pets.search import MySQLFullTextSearchBackend, SQLiteFTS5SearchBackend
+
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        SQLiteFTS5SearchBackend().rebuild(pet_model=apps.get_model('pets', 'Pet'))
+    elif vendor == 'mysql':
+        with schema_editor.connection.cursor() as cursor:
+            MySQLFullTextSearchBackend().create_index(cursor)
+
+
+def drop_search_index(apps, schema_editor):
+    from pets.search import MySQLFullTextSearchBackend, SQLiteFTS5SearchBackend
+
+    vendor = schema_editor.connection.vendor
+    with schema_editor.connection.cursor() as cursor:
+        if vendor == 'sqlite':
+            cursor.execute(f'DROP TABLE IF EXISTS {SQLiteFTS5SearchBackend.table}')
+        elif vendor == 'mysql':
+            MySQLFullTextSearchBackend().drop_index(cursor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pets', '0003_pet_pets_pet_status_6b94fc_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
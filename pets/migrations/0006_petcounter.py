@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-18 02:18
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def seed_counters(apps, schema_editor):
+    Pet = apps.get_model('pets', 'Pet')
+    PetCounter = apps.get_model('pets', 'PetCounter')
+    rows = Pet.objects.order_by().values('status', 'pet_type').annotate(total=Count('id'))
+    PetCounter.objects.bulk_create([
+        PetCounter(status=row['status'], pet_type=row['pet_type'], count=row['total'])
+        for row in rows
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pets', '0005_pet_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PetCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('available', 'Available'), ('adopted', 'Adopted'), ('pending', 'Pending')], max_length=20)),
+                ('pet_type', models.CharField(choices=[('dog', 'Dog'), ('cat', 'Cat'), ('bird', 'Bird'), ('fish', 'Fish'), ('rabbit', 'Rabbit'), ('other', 'Other')], max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('status', 'pet_type')},
+            },
+        ),
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+    ]
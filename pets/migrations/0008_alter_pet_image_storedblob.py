@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-18 02:22
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pets', '0007_pet_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pet',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=core.storage.get_blob_storage, upload_to='pets/'),
+        ),
+        migrations.CreateModel(
+            name='StoredBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('size', models.PositiveBigIntegerField(help_text='Size in bytes')),
+                ('ref_count', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['ref_count', 'updated_at'], name='pets_stored_ref_cou_ca1ba7_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-18 02:23
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pets', '0008_alter_pet_image_storedblob'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='petimagevariant',
+            options={'ordering': ['width', 'format']},
+        ),
+    ]
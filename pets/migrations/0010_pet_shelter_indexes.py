@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-18 02:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pets', '0009_alter_petimagevariant_ordering'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pet',
+            index=models.Index(fields=['owner', 'created_at'], name='pets_pet_owner_i_b9df97_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pet',
+            index=models.Index(fields=['owner', 'status', 'created_at'], name='pets_pet_owner_i_f7b31e_idx'),
+        ),
+        # The composite indexes lead with the foreign key, so they replace
+        # its single-column index; create them first so MySQL always has one.
+        migrations.AlterField(
+            model_name='pet',
+            name='owner',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='owned_pets', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.4 on 2026-10-18 02:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pets', '0010_pet_shelter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PetVector',
+            fields=[
+                ('pet', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='vector', serialize=False, to='pets.pet')),
+                ('vector', models.BinaryField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PetNeighbor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField(help_text='Cosine similarity, higher is closer')),
+                ('neighbor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='pets.pet')),
+                ('pet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbor_links', to='pets.pet')),
+            ],
+            options={
+                'ordering': ['rank'],
+                'indexes': [models.Index(fields=['rank', 'score'], name='pets_petnei_rank_325315_idx')],
+                'unique_together': {('pet', 'rank')},
+            },
+        ),
+    ]
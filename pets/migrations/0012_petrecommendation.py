@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-18 02:37
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('pets', '0011_pet_similarity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PetRecommendation',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='pet_recommendation', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('pet_ids', models.JSONField(default=list, help_text='Pet ids, best match first')),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-18 02:41
+
+import core.storage
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pets', '0013_saved_searches'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedPet',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100)),
+                ('pet_type', models.CharField(choices=[('dog', 'Dog'), ('cat', 'Cat'), ('bird', 'Bird'), ('fish', 'Fish'), ('rabbit', 'Rabbit'), ('other', 'Other')], max_length=20)),
+                ('breed', models.CharField(blank=True, max_length=100)),
+                ('age', models.PositiveIntegerField(help_text='Age in years when archived')),
+                ('gender', models.CharField(choices=[('male', 'Male'), ('female', 'Female'), ('unknown', 'Unknown')], max_length=10)),
+                ('description', models.TextField(blank=True)),
+                ('status', models.CharField(choices=[('available', 'Available'), ('adopted', 'Adopted'), ('pending', 'Pending')], default='adopted', max_length=20)),
+                ('image', models.ImageField(blank=True, null=True, storage=core.storage.get_blob_storage, upload_to='pets/')),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('owner', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='archived_pets', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-archived_at'],
+            },
+        ),
+    ]
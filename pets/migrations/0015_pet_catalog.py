@@ -0,0 +1,121 @@
+# Generated by Django 5.2.4 on 2026-10-18 02:47
+
+from django.db import migrations, models
+
+
+def build_catalog(apps, schema_editor):
+    """
+    Fill the catalog from the historical models: pets.catalog works on the
+    current models, whose later columns (breed_ref) do not exist yet here.
+    """
+    from pets.search import MySQLFullTextSearchBackend
+
+    if schema_editor.connection.vendor == 'mysql':
+        with schema_editor.connection.cursor() as cursor:
+            MySQLFullTextSearchBackend().create_index(cursor)
+
+    Pet = apps.get_model('pets', 'Pet')
+    PetCatalogEntry = apps.get_model('pets', 'PetCatalogEntry')
+    PetImageVariant = apps.get_model('pets', 'PetImageVariant')
+    AdoptionRequest = apps.get_model('adoption', 'AdoptionRequest')
+    pet_type_labels = dict(Pet._meta.get_field('pet_type').choices)
+    gender_labels = dict(Pet._meta.get_field('gender').choices)
+    columns = (
+        'id', 'name', 'pet_type', 'breed', 'age', 'gender', 'status', 'description',
+        'image', 'image_width', 'image_height', 'owner_id', 'created_at',
+        'owner__profile__shelter_name', 'owner__profile__latitude',
+        'owner__profile__longitude', 'owner__profile__geo_cell',
+    )
+
+    last_id = 0
+    while True:
+        pets = list(
+            Pet.objects.filter(status='available', id__gt=last_id).order_by('id').values(*columns)[:1000]
+        )
+        if not pets:
+            return
+        last_id = pets[-1]['id']
+        ids = [pet['id'] for pet in pets]
+        photos = {pet['id']: pet['image'] for pet in pets if pet['image']}
+        srcsets = {}
+        variants = (
+            PetImageVariant.objects.filter(pet_id__in=list(photos)).order_by('width', 'format')
+            .values_list('pet_id', 'source', 'format', 'width', 'image')
+        )
+        for pet_id, source, format_name, width, name in variants:
+            if source == photos[pet_id]:
+                srcsets.setdefault(pet_id, {}).setdefault(format_name, {})[str(width)] = name
+        pending = dict(
+            AdoptionRequest.objects.filter(pet_id__in=ids, status='pending')
+            .order_by().values('pet_id').annotate(total=models.Count('id')).values_list('pet_id', 'total')
+        )
+        PetCatalogEntry.objects.bulk_create([
+            PetCatalogEntry(
+                id=pet['id'],
+                name=pet['name'],
+                pet_type=pet['pet_type'],
+                pet_type_display=pet_type_labels.get(pet['pet_type'], pet['pet_type']),
+                breed=pet['breed'],
+                age=pet['age'],
+                gender=pet['gender'],
+                gender_display=gender_labels.get(pet['gender'], pet['gender']),
+                status=pet['status'],
+                description=pet['description'],
+                image=pet['image'] or '',
+                image_width=pet['image_width'],
+                image_height=pet['image_height'],
+                image_srcset=srcsets.get(pet['id'], {}),
+                shelter_id=pet['owner_id'],
+                shelter_name=pet['owner__profile__shelter_name'] or '',
+                latitude=pet['owner__profile__latitude'],
+                longitude=pet['owner__profile__longitude'],
+                geo_cell=pet['owner__profile__geo_cell'],
+                pending_requests=pending.get(pet['id'], 0),
+                created_at=pet['created_at'],
+            )
+            for pet in pets
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_userprofile_location'),
+        ('adoption', '0005_archivedadoptionrequest'),
+        ('pets', '0014_archivedpet'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PetCatalogEntry',
+            fields=[
+                ('id', models.BigIntegerField(help_text="The pet's id", primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100)),
+                ('pet_type', models.CharField(choices=[('dog', 'Dog'), ('cat', 'Cat'), ('bird', 'Bird'), ('fish', 'Fish'), ('rabbit', 'Rabbit'), ('other', 'Other')], max_length=20)),
+                ('pet_type_display', models.CharField(max_length=50)),
+                ('breed', models.CharField(blank=True, max_length=100)),
+                ('age', models.PositiveIntegerField()),
+                ('gender', models.CharField(choices=[('male', 'Male'), ('female', 'Female'), ('unknown', 'Unknown')], max_length=10)),
+                ('gender_display', models.CharField(max_length=50)),
+                ('status', models.CharField(choices=[('available', 'Available'), ('adopted', 'Adopted'), ('pending', 'Pending')], default='available', max_length=20)),
+                ('description', models.TextField(blank=True)),
+                ('image', models.CharField(blank=True, help_text='Storage name of the photo', max_length=255)),
+                ('image_width', models.PositiveIntegerField(blank=True, null=True)),
+                ('image_height', models.PositiveIntegerField(blank=True, null=True)),
+                ('image_srcset', models.JSONField(default=dict, help_text='{format: {width: variant storage name}}')),
+                ('shelter_id', models.BigIntegerField(blank=True, db_index=True, help_text="Owner's user id", null=True)),
+                ('shelter_name', models.CharField(blank=True, max_length=200)),
+                ('latitude', models.FloatField(blank=True, null=True)),
+                ('longitude', models.FloatField(blank=True, null=True)),
+                ('geo_cell', models.IntegerField(blank=True, db_index=True, null=True)),
+                ('pending_requests', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='When this entry was last rebuilt')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['created_at', 'id'], name='pets_petcat_created_b91c0d_idx'), models.Index(fields=['name', 'id'], name='pets_petcat_name_326af4_idx'), models.Index(fields=['age', 'id'], name='pets_petcat_age_7e6dc2_idx'), models.Index(fields=['pet_type', 'created_at', 'id'], name='pets_petcat_pet_typ_990b78_idx')],
+            },
+        ),
+        migrations.RunPython(build_catalog, migrations.RunPython.noop),
+    ]
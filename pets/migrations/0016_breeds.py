@@ -0,0 +1,66 @@
+# Generated by Django 5.2.4 on 2026-10-18 02:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def seed(apps, schema_editor):
+    from pets.breeds import seed_breeds
+
+    seed_breeds(apps.get_model('pets', 'Breed'), apps.get_model('pets', 'BreedAlias'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pets', '0015_pet_catalog'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Breed',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('pet_type', models.CharField(blank=True, choices=[('dog', 'Dog'), ('cat', 'Cat'), ('bird', 'Bird'), ('fish', 'Fish'), ('rabbit', 'Rabbit'), ('other', 'Other')], max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='BreedAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('alias', models.CharField(help_text='Lowercase words separated by single spaces', max_length=100, unique=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='petcatalogentry',
+            name='breed_id',
+            field=models.BigIntegerField(blank=True, help_text="The pet's resolved Breed", null=True),
+        ),
+        migrations.AddIndex(
+            model_name='petcatalogentry',
+            index=models.Index(fields=['breed_id', 'created_at', 'id'], name='pets_petcat_breed_i_8cadcd_idx'),
+        ),
+        migrations.AddField(
+            model_name='pet',
+            name='breed_ref',
+            field=models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='pets', to='pets.breed'),
+        ),
+        migrations.AddIndex(
+            model_name='pet',
+            index=models.Index(fields=['status', 'breed_ref', 'created_at'], name='pets_pet_status_2d0368_idx'),
+        ),
+        migrations.AddField(
+            model_name='breedalias',
+            name='breed',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aliases', to='pets.breed'),
+        ),
+        # Pets are resolved afterwards by manage.py backfill_breeds.
+        migrations.RunPython(seed, migrations.RunPython.noop),
+    ]
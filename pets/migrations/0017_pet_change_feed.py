@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-18 02:59
+
+from django.db import migrations, models
+
+
+def log_existing_pets(apps, schema_editor):
+    """Give clients syncing from cursor 0 every pet that exists today"""
+    Pet = apps.get_model('pets', 'Pet')
+    PetChange = apps.get_model('pets', 'PetChange')
+    pet_ids = Pet.objects.order_by('id').values_list('id', flat=True)
+    PetChange.objects.bulk_create(
+        (PetChange(pet_id=pet_id, action='created') for pet_id in pet_ids.iterator()), batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pets', '0016_breeds'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PetChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('pet_id', models.BigIntegerField()),
+                ('action', models.CharField(choices=[('created', 'Created'), ('updated', 'Updated'), ('adopted', 'Adopted'), ('deleted', 'Deleted')], max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+        migrations.RunPython(log_existing_pets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-18 03:18
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pets', '0017_pet_change_feed'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='petimagevariant',
+            name='image',
+            field=models.ImageField(storage=core.storage.get_blob_storage, upload_to='pets/variants/'),
+        ),
+    ]
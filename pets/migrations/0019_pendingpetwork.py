@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2026-10-18 03:50
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pets', '0018_petimagevariant_blob_storage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingPetWork',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('derivatives', 'Image derivatives'), ('similarity', 'Similar pets'), ('saved_searches', 'Saved-search matching')], max_length=20)),
+                ('pet_id', models.BigIntegerField()),
+                ('queued_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'attempts', 'queued_at'], name='pets_pendin_kind_b26af9_idx')],
+                'unique_together': {('kind', 'pet_id')},
+            },
+        ),
+    ]
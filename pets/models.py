@@ -1,5 +1,7 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
+from django.utils import timezone
+from core.storage import get_blob_storage
 
 class Pet(models.Model):
     PET_TYPES = [
@@ -26,6 +28,11 @@ class Pet(models.Model):
     name = models.CharField(max_length=100)
     pet_type = models.CharField(max_length=20, choices=PET_TYPES)
     breed = models.CharField(max_length=100, blank=True)
+    # Resolved from ``breed`` on save (see pets.breeds); indexed by the
+    # (status, breed_ref, created_at) index in Meta.
+    breed_ref = models.ForeignKey(
+        'Breed', on_delete=models.SET_NULL, related_name='pets', null=True, blank=True, editable=False, db_index=False
+    )
     age = models.PositiveIntegerField(help_text="Age in years")
     
     def clean(self):
@@ -37,17 +44,320 @@ class Pet(models.Model):
     gender = models.CharField(max_length=10, choices=GENDER_CHOICES)
     description = models.TextField(blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='available')
-    image = models.ImageField(upload_to='pets/', blank=True, null=True)
-    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='owned_pets', null=True, blank=True)
+    image = models.ImageField(upload_to='pets/', storage=get_blob_storage, blank=True, null=True)
+    image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    # Indexed by the (owner, ...) composite indexes in Meta instead of on its own.
+    owner = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='owned_pets', null=True, blank=True, db_index=False
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"{self.name} - {self.get_pet_type_display()}"
+
+    def save(self, *args, **kwargs):
+        # Signal handlers write derived rows (catalog entry, change feed);
+        # they commit or roll back together with the pet. delete() already
+        # runs its signals inside a transaction.
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'breed' in update_fields and 'breed_ref' not in update_fields:
+            # The pre_save handler re-resolves breed_ref from breed; save it too.
+            kwargs['update_fields'] = [*update_fields, 'breed_ref']
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
     
     class Meta:
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['status', 'pet_type']),
             models.Index(fields=['created_at']),
+            # Keyset pagination seeks on (status, <ordering field>, id); the
+            # primary key is implicitly the trailing index column.
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['status', 'name']),
+            models.Index(fields=['status', 'age']),
+            models.Index(fields=['status', 'breed_ref', 'created_at']),
+            # Shelter dashboards: a shelter's pets newest first, optionally
+            # narrowed to one status.
+            models.Index(fields=['owner', 'created_at']),
+            models.Index(fields=['owner', 'status', 'created_at']),
+        ]
+
+
+class Breed(models.Model):
+    """Canonical breed; free-text ``Pet.breed`` values resolve to one through BreedAlias"""
+    name = models.CharField(max_length=100, unique=True)
+    pet_type = models.CharField(max_length=20, choices=Pet.PET_TYPES, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        ordering = ['name']
+
+
+class BreedAlias(models.Model):
+    """A normalized spelling of a breed ("lab", "labrador retriever", ...)"""
+    breed = models.ForeignKey(Breed, on_delete=models.CASCADE, related_name='aliases')
+    alias = models.CharField(max_length=100, unique=True, help_text="Lowercase words separated by single spaces")
+
+    def __str__(self):
+        return f"{self.alias} -> {self.breed_id}"
+
+
+class PetCounter(models.Model):
+    """Number of pets per (status, pet_type), maintained by Pet signals"""
+    status = models.CharField(max_length=20, choices=Pet.STATUS_CHOICES)
+    pet_type = models.CharField(max_length=20, choices=Pet.PET_TYPES)
+    count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.status}/{self.pet_type}: {self.count}"
+
+    class Meta:
+        unique_together = ('status', 'pet_type')
+
+
+class PetImageVariant(models.Model):
+    """A resized / re-encoded copy of a pet photo, generated off the request path"""
+    FORMAT_CHOICES = [
+        ('jpeg', 'JPEG'),
+        ('webp', 'WebP'),
+    ]
+
+    pet = models.ForeignKey(Pet, on_delete=models.CASCADE, related_name='image_variants')
+    source = models.CharField(max_length=255, help_text="Name of the original image this was cut from")
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    # Stored as a blob named after the original's hash, so pets sharing a photo share its variants.
+    image = models.ImageField(upload_to='pets/variants/', storage=get_blob_storage)
+    file_size = models.PositiveIntegerField(help_text="Size in bytes")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.pet.name} {self.width}w {self.format}"
+
+    class Meta:
+        unique_together = ('pet', 'format', 'width')
+        ordering = ['width', 'format']
+
+
+class PetVector(models.Model):
+    """Raw feature vector of a pet (float32 bytes), input to the similar-pets index"""
+    pet = models.OneToOneField(Pet, on_delete=models.CASCADE, primary_key=True, related_name='vector')
+    vector = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Vector of {self.pet_id}"
+
+
+class PetNeighbor(models.Model):
+    """One precomputed "you might also like" suggestion for a pet"""
+    pet = models.ForeignKey(Pet, on_delete=models.CASCADE, related_name='neighbor_links')
+    neighbor = models.ForeignKey(Pet, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField(help_text="Cosine similarity, higher is closer")
+
+    def __str__(self):
+        return f"{self.pet_id} ~ {self.neighbor_id} (#{self.rank})"
+
+    class Meta:
+        unique_together = ('pet', 'rank')
+        ordering = ['rank']
+        indexes = [
+            models.Index(fields=['rank', 'score']),
+        ]
+
+
+class PetRecommendation(models.Model):
+    """Ranked candidate pets for one user, rebuilt by ``build_pet_recommendations``"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='pet_recommendation')
+    pet_ids = models.JSONField(default=list, help_text="Pet ids, best match first")
+    computed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Recommendations for {self.user_id}"
+
+
+class SavedSearch(models.Model):
+    """A user's stored ``search_pets`` payload, matched against newly available pets"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='saved_searches')
+    name = models.CharField(max_length=100, blank=True)
+    criteria = models.JSONField(help_text="Validated PetSearchSerializer data")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.name or self.criteria}"
+
+    class Meta:
+        ordering = ['-created_at']
+
+
+class SavedSearchKey(models.Model):
+    """Inverted-index posting: pets with this ``pet_type:gender:age bucket`` key may match the search"""
+    search = models.ForeignKey(SavedSearch, on_delete=models.CASCADE, related_name='keys')
+    key = models.CharField(max_length=50, db_index=True)
+
+    def __str__(self):
+        return f"{self.key} -> {self.search_id}"
+
+    class Meta:
+        unique_together = ('search', 'key')
+
+
+class SavedSearchMatch(models.Model):
+    """An entry in a user's saved-search feed"""
+    search = models.ForeignKey(SavedSearch, on_delete=models.CASCADE, related_name='matches')
+    pet = models.ForeignKey(Pet, on_delete=models.CASCADE, related_name='+')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='saved_search_matches')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.pet_id} matched {self.search_id}"
+
+    class Meta:
+        unique_together = ('search', 'pet')
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'created_at']),
+        ]
+
+
+class PetCatalogEntry(models.Model):
+    """
+    Flat, precomputed listing row for one available pet, maintained by
+    signals (see pets.catalog); public listings read it without joins
+    """
+    id = models.BigIntegerField(primary_key=True, help_text="The pet's id")
+    name = models.CharField(max_length=100)
+    pet_type = models.CharField(max_length=20, choices=Pet.PET_TYPES)
+    pet_type_display = models.CharField(max_length=50)
+    breed = models.CharField(max_length=100, blank=True)
+    breed_id = models.BigIntegerField(null=True, blank=True, help_text="The pet's resolved Breed")
+    age = models.PositiveIntegerField()
+    gender = models.CharField(max_length=10, choices=Pet.GENDER_CHOICES)
+    gender_display = models.CharField(max_length=50)
+    status = models.CharField(max_length=20, choices=Pet.STATUS_CHOICES, default='available')
+    # Only read by full-text search, which matches on name, breed and description.
+    description = models.TextField(blank=True)
+    image = models.CharField(max_length=255, blank=True, help_text="Storage name of the photo")
+    image_width = models.PositiveIntegerField(null=True, blank=True)
+    image_height = models.PositiveIntegerField(null=True, blank=True)
+    image_srcset = models.JSONField(default=dict, help_text="{format: {width: variant storage name}}")
+    shelter_id = models.BigIntegerField(null=True, blank=True, db_index=True, help_text="Owner's user id")
+    shelter_name = models.CharField(max_length=200, blank=True)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    geo_cell = models.IntegerField(null=True, blank=True, db_index=True)
+    pending_requests = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True, help_text="When this entry was last rebuilt")
+
+    def __str__(self):
+        return f"{self.name} - {self.pet_type_display}"
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # Every row is an available pet, so keyset pages seek on
+            # (<ordering field>, id) with no status prefix. id is spelled
+            # out because a non-rowid primary key is not implied on SQLite.
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['name', 'id']),
+            models.Index(fields=['age', 'id']),
+            models.Index(fields=['pet_type', 'created_at', 'id']),
+            models.Index(fields=['breed_id', 'created_at', 'id']),
+        ]
+
+
+class PetChange(models.Model):
+    """One entry of the pet change feed; the auto-increment id is the sync cursor"""
+    ACTION_CHOICES = [
+        ('created', 'Created'),
+        ('updated', 'Updated'),
+        ('adopted', 'Adopted'),
+        ('deleted', 'Deleted'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    pet_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"#{self.pk} {self.action} {self.pet_id}"
+
+
+class PendingPetWork(models.Model):
+    """Derived data still to be built for a pet; queued and drained by pets.deferred"""
+    KIND_CHOICES = [
+        ('derivatives', 'Image derivatives'),
+        ('similarity', 'Similar pets'),
+        ('saved_searches', 'Saved-search matching'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    pet_id = models.BigIntegerField()
+    queued_at = models.DateTimeField(default=timezone.now)
+    # Bumped whenever the work is queued again, so a worker only removes what it has done.
+    version = models.PositiveIntegerField(default=0)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"{self.kind} for {self.pet_id}"
+
+    class Meta:
+        unique_together = ('kind', 'pet_id')
+        indexes = [
+            models.Index(fields=['kind', 'attempts', 'queued_at']),
+        ]
+
+
+class ArchivedPet(models.Model):
+    """A long-adopted pet moved out of the live table by ``archive_adopted_pets``; keeps its original id"""
+    id = models.BigIntegerField(primary_key=True)
+    name = models.CharField(max_length=100)
+    pet_type = models.CharField(max_length=20, choices=Pet.PET_TYPES)
+    breed = models.CharField(max_length=100, blank=True)
+    age = models.PositiveIntegerField(help_text="Age in years when archived")
+    gender = models.CharField(max_length=10, choices=Pet.GENDER_CHOICES)
+    description = models.TextField(blank=True)
+    status = models.CharField(max_length=20, choices=Pet.STATUS_CHOICES, default='adopted')
+    image = models.ImageField(upload_to='pets/', storage=get_blob_storage, blank=True, null=True)
+    owner = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='archived_pets', null=True, blank=True
+    )
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} - {self.get_pet_type_display()} (archived)"
+
+    class Meta:
+        ordering = ['-archived_at']
+
+
+class StoredBlob(models.Model):
+    """A content-addressed media file and the number of fields referencing it"""
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField(help_text="Size in bytes")
+    ref_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} refs)"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['ref_count', 'updated_at']),
         ]
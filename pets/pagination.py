@@ -0,0 +1,153 @@
+"""
+Keyset (cursor) pagination for pet listings.
+
+Each page is fetched with a ``WHERE (field, id) < (last_value, last_id)``
+predicate instead of an OFFSET, and no ``COUNT(*)`` is issued, so deep pages
+cost the same as the first one. The continuation token is an opaque,
+URL-safe encoding of the ordering and the last row's sort key.
+"""
+import base64
+import json
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+# Relevance- and distance-ranked search results have no stable column to
+# seek on, so those pages carry an offset in the cursor instead.
+OFFSET_ORDERINGS = ('search_rank', 'distance')
+
+
+class PetKeysetPagination(BasePagination):
+    """Cursor pagination keyed on (ordering field, id)"""
+
+    cursor_query_param = 'cursor'
+    page_size = settings.REST_FRAMEWORK.get('PAGE_SIZE', 12)
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    default_ordering = '-created_at'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        self.next_cursor = None
+
+        cursor = self.decode_cursor(request)
+        field, descending = self.split_ordering(self.ordering)
+
+        if field in OFFSET_ORDERINGS:
+            offset = self.get_offset(cursor)
+            rows = list(queryset[offset:offset + self.page_size + 1])
+            if len(rows) > self.page_size:
+                self.next_cursor = {'o': self.ordering, 'p': offset + self.page_size}
+            return rows[:self.page_size]
+
+        sort_keys = [self.ordering] if field == 'id' else [self.ordering, '-id' if descending else 'id']
+        queryset = queryset.order_by(*sort_keys)
+        if cursor:
+            queryset = queryset.filter(self.seek_condition(queryset.model, field, descending, cursor))
+
+        rows = list(queryset[:self.page_size + 1])
+        if len(rows) > self.page_size:
+            rows = rows[:self.page_size]
+            self.next_cursor = self.cursor_for(rows[-1], field)
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': None,
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_ordering(self, queryset):
+        order_by = queryset.query.order_by or queryset.model._meta.ordering
+        if order_by and isinstance(order_by[0], str):
+            return order_by[0]
+        return self.default_ordering
+
+    def get_offset(self, cursor):
+        if not cursor:
+            return 0
+        offset = cursor.get('p')
+        if not isinstance(offset, int) or offset < 0:
+            raise NotFound(self.invalid_cursor_message)
+        return offset
+
+    @staticmethod
+    def split_ordering(ordering):
+        return ordering.lstrip('-'), ordering.startswith('-')
+
+    def seek_condition(self, model, field, descending, cursor):
+        if 'v' not in cursor or (field != 'id' and 'id' not in cursor):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            value = model._meta.get_field(field).to_python(cursor['v'])
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+        lookup = 'lt' if descending else 'gt'
+        if field == 'id':
+            return Q(**{f'id__{lookup}': value})
+        return (
+            Q(**{f'{field}__{lookup}': value}) |
+            Q(**{field: value, f'id__{lookup}': cursor.get('id')})
+        )
+
+    def cursor_for(self, row, field):
+        # Rows are model instances, or dicts when the queryset uses .values().
+        if isinstance(row, dict):
+            value, pk = row[field], row['id']
+        else:
+            value, pk = getattr(row, field), row.pk
+        if hasattr(value, 'isoformat'):
+            value = value.isoformat()
+        return {'o': self.ordering, 'v': value, 'id': pk}
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            cursor = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(cursor, dict) or cursor.get('o') != self.ordering:
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    @staticmethod
+    def encode_cursor(cursor):
+        raw = json.dumps(cursor, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_cursor))
@@ -0,0 +1,126 @@
+"""
+Personalized "recommended for you" pets from adoption-request history.
+
+An offline batch job (``manage.py build_pet_recommendations``) sums the
+attribute vectors (pet type, gender, age bucket, breed; see
+``pets.similarity``) of every pet a user applied for into a per-user
+affinity vector. It scores all available pets against it and stores the
+best ``TOP_N`` pet ids in ``PetRecommendation``. Users are streamed from
+the database in chunks and scored by a pool of worker processes
+(``pets.affinity``), so the job spreads over every core and keeps memory
+bounded by the chunk size rather than the number of users. The endpoint
+only reads the stored ids and drops pets that have since been adopted.
+"""
+import multiprocessing
+import os
+from itertools import islice
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from . import affinity
+from .models import Pet, PetRecommendation
+from .similarity import BLOCKS, raw_vector, weight
+
+TOP_N = 50
+ATTRIBUTE_BLOCKS = {name: block for name, block in BLOCKS.items() if name != 'description'}
+ATTRIBUTE_DIMS = BLOCKS['description'].start
+
+
+def attribute_matrix():
+    """(pet ids, available mask, unit attribute vectors) for every pet"""
+    rows = list(Pet.objects.order_by('id').values_list('id', 'status', 'pet_type', 'gender', 'age', 'breed'))
+    ids = np.array([row[0] for row in rows], dtype=np.int64)
+    available = np.array([row[1] == 'available' for row in rows], dtype=bool)
+    raw = np.zeros((len(rows), ATTRIBUTE_DIMS), dtype=np.float32)
+    for i, (_, _, pet_type, gender, age, breed) in enumerate(rows):
+        raw[i] = raw_vector(pet_type, gender, age, breed, '')[:ATTRIBUTE_DIMS]
+    return ids, available, weight(raw, ATTRIBUTE_BLOCKS)
+
+
+def iter_user_chunks(position, chunk_size):
+    """Yield (user_ids, indptr, positions) tasks of ``chunk_size`` users each"""
+    from adoption.models import AdoptionRequest
+
+    last_user = 0
+    while True:
+        users = list(
+            AdoptionRequest.objects.filter(user_id__gt=last_user).order_by('user_id')
+            .values_list('user_id', flat=True).distinct()[:chunk_size]
+        )
+        if not users:
+            return
+        last_user = users[-1]
+        requests = (
+            AdoptionRequest.objects.filter(user_id__gte=users[0], user_id__lte=last_user)
+            .order_by('user_id').values_list('user_id', 'pet_id')
+        )
+        grouped = {}
+        for user_id, pet_id in requests:
+            if pet_id in position:
+                grouped.setdefault(user_id, []).append(position[pet_id])
+        lengths = [len(applied) for applied in grouped.values()]
+        yield (
+            np.array(list(grouped), dtype=np.int64),
+            np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)]),
+            np.array([pos for applied in grouped.values() for pos in applied], dtype=np.int64),
+        )
+
+
+def _store(results, ids):
+    PetRecommendation.objects.bulk_create(
+        [PetRecommendation(user_id=user_id, pet_ids=ids[best].tolist()) for user_id, best in results],
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=['pet_ids', 'computed_at'],
+    )
+
+
+def build_recommendations(workers=None, chunk_size=5000, top_n=TOP_N):
+    """Rebuild every user's recommendations; returns the number of users scored"""
+    started = timezone.now()
+    ids, available, matrix = attribute_matrix()
+    position = {int(pet_id): i for i, pet_id in enumerate(ids)}
+    initargs = (matrix, np.flatnonzero(available), top_n)
+    workers = workers or os.cpu_count() or 1
+    tasks = iter_user_chunks(position, chunk_size)
+
+    scored = 0
+    pool = None
+    if workers > 1:
+        pool = multiprocessing.Pool(workers, affinity.init_worker, initargs)
+        score = pool.imap
+    else:
+        affinity.init_worker(*initargs)
+        score = map
+    try:
+        # Read a few chunks per worker at a time, so database access stays on
+        # this thread and memory stays bounded.
+        while True:
+            batch = list(islice(tasks, workers * 2))
+            if not batch:
+                break
+            for results in score(affinity.score_users, batch):
+                with transaction.atomic():
+                    _store(results, ids)
+                scored += len(results)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    # Users who no longer have any adoption requests.
+    PetRecommendation.objects.filter(computed_at__lt=started).delete()
+    return scored
+
+
+def recommended_pet_ids(user, limit):
+    """The user's stored recommendations that are still available, best first"""
+    record = PetRecommendation.objects.filter(user=user).values_list('pet_ids', flat=True).first()
+    if not record:
+        return None
+    rank = {pet_id: i for i, pet_id in enumerate(record)}
+    available = Pet.objects.filter(pk__in=record, status='available').values_list('id', flat=True)
+    return sorted(available, key=rank.__getitem__)[:limit]
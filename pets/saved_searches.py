@@ -0,0 +1,124 @@
+"""
+Saved searches and incremental matching of newly available pets.
+
+Each saved search is indexed (``SavedSearchKey``) under every
+``pet_type:gender:age bucket`` combination its criteria allow. A search that
+leaves a field open is posted under every value of it, so there are at most
+6 x 3 x 4 postings per search. When a pet is listed or becomes available,
+its own key is looked up in that index. Only the searches it returns have
+their remaining criteria checked: exact ages, status, distance and
+full-text. Matches go to the searcher's feed (``SavedSearchMatch``).
+The cost of matching a pet therefore grows with the number of relevant
+searches, not with the number of saved searches. ``schedule_matching()``
+queues the pets as deferred work (see pets.deferred), so they are matched
+off the request that listed them.
+"""
+from collections import defaultdict
+
+from core.geo import approximate_distance_km, zip_centroid
+
+from .deferred import queue_work, register_work
+from .facets import AGE_BUCKETS, age_bucket
+from .models import Pet, SavedSearch, SavedSearchKey, SavedSearchMatch
+from .search import search_pets_queryset, tokenize
+
+def pet_key(pet_type, gender, age):
+    return f'{pet_type}:{gender}:{age_bucket(age)}'
+
+
+def search_keys(criteria):
+    """Every pet key a pet matching ``criteria`` could have"""
+    pet_types = [criteria['pet_type']] if criteria.get('pet_type') else [value for value, _ in Pet.PET_TYPES]
+    genders = [criteria['gender']] if criteria.get('gender') else [value for value, _ in Pet.GENDER_CHOICES]
+    min_age, max_age = criteria.get('min_age'), criteria.get('max_age')
+    buckets = [
+        label for label, low, high in AGE_BUCKETS
+        if (max_age is None or low <= max_age) and (min_age is None or high is None or high >= min_age)
+    ]
+    return [f'{pet_type}:{gender}:{bucket}' for pet_type in pet_types for gender in genders for bucket in buckets]
+
+
+def index_saved_search(search):
+    """(Re)write the inverted-index postings of one saved search"""
+    SavedSearchKey.objects.filter(search=search).delete()
+    SavedSearchKey.objects.bulk_create(
+        [SavedSearchKey(search=search, key=key) for key in search_keys(search.criteria)]
+    )
+
+
+def _matches(criteria, pet):
+    """Check everything but the full-text part of ``criteria`` against a pet row"""
+    if criteria.get('status') and criteria['status'] != pet['status']:
+        return False
+    if criteria.get('breed_id') and criteria['breed_id'] != pet['breed_ref_id']:
+        return False
+    if criteria.get('min_age') is not None and pet['age'] < criteria['min_age']:
+        return False
+    if criteria.get('max_age') is not None and pet['age'] > criteria['max_age']:
+        return False
+    if criteria.get('near_zip'):
+        origin = zip_centroid(criteria['near_zip'])
+        latitude, longitude = pet['owner__profile__latitude'], pet['owner__profile__longitude']
+        if origin is None or latitude is None:
+            return False
+        if approximate_distance_km(*origin, latitude, longitude) > criteria.get('radius_km', 50):
+            return False
+    return True
+
+
+def match_pets(pet_ids):
+    """Add the given pets to the feeds of every saved search they satisfy; returns the match count"""
+    pets = list(
+        Pet.objects.filter(pk__in=pet_ids, status='available').values(
+            'id', 'pet_type', 'gender', 'age', 'status', 'breed_ref_id',
+            'owner__profile__latitude', 'owner__profile__longitude',
+        )
+    )
+    pets_by_key = defaultdict(list)
+    for pet in pets:
+        pets_by_key[pet_key(pet['pet_type'], pet['gender'], pet['age'])].append(pet)
+    if not pets_by_key:
+        return 0
+
+    postings = SavedSearchKey.objects.filter(key__in=list(pets_by_key)).values_list('key', 'search_id')
+    candidates = defaultdict(list)
+    for key, search_id in postings:
+        candidates[search_id].extend(pets_by_key[key])
+    searches = SavedSearch.objects.in_bulk(list(candidates))
+
+    matched = []
+    text_checks = defaultdict(list)
+    for search_id, search in searches.items():
+        for pet in candidates[search_id]:
+            if not _matches(search.criteria, pet):
+                continue
+            if tokenize(search.criteria.get('search')):
+                text_checks[search.criteria['search']].append((search, pet['id']))
+            else:
+                matched.append((search, pet['id']))
+
+    # One full-text query per distinct search string, over just the candidate pets.
+    for text, pairs in text_checks.items():
+        hits = set(
+            search_pets_queryset(Pet.objects.filter(pk__in={pet_id for _, pet_id in pairs}), text)
+            .values_list('id', flat=True)
+        )
+        matched.extend((search, pet_id) for search, pet_id in pairs if pet_id in hits)
+
+    SavedSearchMatch.objects.bulk_create(
+        [SavedSearchMatch(search=search, pet_id=pet_id, user_id=search.user_id) for search, pet_id in matched],
+        ignore_conflicts=True,
+    )
+    return len(matched)
+
+
+def schedule_matching(pet_ids):
+    """Queue ``pet_ids`` for matching against saved searches, in the current transaction"""
+    queue_work('saved_searches', pet_ids)
+
+
+def _match_queued(pet_ids):
+    match_pets(pet_ids)
+
+
+register_work('saved_searches', _match_queued, batch_size=500)
@@ -0,0 +1,274 @@
+"""
+Full-text search for pet listings.
+
+Development (SQLite) keeps an FTS5 shadow table in sync with ``pets_pet``;
+production (MySQL) relies on an InnoDB FULLTEXT index over the same columns.
+Both backends return matching pets annotated with ``search_rank`` where a
+lower value means a better match, so callers can simply ``order_by`` it.
+They filter ``PetCatalogEntry`` querysets (see pets.catalog) the same way,
+since catalog rows carry the pet's id and searchable columns.
+"""
+import re
+from abc import ABC, abstractmethod
+
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import Q, Value
+from django.utils.module_loading import import_string
+from rest_framework import filters
+
+from accounts.models import UserProfile
+from core.geo import squared_distance_expression, within_radius
+
+SEARCH_COLUMNS = ('name', 'breed', 'description')
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(query):
+    """Split a raw search string into lowercase word tokens"""
+    return [token.lower() for token in TOKEN_RE.findall(query or '')]
+
+
+def index_connection(pet_model=None, instance=None):
+    """The connection the index of ``pet_model`` (default: Pet) is written through"""
+    from .models import Pet
+
+    return connections[router.db_for_write(pet_model or Pet, instance=instance)]
+
+
+class BaseSearchBackend(ABC):
+    """Common interface for the pet full-text search backends"""
+
+    @abstractmethod
+    def filter(self, queryset, query):
+        """Restrict ``queryset`` to matches of ``query``, annotated with ``search_rank``"""
+
+    def index_pet(self, pet):
+        """Add or refresh a single pet in the index"""
+
+    def index_pets(self, pets):
+        """Add freshly inserted pets to the index"""
+        for pet in pets:
+            self.index_pet(pet)
+
+    def remove_pet(self, pet_id):
+        """Drop a single pet from the index"""
+
+    def rebuild(self, batch_size=1000, pet_model=None):
+        """
+        Rebuild the whole index and return the number of indexed pets;
+        migrations pass their historical Pet model as ``pet_model``
+        """
+        return 0
+
+
+class IContainsSearchBackend(BaseSearchBackend):
+    """Fallback for databases without a supported full-text engine"""
+
+    def filter(self, queryset, query):
+        condition = Q()
+        for token in tokenize(query):
+            token_match = Q()
+            for column in SEARCH_COLUMNS:
+                token_match |= Q(**{f'{column}__icontains': token})
+            condition &= token_match
+        return queryset.filter(condition).annotate(search_rank=Value(0.0))
+
+
+class SQLiteFTS5SearchBackend(BaseSearchBackend):
+    """FTS5 virtual table keyed by pet id and ranked with bm25()"""
+
+    table = 'pets_pet_fts'
+    # bm25() column weights: a name hit outranks a breed hit, which
+    # outranks a mention somewhere in the description.
+    weights = (10.0, 5.0, 1.0)
+
+    def build_match(self, query):
+        tokens = tokenize(query)
+        # Every token must appear; the trailing * gives prefix matching so
+        # results update while the user is still typing.
+        return ' AND '.join(f'"{token}"*' for token in tokens)
+
+    def filter(self, queryset, query):
+        match = self.build_match(query)
+        if not match:
+            return queryset.annotate(search_rank=Value(0.0))
+        weights = ', '.join(str(weight) for weight in self.weights)
+        # The index is keyed by pet id, which is also the catalog's primary key.
+        pets_table = queryset.model._meta.db_table
+        return queryset.extra(
+            select={'search_rank': f'bm25({self.table}, {weights})'},
+            tables=[self.table],
+            where=[f'{self.table}.rowid = {pets_table}.id', f'{self.table} MATCH %s'],
+            params=[match],
+        )
+
+    def create_table(self, cursor):
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} USING fts5("
+            f"{', '.join(SEARCH_COLUMNS)}, "
+            f"tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+
+    def index_pet(self, pet):
+        with index_connection(type(pet), pet).cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [pet.pk])
+            cursor.execute(
+                f"INSERT INTO {self.table} (rowid, {', '.join(SEARCH_COLUMNS)}) "
+                f"VALUES (%s, %s, %s, %s)",
+                [pet.pk, pet.name, pet.breed, pet.description],
+            )
+
+    def index_pets(self, pets):
+        with index_connection().cursor() as cursor:
+            self._insert_batch(cursor, [
+                (pet.pk, pet.name, pet.breed, pet.description) for pet in pets
+            ])
+
+    def remove_pet(self, pet_id):
+        with index_connection().cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [pet_id])
+
+    def rebuild(self, batch_size=1000, pet_model=None):
+        from .models import Pet
+
+        pet_model = pet_model or Pet
+        indexed = 0
+        with index_connection(pet_model).cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {self.table}')
+            self.create_table(cursor)
+            rows = pet_model.objects.using(cursor.db.alias).order_by().values_list('id', *SEARCH_COLUMNS)
+            batch = []
+            for row in rows.iterator(chunk_size=batch_size):
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    indexed += self._insert_batch(cursor, batch)
+                    batch = []
+            if batch:
+                indexed += self._insert_batch(cursor, batch)
+            cursor.execute(f"INSERT INTO {self.table} ({self.table}) VALUES ('optimize')")
+        return indexed
+
+    def _insert_batch(self, cursor, batch):
+        cursor.executemany(
+            f"INSERT INTO {self.table} (rowid, {', '.join(SEARCH_COLUMNS)}) "
+            f"VALUES (%s, %s, %s, %s)",
+            batch,
+        )
+        return len(batch)
+
+
+class MySQLFullTextSearchBackend(BaseSearchBackend):
+    """InnoDB FULLTEXT indexes maintained by MySQL itself"""
+
+    index_name = 'pets_pet_fulltext'
+    # MATCH() can only use an index on the table being queried.
+    tables = ('pets_pet', 'pets_petcatalogentry')
+
+    def build_match(self, query):
+        # Boolean mode: +token* requires each token and allows prefixes.
+        return ' '.join(f'+{token}*' for token in tokenize(query))
+
+    def filter(self, queryset, query):
+        match = self.build_match(query)
+        if not match:
+            return queryset.annotate(search_rank=Value(0.0))
+        against = f"MATCH ({', '.join(SEARCH_COLUMNS)}) AGAINST (%s IN BOOLEAN MODE)"
+        # MATCH() scores grow with relevance; negate so that ascending
+        # search_rank means "best first" for every backend.
+        return queryset.extra(
+            select={'search_rank': f'-{against}'},
+            select_params=[match],
+            where=[against],
+            params=[match],
+        )
+
+    def index_exists(self, cursor, table='pets_pet'):
+        cursor.execute(
+            "SELECT COUNT(*) FROM information_schema.statistics "
+            "WHERE table_schema = DATABASE() AND table_name = %s "
+            "AND index_name = %s",
+            [table, self.index_name],
+        )
+        return bool(cursor.fetchone()[0])
+
+    def _existing_tables(self, cursor):
+        existing = set(cursor.db.introspection.table_names(cursor))
+        return [table for table in self.tables if table in existing]
+
+    def create_index(self, cursor):
+        for table in self._existing_tables(cursor):
+            if not self.index_exists(cursor, table):
+                cursor.execute(
+                    f"ALTER TABLE {table} ADD FULLTEXT INDEX {self.index_name} "
+                    f"({', '.join(SEARCH_COLUMNS)})"
+                )
+
+    def drop_index(self, cursor):
+        for table in self._existing_tables(cursor):
+            if self.index_exists(cursor, table):
+                cursor.execute(f'ALTER TABLE {table} DROP INDEX {self.index_name}')
+
+    def rebuild(self, batch_size=1000, pet_model=None):
+        from .models import Pet
+
+        pet_model = pet_model or Pet
+        with index_connection(pet_model).cursor() as cursor:
+            self.drop_index(cursor)
+            self.create_index(cursor)
+            return pet_model.objects.using(cursor.db.alias).count()
+
+
+VENDOR_BACKENDS = {
+    'sqlite': SQLiteFTS5SearchBackend,
+    'mysql': MySQLFullTextSearchBackend,
+}
+
+_backend = None
+
+
+def get_search_backend():
+    """Return the configured search backend, chosen by database vendor by default"""
+    global _backend
+    if _backend is None:
+        backend_path = getattr(settings, 'PET_SEARCH_BACKEND', None)
+        if backend_path:
+            backend_class = import_string(backend_path)
+        else:
+            backend_class = VENDOR_BACKENDS.get(index_connection().vendor, IContainsSearchBackend)
+        _backend = backend_class()
+    return _backend
+
+
+def search_pets_queryset(queryset, query):
+    """Restrict ``queryset`` to pets matching ``query``, annotated with search_rank"""
+    return get_search_backend().filter(queryset, query)
+
+
+def pets_near(queryset, latitude, longitude, radius_km):
+    """
+    Restrict ``queryset`` to pets whose owner's ZIP code lies within
+    ``radius_km``, annotated with ``distance`` (see core.geo.distance_km)
+    """
+    # Resolving the few nearby shelters first lets the planner reach their
+    # pets through the (owner, status, created_at) index.
+    owners = within_radius(UserProfile.objects.all(), '', latitude, longitude, radius_km).values('user_id')
+    return queryset.filter(owner_id__in=owners).annotate(
+        distance=squared_distance_expression('owner__profile__', latitude, longitude)
+    )
+
+
+class PetSearchFilter(filters.SearchFilter):
+    """
+    Drop-in replacement for SearchFilter backed by the full-text index.
+    Results are ranked by relevance unless the client asked for an ordering.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '')
+        if not tokenize(query):
+            return queryset
+        queryset = search_pets_queryset(queryset, query)
+        if not request.query_params.get(filters.OrderingFilter.ordering_param):
+            queryset = queryset.order_by('search_rank', '-created_at')
+        return queryset
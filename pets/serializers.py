@@ -1,24 +1,37 @@
 from rest_framework import serializers
-from .models import Pet
+from django.utils.encoding import filepath_to_uri
+from core.geo import MAX_RADIUS_KM, zip_centroid
+from core.sparse import SparseFieldsMixin, ordering_columns
+from .images import build_srcset
+from .models import Pet, PetImageVariant, SavedSearch, SavedSearchMatch
 from django.contrib.auth.models import User
 
+def get_image_srcset(pet, request):
+    """Variants of the pet's current photo as {format: {width: absolute url}}"""
+    if not pet.image or request is None:
+        return {}
+    variants = [v for v in pet.image_variants.all() if v.source == pet.image.name]
+    return build_srcset(variants, request.build_absolute_uri)
+
 class UserBasicSerializer(serializers.ModelSerializer):
     """Basic user serializer for pet ownership"""
     class Meta:
         model = User
         fields = ['id', 'username', 'first_name', 'last_name']
 
-class PetSerializer(serializers.ModelSerializer):
+class PetSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Main pet serializer"""
     owner = UserBasicSerializer(read_only=True)
     image_url = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
+    field_columns = {'image_url': ['image'], 'image_srcset': ['image']}
     
     class Meta:
         model = Pet
         fields = [
             'id', 'name', 'pet_type', 'breed', 'age', 'gender', 
-            'description', 'status', 'image', 'image_url', 'owner',
-            'created_at', 'updated_at'
+            'description', 'status', 'image', 'image_url', 'image_width',
+            'image_height', 'image_srcset', 'owner', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at', 'owner']
 
@@ -29,6 +42,9 @@ class PetSerializer(serializers.ModelSerializer):
                 return request.build_absolute_uri(obj.image.url)
         return None
 
+    def get_image_srcset(self, obj):
+        return get_image_srcset(obj, self.context.get('request'))
+
 class PetCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating pets (admin only)"""
     class Meta:
@@ -79,17 +95,20 @@ class PetUpdateSerializer(serializers.ModelSerializer):
             'description', 'status', 'image'
         ]
 
-class PetListSerializer(serializers.ModelSerializer):
+class PetListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Simplified serializer for pet listings"""
     image_url = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
     pet_type_display = serializers.CharField(source='get_pet_type_display', read_only=True)
     gender_display = serializers.CharField(source='get_gender_display', read_only=True)
+    field_columns = {'image_url': ['image'], 'image_srcset': ['image']}
     
     class Meta:
         model = Pet
         fields = [
             'id', 'name', 'pet_type', 'pet_type_display', 'breed', 'age', 
-            'gender', 'gender_display', 'status', 'image_url', 'created_at'
+            'gender', 'gender_display', 'status', 'image_url', 'image_width',
+            'image_height', 'image_srcset', 'created_at'
         ]
 
     def get_image_url(self, obj):
@@ -99,12 +118,254 @@ class PetListSerializer(serializers.ModelSerializer):
                 return request.build_absolute_uri(obj.image.url)
         return None
 
+    def get_image_srcset(self, obj):
+        return get_image_srcset(obj, self.context.get('request'))
+
+class PetListFastSerializer:
+    """
+    Plain-dict equivalent of PetListSerializer for list endpoints.
+
+    Works on ``.values(*columns)`` rows, resolves choice labels through dicts,
+    builds absolute media URLs from a prefix computed once per request and
+    loads image variants for the whole page in one query. The output is
+    identical to PetListSerializer(many=True).data. With ``context['fields']``
+    (see core.sparse) only those fields are output and only the columns they
+    need, per ``field_columns``, are selected.
+    """
+    columns = (
+        'id', 'name', 'pet_type', 'breed', 'age', 'gender', 'status',
+        'image', 'image_width', 'image_height', 'created_at'
+    )
+    # Output fields, in order, and the columns each is built from.
+    field_columns = {
+        'id': ['id'], 'name': ['name'], 'pet_type': ['pet_type'], 'pet_type_display': ['pet_type'],
+        'breed': ['breed'], 'age': ['age'], 'gender': ['gender'], 'gender_display': ['gender'],
+        'status': ['status'], 'image_url': ['image'], 'image_width': ['image_width'],
+        'image_height': ['image_height'], 'image_srcset': ['image'], 'created_at': ['created_at'],
+    }
+    pet_type_labels = dict(Pet.PET_TYPES)
+    gender_labels = dict(Pet.GENDER_CHOICES)
+    created_at_field = serializers.DateTimeField()
+
+    def __init__(self, rows, context=None):
+        self.rows = list(rows)
+        self.context = context or {}
+        self.fields = self.context.get('fields')
+
+    @classmethod
+    def values(cls, queryset, fields=None):
+        """Turn a Pet queryset into the dict rows this serializer consumes"""
+        query = queryset.query
+        # Keep a computed search rank or distance selectable so it can still be ordered on.
+        ranked = [name for name in ('search_rank', 'distance') if name in query.extra_select or name in query.annotations]
+        columns = cls.columns
+        if fields is not None:
+            # id locates image variants; cursor pagination reads id and the ordering columns back.
+            needed = [column for name in fields for column in cls.field_columns[name]]
+            columns = list(dict.fromkeys(['id', *needed, *ordering_columns(queryset)]))
+        return queryset.prefetch_related(None).values(*columns, *ranked)
+
+    def _select(self, data):
+        """Keep only the requested fields of each item"""
+        if self.fields is None:
+            return data
+        fields = self.fields
+        return [{name: item[name] for name in fields} for item in data]
+
+    def _wants(self, name):
+        return self.fields is None or name in self.fields
+
+    @staticmethod
+    def _url_prefix(request, storage):
+        return request.build_absolute_uri(storage.base_url)
+
+    @staticmethod
+    def _join(prefix, name):
+        return prefix + filepath_to_uri(name).lstrip('/')
+
+    def _variants_by_pet(self, request, pet_ids):
+        variants = {}
+        if not pet_ids:
+            return variants
+        prefix = self._url_prefix(request, PetImageVariant._meta.get_field('image').storage)
+        rows = (
+            PetImageVariant.objects.filter(pet_id__in=pet_ids)
+            .order_by('width', 'format')
+            .values_list('pet_id', 'source', 'format', 'width', 'image')
+        )
+        for pet_id, source, format_name, width, name in rows:
+            variants.setdefault(pet_id, []).append((source, format_name, width, name))
+        return {pet_id: (prefix, items) for pet_id, items in variants.items()}
+
+    @property
+    def data(self):
+        request = self.context.get('request')
+        image_prefix = None
+        variants = {}
+        if request is not None:
+            image_prefix = self._url_prefix(request, Pet._meta.get_field('image').storage)
+            if self._wants('image_srcset'):
+                variants = self._variants_by_pet(request, [row['id'] for row in self.rows if row.get('image')])
+
+        pet_type_labels = self.pet_type_labels
+        gender_labels = self.gender_labels
+        format_datetime = self.created_at_field.to_representation
+        join = self._join
+
+        data = []
+        for row in self.rows:
+            # Columns of fields left out by context['fields'] are not selected.
+            image = row.get('image')
+            image_url = None
+            srcset = {}
+            if image and image_prefix is not None:
+                image_url = join(image_prefix, image)
+                if row['id'] in variants:
+                    prefix, items = variants[row['id']]
+                    for source, format_name, width, name in items:
+                        if source == image:
+                            srcset.setdefault(format_name, {})[str(width)] = join(prefix, name)
+            created_at = row.get('created_at')
+            data.append({
+                'id': row['id'],
+                'name': row.get('name'),
+                'pet_type': row.get('pet_type'),
+                'pet_type_display': pet_type_labels.get(row.get('pet_type'), row.get('pet_type')),
+                'breed': row.get('breed'),
+                'age': row.get('age'),
+                'gender': row.get('gender'),
+                'gender_display': gender_labels.get(row.get('gender'), row.get('gender')),
+                'status': row.get('status'),
+                'image_url': image_url,
+                'image_width': row.get('image_width'),
+                'image_height': row.get('image_height'),
+                'image_srcset': srcset,
+                'created_at': format_datetime(created_at) if created_at is not None else None,
+            })
+        return self._select(data)
+
+class PetCatalogSerializer(PetListFastSerializer):
+    """
+    List serializer for PetCatalogEntry rows (see pets.catalog).
+
+    Labels, variant names, shelter name and pending-request count are
+    stored on the row; only the media URL prefix depends on the request.
+    Output is that of PetListSerializer plus ``shelter_name`` and
+    ``pending_requests``.
+    """
+    columns = (
+        'id', 'name', 'pet_type', 'pet_type_display', 'breed', 'age', 'gender',
+        'gender_display', 'status', 'image', 'image_width', 'image_height',
+        'image_srcset', 'shelter_name', 'pending_requests', 'created_at'
+    )
+    field_columns = {
+        'id': ['id'], 'name': ['name'], 'pet_type': ['pet_type'], 'pet_type_display': ['pet_type_display'],
+        'breed': ['breed'], 'age': ['age'], 'gender': ['gender'], 'gender_display': ['gender_display'],
+        'status': ['status'], 'image_url': ['image'], 'image_width': ['image_width'],
+        'image_height': ['image_height'], 'image_srcset': ['image', 'image_srcset'],
+        'shelter_name': ['shelter_name'], 'pending_requests': ['pending_requests'], 'created_at': ['created_at'],
+    }
+
+    @property
+    def data(self):
+        request = self.context.get('request')
+        image_prefix = variant_prefix = None
+        if request is not None:
+            image_prefix = self._url_prefix(request, Pet._meta.get_field('image').storage)
+            variant_prefix = self._url_prefix(request, PetImageVariant._meta.get_field('image').storage)
+
+        format_datetime = self.created_at_field.to_representation
+        join = self._join
+
+        data = []
+        for row in self.rows:
+            # Columns of fields left out by context['fields'] are not selected.
+            image = row.get('image')
+            image_url = None
+            srcset = {}
+            if image and image_prefix is not None:
+                image_url = join(image_prefix, image)
+                srcset = {
+                    format_name: {width: join(variant_prefix, name) for width, name in widths.items()}
+                    for format_name, widths in (row.get('image_srcset') or {}).items()
+                }
+            created_at = row.get('created_at')
+            data.append({
+                'id': row['id'],
+                'name': row.get('name'),
+                'pet_type': row.get('pet_type'),
+                'pet_type_display': row.get('pet_type_display'),
+                'breed': row.get('breed'),
+                'age': row.get('age'),
+                'gender': row.get('gender'),
+                'gender_display': row.get('gender_display'),
+                'status': row.get('status'),
+                'image_url': image_url,
+                'image_width': row.get('image_width'),
+                'image_height': row.get('image_height'),
+                'image_srcset': srcset,
+                'shelter_name': row.get('shelter_name'),
+                'pending_requests': row.get('pending_requests'),
+                'created_at': format_datetime(created_at) if created_at is not None else None,
+            })
+        return self._select(data)
+
 class PetSearchSerializer(serializers.Serializer):
     """Serializer for pet search parameters"""
     search = serializers.CharField(required=False, help_text="Search in name, breed, or description")
     pet_type = serializers.ChoiceField(choices=Pet.PET_TYPES, required=False)
     gender = serializers.ChoiceField(choices=Pet.GENDER_CHOICES, required=False)
+    breed_id = serializers.IntegerField(required=False, min_value=1, help_text="Id of a normalized breed")
     status = serializers.ChoiceField(choices=Pet.STATUS_CHOICES, required=False)
     min_age = serializers.IntegerField(required=False, min_value=0)
     max_age = serializers.IntegerField(required=False, min_value=0)
-    ordering = serializers.CharField(required=False, help_text="Order by: name, age, created_at") 
\ No newline at end of file
+    ordering = serializers.CharField(required=False, help_text="Order by: name, age, created_at")
+    facets = serializers.BooleanField(required=False, default=False, help_text="Include facet counts per filter option")
+    near_zip = serializers.CharField(required=False, help_text="Only pets whose shelter is near this US ZIP code, nearest first")
+    radius_km = serializers.FloatField(
+        required=False, default=50, min_value=1, max_value=MAX_RADIUS_KM, help_text="Search radius around near_zip"
+    )
+
+    ORDERING_FIELDS = ['name', 'age', 'created_at']
+
+    def validate_ordering(self, value):
+        if value.lstrip('-') not in self.ORDERING_FIELDS:
+            raise serializers.ValidationError(
+                f"Ordering must be one of: {', '.join(self.ORDERING_FIELDS)} (prefix with '-' for descending)."
+            )
+        return value 
+
+    def validate_near_zip(self, value):
+        if zip_centroid(value) is None:
+            raise serializers.ValidationError("Unknown US ZIP code.")
+        return value
+
+
+class SavedSearchSerializer(serializers.ModelSerializer):
+    """A saved search; ``criteria`` takes the same fields as the search endpoint"""
+
+    class Meta:
+        model = SavedSearch
+        fields = ['id', 'name', 'criteria', 'created_at', 'updated_at']
+        read_only_fields = ['created_at', 'updated_at']
+
+    def validate_criteria(self, value):
+        if not isinstance(value, dict):
+            raise serializers.ValidationError("Criteria must be an object.")
+        search = PetSearchSerializer(data=value)
+        search.is_valid(raise_exception=True)
+        criteria = dict(search.validated_data)
+        criteria.pop('facets', None)
+        if not criteria.get('near_zip'):
+            criteria.pop('radius_km', None)
+        return criteria
+
+
+class SavedSearchMatchSerializer(serializers.ModelSerializer):
+    """An entry of the saved-search feed"""
+    search_name = serializers.CharField(source='search.name', read_only=True)
+    pet = PetListSerializer(read_only=True)
+
+    class Meta:
+        model = SavedSearchMatch
+        fields = ['id', 'search', 'search_name', 'pet', 'created_at']
@@ -0,0 +1,261 @@
+from collections import Counter
+
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+
+from accounts.models import UserProfile
+from adoption.models import AdoptionRequest
+from core.storage import adjust_blob_references, is_blob_name, track_blob_references
+
+from .autocomplete import record_changes
+from .breeds import assign_breeds
+from .cache import invalidate_listings, invalidate_pet
+from .catalog import refresh_catalog, refresh_shelter
+from .changes import log_changes
+from .images import schedule_derivatives, schedule_missing_derivatives
+from .models import ArchivedPet, Breed, Pet, PetImageVariant, PetNeighbor, SavedSearch
+from .saved_searches import index_saved_search, schedule_matching
+from .search import get_search_backend
+from .similarity import FEATURE_FIELDS, schedule_similarity_refresh
+from .statistics import adjust_counter
+
+# Sent after Pet.objects.bulk_create(), which bypasses post_save; receivers
+# bring derived data up to date for the whole batch at once. ``pets`` may
+# lack primary keys on backends that cannot return them from bulk inserts.
+pets_bulk_created = Signal()
+
+# Fields a pet's vector or its eligibility as a suggestion depend on.
+SIMILARITY_FIELDS = {*FEATURE_FIELDS, 'status'}
+
+track_blob_references(Pet, 'image')
+track_blob_references(ArchivedPet, 'image')
+track_blob_references(PetImageVariant, 'image')
+
+
+@receiver(pre_save, sender=Pet)
+def remember_previous_state(sender, instance, **kwargs):
+    """Capture the stored row so post_save handlers can see what changed"""
+    instance._previous_state = None
+    if not instance._state.adding and instance.pk:
+        instance._previous_state = (
+            Pet.objects.filter(pk=instance.pk).values('status', 'pet_type', 'image', 'breed').first()
+        )
+
+
+@receiver(pre_save, sender=Pet)
+def resolve_breed(sender, instance, update_fields=None, **kwargs):
+    """Point breed_ref at the Breed the free-text breed names"""
+    if update_fields is not None and 'breed' not in update_fields:
+        return
+    previous_state = getattr(instance, '_previous_state', None)
+    if previous_state and previous_state['breed'] == instance.breed and (instance.breed_ref_id or not instance.breed):
+        return
+    assign_breeds([instance])
+
+
+@receiver(post_save, sender=Pet)
+def index_pet_for_search(sender, instance, **kwargs):
+    """Keep the full-text index in step with the pet row"""
+    get_search_backend().index_pet(instance)
+
+
+@receiver(post_save, sender=Pet)
+def update_pet_counters(sender, instance, created, **kwargs):
+    """Move the pet between (status, pet_type) counters"""
+    current = (instance.status, instance.pet_type)
+    previous_state = None if created else getattr(instance, '_previous_state', None)
+    previous = (previous_state['status'], previous_state['pet_type']) if previous_state else None
+    if previous == current:
+        return
+    if previous:
+        adjust_counter(*previous, -1)
+    adjust_counter(*current, 1)
+
+
+@receiver(post_save, sender=Pet)
+def update_catalog_entry(sender, instance, **kwargs):
+    """Add, refresh or drop the pet's catalog entry"""
+    refresh_catalog([instance.pk])
+
+
+@receiver(post_save, sender=Pet)
+def log_pet_change(sender, instance, created, **kwargs):
+    """Append the save to the change feed, in the saving transaction"""
+    previous_state = None if created else getattr(instance, '_previous_state', None)
+    if created:
+        action = 'created'
+    elif instance.status == 'adopted' and (not previous_state or previous_state['status'] != 'adopted'):
+        action = 'adopted'
+    else:
+        action = 'updated'
+    log_changes([instance.pk], action)
+
+
+@receiver(post_delete, sender=Pet)
+def log_pet_deletion(sender, instance, **kwargs):
+    """Leave a tombstone in the change feed"""
+    log_changes([instance.pk], 'deleted')
+
+
+@receiver(post_save, sender=Pet)
+@receiver(post_delete, sender=Pet)
+def log_autocomplete_change(sender, instance, **kwargs):
+    """Have every process's autocomplete index re-read the pet"""
+    record_changes([instance.pk])
+
+
+@receiver(post_save, sender=Pet)
+def expire_cached_pet_on_save(sender, instance, **kwargs):
+    """Bump the pet's cache version and the listing generation"""
+    invalidate_pet(instance.pk)
+
+
+@receiver(post_save, sender=Pet)
+def queue_image_derivatives(sender, instance, created, **kwargs):
+    """Cut resized variants whenever the pet's photo changes"""
+    previous_state = None if created else getattr(instance, '_previous_state', None)
+    previous_image = previous_state['image'] if previous_state else ''
+    if (instance.image.name or '') != (previous_image or ''):
+        schedule_derivatives([instance.pk])
+
+
+@receiver(post_save, sender=Pet)
+def refresh_similar_pets_on_save(sender, instance, update_fields=None, **kwargs):
+    """Re-vectorize the pet and update the neighbour lists it affects"""
+    if update_fields is not None and not set(update_fields) & SIMILARITY_FIELDS:
+        return
+    schedule_similarity_refresh([instance.pk])
+
+
+@receiver(post_save, sender=Pet)
+def match_saved_searches(sender, instance, created, **kwargs):
+    """Feed pets that are listed or become available to the saved searches they satisfy"""
+    if instance.status != 'available':
+        return
+    previous_state = None if created else getattr(instance, '_previous_state', None)
+    if previous_state and previous_state['status'] == 'available':
+        return
+    schedule_matching([instance.pk])
+
+
+@receiver(post_save, sender=SavedSearch)
+def index_saved_search_on_save(sender, instance, **kwargs):
+    """Keep the saved search's inverted-index postings in step with its criteria"""
+    index_saved_search(instance)
+
+
+@receiver(pre_delete, sender=Pet)
+def remember_similar_pets(sender, instance, **kwargs):
+    """Note which pets suggest this one before the cascade removes the links"""
+    instance._suggested_by = list(
+        PetNeighbor.objects.filter(neighbor_id=instance.pk).values_list('pet_id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Pet)
+def refresh_similar_pets_on_delete(sender, instance, **kwargs):
+    """Refill the lists that suggested the deleted pet"""
+    suggested_by = getattr(instance, '_suggested_by', [])
+    if suggested_by:
+        schedule_similarity_refresh([], suggested_by)
+
+
+@receiver(post_delete, sender=Pet)
+def remove_pet_from_search(sender, instance, **kwargs):
+    """Drop deleted pets from the full-text index"""
+    get_search_backend().remove_pet(instance.pk)
+
+
+@receiver(post_delete, sender=Pet)
+def decrement_pet_counters(sender, instance, **kwargs):
+    """Take deleted pets out of their counter"""
+    adjust_counter(instance.status, instance.pet_type, -1)
+
+
+@receiver(post_delete, sender=Pet)
+def expire_cached_pet_on_delete(sender, instance, **kwargs):
+    """Bump the pet's cache version and the listing generation"""
+    invalidate_pet(instance.pk)
+
+
+@receiver(post_delete, sender=Pet)
+def remove_catalog_entry(sender, instance, **kwargs):
+    """Drop deleted pets from the catalog"""
+    refresh_catalog([instance.pk])
+
+
+@receiver(post_save, sender=AdoptionRequest)
+@receiver(post_delete, sender=AdoptionRequest)
+def count_pending_requests(sender, instance, **kwargs):
+    """Keep the pet's pending-request count in the catalog current"""
+    refresh_catalog([instance.pet_id])
+
+
+@receiver(post_save, sender=UserProfile)
+def expire_listings_on_shelter_move(sender, instance, **kwargs):
+    """Proximity results follow the owner's ZIP code, so expire listings when it moves"""
+    if getattr(instance, '_location_changed', False) and Pet.objects.filter(owner_id=instance.user_id).exists():
+        invalidate_listings()
+
+
+@receiver(post_save, sender=UserProfile)
+def update_shelter_catalog_entries(sender, instance, **kwargs):
+    """Copy a renamed or relocated shelter onto its pets' catalog entries"""
+    if refresh_shelter(instance):
+        invalidate_listings()
+
+
+@receiver(pre_delete, sender=Breed)
+def remember_breed_pets(sender, instance, **kwargs):
+    """Note the breed's pets before the delete clears their breed_ref"""
+    instance._pet_ids = list(instance.pets.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Breed)
+def refresh_breed_pets(sender, instance, **kwargs):
+    """Clear the deleted breed from its pets' catalog entries"""
+    pet_ids = getattr(instance, '_pet_ids', [])
+    if pet_ids:
+        refresh_catalog(pet_ids)
+        invalidate_listings()
+
+
+@receiver(post_delete, sender=PetImageVariant)
+def delete_legacy_variant_file(sender, instance, **kwargs):
+    """Variants cut before they were blobs have a file of their own; remove it with the row"""
+    if instance.image and not is_blob_name(instance.image.name):
+        instance.image.storage.purge(instance.image.name)
+
+
+@receiver(pets_bulk_created)
+def sync_bulk_created_pets(sender, pets, **kwargs):
+    """Index, count, catalog, log to the change feed and autocomplete, and expire caches for a batch of bulk-inserted pets"""
+    with_pk = [pet for pet in pets if pet.pk]
+    if with_pk:
+        get_search_backend().index_pets(with_pk)
+
+    for (status, pet_type), count in Counter((pet.status, pet.pet_type) for pet in pets).items():
+        adjust_counter(status, pet_type, count)
+
+    for pet in pets:
+        if pet.image:
+            adjust_blob_references(pet.image.name, 1)
+
+    if any(pet.image for pet in pets):
+        if all(pet.pk for pet in pets):
+            schedule_derivatives([pet.pk for pet in pets if pet.image])
+        else:
+            schedule_missing_derivatives()
+
+    if all(pet.pk for pet in pets):
+        pet_ids = [pet.pk for pet in pets]
+    else:
+        # bulk_create() sets created_at on the instances even where it cannot set pk.
+        created = {pet.created_at for pet in pets}
+        pet_ids = list(Pet.objects.filter(created_at__in=created).values_list('id', flat=True))
+    refresh_catalog(pet_ids)
+    log_changes(pet_ids, 'created')
+    record_changes(pet_ids)
+    schedule_similarity_refresh(pet_ids)
+    schedule_matching(pet_ids)
+    invalidate_listings()
@@ -0,0 +1,235 @@
+"""
+Precomputed "you might also like" suggestions.
+
+Every pet has a raw feature vector (``PetVector``). It holds one-hot pet
+type, gender and age bucket, a hashed one-hot of the breed, and hashed
+term counts of the description. Weighting turns these into unit-length
+rows whose dot product is a similarity: sublinear TF-IDF for the
+description, then each block scaled by ``BLOCK_WEIGHTS``. ``PetNeighbor``
+stores each pet's ``TOP_K`` most similar available pets, so serving
+suggestions is an indexed lookup and never a similarity scan.
+
+``rebuild_similarity()`` (``manage.py build_similar_pets``) recomputes
+everything. When pets change, ``refresh_similarity()`` rewrites their
+vectors. It then recomputes their own lists and the lists of any pet they
+enter, leave or move within, against the current vectors of all pets.
+IDF drift from such partial updates is corrected by the next rebuild.
+
+A refresh reads every vector, so saves are not refreshed one at a time:
+``schedule_similarity_refresh()`` queues the pets as deferred work (see
+pets.deferred), and the worker refreshes everything queued since its last
+poll in one pass. ``manage.py build_similar_pets --incremental`` does the
+same from cron.
+"""
+import zlib
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from .deferred import queue_work, register_work
+from .facets import AGE_BUCKETS, age_bucket
+from .models import Pet, PetNeighbor, PetVector
+from .search import tokenize
+
+TOP_K = getattr(settings, 'PET_SIMILAR_TOP_K', 10)
+BREED_DIMS = 64
+TEXT_DIMS = 256
+BLOCK_ROWS = 1024
+BLOCK_WEIGHTS = {
+    'pet_type': 3.0,
+    'breed': 2.0,
+    'description': 1.5,
+    'age': 1.0,
+    'gender': 0.5,
+}
+FEATURE_FIELDS = ('id', 'pet_type', 'gender', 'age', 'breed', 'description')
+
+TYPE_INDEX = {value: i for i, (value, _) in enumerate(Pet.PET_TYPES)}
+GENDER_INDEX = {value: i for i, (value, _) in enumerate(Pet.GENDER_CHOICES)}
+AGE_INDEX = {label: i for i, (label, _, _) in enumerate(AGE_BUCKETS)}
+
+
+def _layout():
+    blocks, offset = {}, 0
+    sizes = (
+        ('pet_type', len(TYPE_INDEX)), ('gender', len(GENDER_INDEX)), ('age', len(AGE_INDEX)),
+        ('breed', BREED_DIMS), ('description', TEXT_DIMS),
+    )
+    for name, size in sizes:
+        blocks[name] = slice(offset, offset + size)
+        offset += size
+    return blocks, offset
+
+
+BLOCKS, DIMS = _layout()
+
+
+def _bucket(token, dims):
+    # crc32 rather than hash(), which is salted per process.
+    return zlib.crc32(token.encode('utf-8')) % dims
+
+
+def raw_vector(pet_type, gender, age, breed, description):
+    """Unweighted feature vector for one pet, as float32"""
+    vector = np.zeros(DIMS, dtype=np.float32)
+    if pet_type in TYPE_INDEX:
+        vector[BLOCKS['pet_type'].start + TYPE_INDEX[pet_type]] = 1
+    if gender in GENDER_INDEX:
+        vector[BLOCKS['gender'].start + GENDER_INDEX[gender]] = 1
+    bucket = age_bucket(age) if age is not None else None
+    if bucket:
+        vector[BLOCKS['age'].start + AGE_INDEX[bucket]] = 1
+    breed = ' '.join(tokenize(breed))
+    if breed:
+        vector[BLOCKS['breed'].start + _bucket(breed, BREED_DIMS)] = 1
+    for token in tokenize(description):
+        vector[BLOCKS['description'].start + _bucket(token, TEXT_DIMS)] += 1
+    return vector
+
+
+def weight(raw, blocks=BLOCKS):
+    """
+    Unit-length rows whose pairwise dot products are the similarity scores.
+    ``blocks`` may be a leading subset of BLOCKS for vectors cut short.
+    """
+    matrix = np.array(raw, dtype=np.float32)
+    if 'description' in blocks:
+        text = matrix[:, blocks['description']]
+        document_frequency = np.count_nonzero(text, axis=0)
+        idf = np.log((1 + len(matrix)) / (1 + document_frequency)) + 1
+        matrix[:, blocks['description']] = np.log1p(text) * idf
+    for name, block in blocks.items():
+        part = matrix[:, block]
+        norms = np.linalg.norm(part, axis=1, keepdims=True)
+        np.divide(part, norms, out=part, where=norms > 0)
+        part *= np.sqrt(BLOCK_WEIGHTS[name])
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+def top_neighbors(matrix, ids, rows, candidates, k=TOP_K):
+    """Yield (pet_id, [(neighbor_id, score), ...]) for the given row positions"""
+    candidate_matrix = matrix[candidates]
+    candidate_ids = ids[candidates]
+    for start in range(0, len(rows), BLOCK_ROWS):
+        block = np.asarray(rows[start:start + BLOCK_ROWS])
+        scores = matrix[block] @ candidate_matrix.T
+        # Never suggest a pet to itself.
+        scores[ids[block][:, None] == candidate_ids[None, :]] = -np.inf
+        count = min(k, scores.shape[1])
+        for i, row in enumerate(block):
+            if count == 0:
+                yield int(ids[row]), []
+                continue
+            best = np.argpartition(-scores[i], count - 1)[:count]
+            best = best[np.argsort(-scores[i, best], kind='stable')]
+            # Pets with nothing in common (or the pet itself) are not suggestions.
+            yield int(ids[row]), [(int(candidate_ids[j]), float(scores[i, j])) for j in best if scores[i, j] > 0]
+
+
+def _load_vectors():
+    rows = list(PetVector.objects.order_by('pet_id').values_list('pet_id', 'pet__status', 'vector'))
+    ids = np.array([row[0] for row in rows], dtype=np.int64)
+    available = np.array([row[1] == 'available' for row in rows], dtype=bool)
+    raw = np.frombuffer(b''.join(bytes(row[2]) for row in rows), dtype=np.float32).reshape(len(rows), DIMS)
+    return ids, available, raw
+
+
+def _write_vectors(rows):
+    PetVector.objects.bulk_create(
+        [PetVector(pet_id=row[0], vector=raw_vector(*row[1:]).tobytes()) for row in rows],
+        batch_size=1000,
+    )
+
+
+def _write_neighbors(results):
+    PetNeighbor.objects.bulk_create(
+        [
+            PetNeighbor(pet_id=pet_id, neighbor_id=neighbor_id, rank=rank, score=score)
+            for pet_id, neighbors in results
+            for rank, (neighbor_id, score) in enumerate(neighbors)
+        ],
+        batch_size=1000,
+    )
+
+
+def rebuild_similarity(k=TOP_K):
+    """Recompute every vector and neighbour list; returns the number of pets indexed"""
+    rows = list(Pet.objects.order_by('id').values_list(*FEATURE_FIELDS))
+    with transaction.atomic():
+        PetVector.objects.all().delete()
+        _write_vectors(rows)
+    ids, available, raw = _load_vectors()
+    results = []
+    if len(ids):
+        results = list(top_neighbors(weight(raw), ids, np.arange(len(ids)), np.flatnonzero(available), k))
+    with transaction.atomic():
+        PetNeighbor.objects.all().delete()
+        _write_neighbors(results)
+    return len(ids)
+
+
+def refresh_similarity(pet_ids=None, affected_ids=(), k=TOP_K):
+    """
+    Bring vectors and neighbour lists up to date after ``pet_ids`` changed
+    (None: every pet that has no vector yet). ``affected_ids`` are pets whose
+    lists must be recomputed regardless, e.g. because they listed a pet that
+    has since been deleted. Returns the number of lists recomputed.
+    """
+    if pet_ids is None:
+        pet_ids = Pet.objects.filter(vector__isnull=True).values_list('id', flat=True)
+    pet_ids = set(pet_ids)
+    rows = list(Pet.objects.filter(pk__in=pet_ids).values_list(*FEATURE_FIELDS))
+    with transaction.atomic():
+        PetVector.objects.filter(pet_id__in=pet_ids).delete()
+        _write_vectors(rows)
+
+    ids, available, raw = _load_vectors()
+    if not len(ids):
+        return 0
+    matrix = weight(raw)
+    position = {int(pet_id): i for i, pet_id in enumerate(ids)}
+
+    changed = [position[pet_id] for pet_id in pet_ids if pet_id in position]
+    recompute = set(changed)
+    # Lists that contain a changed pet may need it rescored, moved or dropped.
+    listing = PetNeighbor.objects.filter(neighbor_id__in=pet_ids).values_list('pet_id', flat=True)
+    recompute.update(position[pet_id] for pet_id in listing if pet_id in position)
+    recompute.update(position[pet_id] for pet_id in affected_ids if pet_id in position)
+
+    # Lists a changed, adoptable pet now beats the last entry of.
+    entering = [i for i in changed if available[i]]
+    if entering:
+        thresholds = np.full(len(ids), -np.inf, dtype=np.float32)
+        for pet_id, score in PetNeighbor.objects.filter(rank=k - 1).values_list('pet_id', 'score'):
+            if pet_id in position:
+                thresholds[position[pet_id]] = score
+        scores = matrix @ matrix[entering].T
+        recompute.update(np.flatnonzero((scores > thresholds[:, None]).any(axis=1)).tolist())
+
+    results = list(top_neighbors(matrix, ids, sorted(recompute), np.flatnonzero(available), k))
+    with transaction.atomic():
+        PetNeighbor.objects.filter(pet_id__in=[pet_id for pet_id, _ in results]).delete()
+        _write_neighbors(results)
+    return len(results)
+
+
+def schedule_similarity_refresh(pet_ids=None, affected_ids=()):
+    """
+    Queue a refresh for ``pet_ids`` (None: every pet without a vector) and
+    ``affected_ids``, in the current transaction. Queued pets are refreshed
+    as changed; for the affected ones that only costs re-reading their row.
+    """
+    if pet_ids is None:
+        pet_ids = Pet.objects.filter(vector__isnull=True).values_list('id', flat=True)
+    queue_work('similarity', [*pet_ids, *affected_ids])
+
+
+def _refresh_queued(pet_ids):
+    refresh_similarity(pet_ids)
+
+
+# Up to a thousand pets share one pass over the vectors.
+register_work('similarity', _refresh_queued, batch_size=1000)
@@ -0,0 +1,93 @@
+"""
+Pet statistics served from the PetCounter table.
+
+Counters are adjusted by +/-1 from Pet signals and periodically reconciled
+against a single grouped aggregation (see the reconcile_pet_statistics
+command). Archived pets (``pets.archive``) stay counted as adopted. The
+endpoint payload is built from the counters and kept in the Django cache
+until the next counter change.
+"""
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import ArchivedPet, Pet, PetCounter
+
+STATISTICS_CACHE_KEY = 'pets:statistics'
+
+
+def invalidate_statistics():
+    transaction.on_commit(lambda: cache.delete(STATISTICS_CACHE_KEY))
+
+
+def adjust_counter(status, pet_type, delta):
+    """Add ``delta`` to the counter for one (status, pet_type) pair"""
+    updated = PetCounter.objects.filter(status=status, pet_type=pet_type).update(
+        count=F('count') + delta, updated_at=timezone.now()
+    )
+    if not updated:
+        counter, _ = PetCounter.objects.get_or_create(status=status, pet_type=pet_type)
+        PetCounter.objects.filter(pk=counter.pk).update(
+            count=F('count') + delta, updated_at=timezone.now()
+        )
+    invalidate_statistics()
+
+
+def reconcile_counters():
+    """Recompute every counter with one grouped query; returns the number of corrections"""
+    actual = Counter()
+    for model in (Pet, ArchivedPet):
+        for row in model.objects.order_by().values('status', 'pet_type').annotate(total=Count('id')):
+            actual[row['status'], row['pet_type']] += row['total']
+    corrections = 0
+    with transaction.atomic():
+        stored = {
+            (counter.status, counter.pet_type): counter
+            for counter in PetCounter.objects.select_for_update()
+        }
+        for key in stored.keys() | actual.keys():
+            expected = actual.get(key, 0)
+            counter = stored.get(key)
+            if counter is None:
+                PetCounter.objects.create(status=key[0], pet_type=key[1], count=expected)
+                corrections += 1
+            elif counter.count != expected:
+                counter.count = expected
+                counter.save(update_fields=['count', 'updated_at'])
+                corrections += 1
+    cache.delete(STATISTICS_CACHE_KEY)
+    return corrections
+
+
+def build_statistics():
+    by_status = {status: 0 for status, _ in Pet.STATUS_CHOICES}
+    by_type = {pet_type: 0 for pet_type, _ in Pet.PET_TYPES}
+    updated_at = None
+    for status, pet_type, count, changed in PetCounter.objects.values_list(
+        'status', 'pet_type', 'count', 'updated_at'
+    ):
+        by_status[status] = by_status.get(status, 0) + count
+        by_type[pet_type] = by_type.get(pet_type, 0) + count
+        if updated_at is None or changed > updated_at:
+            updated_at = changed
+
+    return {
+        'total_pets': sum(by_status.values()),
+        'available_pets': by_status['available'],
+        'adopted_pets': by_status['adopted'],
+        'pending_pets': by_status['pending'],
+        'pet_types': by_type,
+        'updated_at': updated_at.isoformat() if updated_at else None,
+    }
+
+
+def get_statistics():
+    """Return the statistics payload, from cache when nothing has changed"""
+    data = cache.get(STATISTICS_CACHE_KEY)
+    if data is None:
+        data = build_statistics()
+        cache.set(STATISTICS_CACHE_KEY, data, None)
+    return data
@@ -1,3 +1,1278 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+
+from adoption.models import AdoptionRequest
+
+from . import autocomplete, deferred, similarity
+from .breeds import backfill_breeds, unmatched_breeds
+from .bulk_import import PetImporter
+from .cache import LISTING_CHANGED_AT_KEY
+from .archive import archive_adopted_pets
+from .catalog import rebuild_catalog
+from .exports import PET_EXPORT_FIELDS, iter_values
+from .deferred import process_work, queue_work, run_batch
+from .models import (
+    Breed, PendingPetWork, Pet, PetCatalogEntry, PetChange, PetCounter, PetImageVariant, PetNeighbor,
+    PetRecommendation, StoredBlob,
+)
+from .recommendations import build_recommendations
+from .search import BaseSearchBackend, get_search_backend
+from .serializers import PetListFastSerializer, PetListSerializer
+from .similarity import rebuild_similarity
+from .statistics import reconcile_counters
+
+
+class ShelterIndexPlanTests(TestCase):
+    """The shelter access paths should be served by the (owner, ...) indexes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.shelter = User.objects.create_user('shelter', password='password')
+        cls.shelter.profile.is_shelter = True
+        cls.shelter.profile.save()
+
+    def index_name(self, *fields):
+        for index in Pet._meta.indexes:
+            if tuple(index.fields) == fields:
+                return index.name
+        self.fail(f'No index on {fields}')
+
+    def assertUsesIndex(self, queryset, *fields):
+        plan = queryset.explain()
+        self.assertIn(self.index_name(*fields), plan, plan)
+
+    def test_shelter_pets_newest_first(self):
+        self.assertUsesIndex(Pet.objects.filter(owner=self.shelter), 'owner', 'created_at')
+
+    def test_shelter_pets_by_status(self):
+        self.assertUsesIndex(
+            Pet.objects.filter(owner=self.shelter, status='available'), 'owner', 'status', 'created_at'
+        )
+
+    def test_shelter_status_counts(self):
+        counts = Pet.objects.filter(owner=self.shelter).order_by().values('status').annotate(Count('id'))
+        self.assertUsesIndex(counts, 'owner', 'status', 'created_at')
+
+
+class ShelterInventoryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.shelter = User.objects.create_user('shelter', password='password')
+        cls.shelter.profile.is_shelter = True
+        cls.shelter.profile.save()
+        other = User.objects.create_user('other', password='password')
+        Pet.objects.bulk_create(
+            [
+                Pet(name=f'Pet {i}', pet_type='dog', age=i % 10, gender='male', owner=cls.shelter,
+                    status='available' if i % 3 else 'adopted')
+                for i in range(25)
+            ]
+            + [Pet(name='Elsewhere', pet_type='cat', age=2, gender='female', owner=other)]
+        )
+
+    def setUp(self):
+        self.client.force_login(self.shelter)
+
+    def test_walks_every_pet_of_the_shelter(self):
+        seen = []
+        url = '/api/pets/shelter/inventory/?page_size=10&ordering=age'
+        while url:
+            data = self.client.get(url).json()
+            seen.extend(pet['id'] for pet in data['results'])
+            url = data['next']
+        self.assertEqual(sorted(seen), sorted(Pet.objects.filter(owner=self.shelter).values_list('id', flat=True)))
+        self.assertEqual(data['status_counts'], {'available': 16, 'adopted': 9, 'pending': 0})
+
+    def test_filters_by_status(self):
+        data = self.client.get('/api/pets/shelter/inventory/?status=adopted').json()
+        self.assertEqual(len(data['results']), 9)
+        self.assertTrue(all(pet['status'] == 'adopted' for pet in data['results']))
+
+    def test_requires_shelter_account(self):
+        self.client.force_login(User.objects.create_user('adopter', password='password'))
+        self.assertEqual(self.client.get('/api/pets/shelter/inventory/').status_code, 403)
+
+
+class PetCatalogTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.shelter = User.objects.create_user('shelter', password='password')
+        cls.shelter.profile.shelter_name = 'Happy Paws'
+        cls.shelter.profile.zip_code = '02139'
+        cls.shelter.profile.save()
+        for i in range(6):
+            Pet.objects.create(
+                name=f'Pet {i}', pet_type='cat' if i % 2 else 'dog', age=i, gender='female',
+                owner=cls.shelter, description='fluffy' if i % 3 else '',
+            )
+        Pet.objects.create(name='Adopted', pet_type='dog', age=3, gender='male', owner=cls.shelter, status='adopted')
+
+    def test_signals_keep_one_entry_per_available_pet(self):
+        pet = Pet.objects.get(name='Pet 0')
+        self.assertEqual(PetCatalogEntry.objects.count(), 6)
+        entry = PetCatalogEntry.objects.get(pk=pet.pk)
+        self.assertEqual((entry.shelter_name, entry.pet_type_display, entry.pending_requests), ('Happy Paws', 'Dog', 0))
+
+        AdoptionRequest.objects.create(user=User.objects.create_user('adopter'), pet=pet, reason='A loving home')
+        self.assertEqual(PetCatalogEntry.objects.get(pk=pet.pk).pending_requests, 1)
+
+        self.shelter.profile.shelter_name = 'Happier Paws'
+        self.shelter.profile.save()
+        self.assertEqual(set(PetCatalogEntry.objects.values_list('shelter_name', flat=True)), {'Happier Paws'})
+
+        pet.status = 'adopted'
+        pet.save()
+        self.assertFalse(PetCatalogEntry.objects.filter(pk=pet.pk).exists())
+        Pet.objects.get(name='Pet 1').delete()
+        self.assertEqual(PetCatalogEntry.objects.count(), 4)
+
+    def test_rebuild_matches_signal_maintained_entries(self):
+        columns = ('id', 'name', 'shelter_name', 'latitude', 'pending_requests', 'created_at')
+        maintained = list(PetCatalogEntry.objects.order_by('id').values_list(*columns))
+        self.assertEqual(rebuild_catalog(batch_size=4), 6)
+        self.assertEqual(list(PetCatalogEntry.objects.order_by('id').values_list(*columns)), maintained)
+
+    def test_listings_match_the_pet_tables(self):
+        requests = [
+            lambda: self.client.get('/api/pets/?ordering=name&page_size=4').json()['results'],
+            lambda: self.client.get('/api/pets/?search=fluffy').json()['results'],
+            lambda: self.client.get('/api/pets/featured/').json(),
+            lambda: self.client.post(
+                '/api/pets/search/', {'status': 'available', 'near_zip': '02139'}, content_type='application/json'
+            ).json()['results'],
+        ]
+        for request in requests:
+            with override_settings(PET_CATALOG_READ_MODEL=False):
+                expected = request()
+            cache.clear()
+            served = request()
+            self.assertEqual(len(served), len(expected))
+            for item in served:
+                self.assertEqual((item.pop('shelter_name'), item.pop('pending_requests')), ('Happy Paws', 0))
+            self.assertEqual(served, expected)
+
+    def test_pages_are_single_table_index_scans(self):
+        plan = PetCatalogEntry.objects.filter(pet_type='cat').order_by('-created_at', '-id')[:12].explain()
+        index = next(i.name for i in PetCatalogEntry._meta.indexes if i.fields == ['pet_type', 'created_at', 'id'])
+        self.assertIn(index, plan, plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+
+@override_settings(PET_DEFERRED_WORK_INLINE=True)
+class AutocompleteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for name, breed in [('Goldie', 'Golden Retriever'), ('Max', 'golden retriever'), ('Maxine', 'Beagle')]:
+            Pet.objects.create(name=name, pet_type='dog', breed=breed, age=2, gender='female')
+        Pet.objects.create(name='Gone', pet_type='dog', breed='Greyhound', age=2, gender='male', status='adopted')
+
+    def setUp(self):
+        cache.clear()
+        autocomplete.index = autocomplete.PrefixIndex()
+
+    def suggestions(self, query, **params):
+        response = self.client.get('/api/pets/autocomplete/', {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [(item['text'], item['kind'], item['count']) for item in response.json()['results']]
+
+    def test_suggests_names_and_breeds_by_word_prefix(self):
+        self.assertEqual(
+            self.suggestions('g'), [('Golden Retriever', 'breed', 2), ('Goldie', 'name', 1)]
+        )
+        self.assertEqual(self.suggestions('RETR'), [('Golden Retriever', 'breed', 2)])
+        self.assertEqual(self.suggestions('golden re'), [('Golden Retriever', 'breed', 2)])
+        self.assertEqual(self.suggestions('max', kind='name', limit=1), [('Max', 'name', 1)])
+        self.assertEqual(self.suggestions(''), [])
+
+    def test_lookups_do_not_query_the_database(self):
+        self.suggestions('ma')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.suggestions('ma'), [('Max', 'name', 1), ('Maxine', 'name', 1)])
+
+    def test_pet_changes_are_applied_incrementally(self):
+        self.suggestions('g')
+        with self.captureOnCommitCallbacks(execute=True):
+            Pet.objects.create(name='Beau', pet_type='dog', breed='Beagle', age=1, gender='male')
+        with self.captureOnCommitCallbacks(execute=True):
+            Pet.objects.filter(name='Goldie').get().delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            max_ = Pet.objects.get(name='Max')
+            max_.status = 'adopted'
+            max_.save()
+
+        # Only the three logged pets are re-read.
+        with self.assertNumQueries(1):
+            self.assertEqual(self.suggestions('b'), [('Beagle', 'breed', 2), ('Beau', 'name', 1)])
+        self.assertEqual(self.suggestions('g'), [])
+
+
+@override_settings(PET_DEFERRED_WORK_INLINE=True)
+class BreedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for name, breed in [('Rex', 'Lab'), ('Bella', 'labrador'), ('Duke', ' Labrador  Retriever'), ('Ivy', 'Beagle')]:
+            Pet.objects.create(name=name, pet_type='dog', breed=breed, age=2, gender='female')
+        Pet.objects.create(name='Finn', pet_type='dog', breed='Irish wolfhound', age=4, gender='male')
+        Pet.objects.create(name='Lou', pet_type='dog', breed='Bichon Frisé dog', age=1, gender='male')
+        cls.labrador = Breed.objects.get(name='Labrador Retriever')
+
+    def names(self, response):
+        self.assertEqual(response.status_code, 200)
+        return sorted(pet['name'] for pet in response.json()['results'])
+
+    def test_spellings_resolve_to_one_breed(self):
+        self.assertEqual(
+            set(Pet.objects.filter(name__in=['Rex', 'Bella', 'Duke']).values_list('breed_ref', flat=True)),
+            {self.labrador.pk},
+        )
+        self.assertEqual(PetCatalogEntry.objects.filter(breed_id=self.labrador.pk).count(), 3)
+
+        bella = Pet.objects.get(name='Bella')
+        bella.breed = 'Beagle'
+        bella.save()
+        self.assertEqual(Pet.objects.get(name='Bella').breed_ref.name, 'Beagle')
+
+        # A save limited to breed still writes the breed it resolves to.
+        duke = Pet.objects.get(name='Duke')
+        duke.breed = 'Beagle'
+        duke.save(update_fields=['breed'])
+        self.assertEqual(Pet.objects.get(name='Duke').breed_ref.name, 'Beagle')
+        self.assertEqual(self.names(self.client.get('/api/pets/', {'breed_id': self.labrador.pk})), ['Rex'])
+
+    def test_breed_filter_and_facets(self):
+        self.assertEqual(
+            self.names(self.client.get('/api/pets/', {'breed_id': self.labrador.pk})), ['Bella', 'Duke', 'Rex']
+        )
+        response = self.client.post(
+            '/api/pets/search/', {'breed_id': self.labrador.pk, 'facets': True}, content_type='application/json'
+        )
+        self.assertEqual(self.names(response), ['Bella', 'Duke', 'Rex'])
+        self.assertEqual(response.json()['facets']['gender'], {'male': 0, 'female': 3, 'unknown': 0})
+        self.assertEqual(
+            [(item['name'], item['count']) for item in response.json()['facets']['breed']],
+            [('Labrador Retriever', 3), ('Beagle', 1)],
+        )
+
+    def test_unknown_spellings_are_queued_not_created(self):
+        breeds = Breed.objects.count()
+        self.assertIsNone(Pet.objects.get(name='Finn').breed_ref)
+        self.assertEqual(unmatched_breeds(), [('bichon frise dog', 1), ('irish wolfhound', 1)])
+
+        # Once an admin adds the alias, a backfill resolves the queued pets.
+        wolfhound = Breed.objects.create(name='Irish Wolfhound', pet_type='dog')
+        wolfhound.aliases.create(alias='irish wolfhound')
+        bichon = Breed.objects.create(name='Bichon Frise', pet_type='dog')
+        bichon.aliases.create(alias='bichon frise')
+        self.assertEqual(backfill_breeds(), 2)
+        self.assertEqual(Pet.objects.get(name='Lou').breed_ref, bichon)
+        self.assertEqual(unmatched_breeds(), [])
+        self.assertEqual(Breed.objects.count(), breeds + 2)
+
+    def test_backfill_resolves_pets_in_batches(self):
+        Pet.objects.update(breed_ref=None)
+        PetCatalogEntry.objects.update(breed_id=None)
+        cursor = PetChange.objects.order_by('-id').values_list('id', flat=True).first()
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(backfill_breeds(batch_size=2), 4)
+        self.assertEqual(backfill_breeds(batch_size=2), 0)
+        self.assertEqual(PetCatalogEntry.objects.filter(breed_id=self.labrador.pk).count(), 3)
+        # The writes bypass the Pet signals but still reach the change feed and the caches.
+        self.assertEqual(PetChange.objects.filter(id__gt=cursor).count(), 4)
+        self.assertEqual(autocomplete.get_sequence(), 2)
+        self.assertIsNotNone(cache.get(LISTING_CHANGED_AT_KEY))
+
+
+@override_settings(PET_DEFERRED_WORK_INLINE=True)
+class PetChangeFeedTests(TestCase):
+    def feed(self, since, **params):
+        return self.client.get('/api/pets/changes/', {'since': since, **params})
+
+    def actions(self, response):
+        self.assertEqual(response.status_code, 200)
+        return [(change['action'], change['pet'] and change['pet']['name']) for change in response.json()['changes']]
+
+    def test_sync_returns_each_changed_pet_once_with_tombstones(self):
+        rex = Pet.objects.create(name='Rex', pet_type='dog', age=2, gender='male')
+        ivy = Pet.objects.create(name='Ivy', pet_type='cat', age=1, gender='female')
+        cursor = self.feed(0).json()['cursor']
+
+        rex.name = 'Rex II'
+        rex.save()
+        rex.status = 'adopted'
+        rex.save()
+        ivy_id = ivy.pk
+        ivy.delete()
+        Pet.objects.create(name='Max', pet_type='dog', age=3, gender='male')
+        with self.assertRaises(ValueError), transaction.atomic():
+            Pet.objects.create(name='Ghost', pet_type='dog', age=3, gender='male')
+            raise ValueError
+
+        response = self.feed(cursor)
+        self.assertEqual(self.actions(response), [('adopted', 'Rex II'), ('deleted', None), ('created', 'Max')])
+        self.assertEqual(response.json()['changes'][1]['id'], ivy_id)
+        self.assertEqual(self.actions(self.feed(response.json()['cursor'])), [])
+
+    def test_paging_and_unsettled_gaps(self):
+        for name in ('A', 'B', 'C'):
+            Pet.objects.create(name=name, pet_type='dog', age=2, gender='male')
+        first = PetChange.objects.order_by('id').first().pk
+        response = self.feed(first - 1, limit=2)
+        self.assertEqual(self.actions(response), [('created', 'A'), ('created', 'B')])
+        self.assertTrue(response.json()['has_more'])
+
+        # A missing id may still be an open transaction; hold back until it has settled.
+        PetChange.objects.filter(pk=first + 1).delete()
+        self.assertEqual(self.actions(self.feed(first)), [])
+        PetChange.objects.update(created_at=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(self.actions(self.feed(first)), [('created', 'C')])
+
+    def test_pruned_cursor_is_expired(self):
+        for name in ('A', 'B'):
+            Pet.objects.create(name=name, pet_type='dog', age=2, gender='male')
+        latest = PetChange.objects.order_by('-id').first().pk
+        PetChange.objects.filter(pk__lt=latest).delete()
+        response = self.feed(0)
+        self.assertEqual(response.status_code, 410)
+        self.assertEqual(response.json()['cursor'], latest)
+        self.assertEqual(self.feed('x').status_code, 400)
+
+
+@override_settings(PET_DEFERRED_WORK_INLINE=True)
+class SparseFieldsetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.shelter = User.objects.create_user('shelter', password='password', first_name='Happy')
+        cls.rex = Pet.objects.create(
+            name='Rex', pet_type='dog', breed='Lab', age=2, gender='male',
+            description='A very long story', owner=cls.shelter,
+        )
+        Pet.objects.create(name='Ivy', pet_type='cat', age=1, gender='female', owner=cls.shelter)
+
+    def get(self, url, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json(), ' '.join(query['sql'] for query in queries)
+
+    def test_list_outputs_and_selects_only_requested_fields(self):
+        for settings in [{}, {'PET_CATALOG_READ_MODEL': False}, {'PET_CATALOG_READ_MODEL': False, 'PET_LIST_FAST_SERIALIZER': False}]:
+            with self.subTest(**settings), override_settings(**settings):
+                data, sql = self.get('/api/pets/', fields='id,name,breed', page_size=1)
+                self.assertEqual(data['results'], [{'id': Pet.objects.get(name='Ivy').pk, 'name': 'Ivy', 'breed': ''}])
+                self.assertNotIn('"gender"', sql)
+                # Cursor pagination still works on the pruned rows.
+                data = self.client.get(data['next']).json()
+                self.assertEqual(data['results'], [{'id': self.rex.pk, 'name': 'Rex', 'breed': 'Lab'}])
+
+        response = self.client.post(
+            '/api/pets/search/?fields=name,image_url', {'search': 'rex'}, content_type='application/json'
+        )
+        self.assertEqual(response.json()['results'], [{'name': 'Rex', 'image_url': None}])
+        response = self.client.get('/api/pets/', {'fields': 'name,description'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('description', response.json()['fields'][0])
+
+    def test_detail_skips_unrequested_columns(self):
+        data, sql = self.get(f'/api/pets/{self.rex.pk}/', fields='name,owner')
+        self.assertEqual(data, {
+            'name': 'Rex',
+            'owner': {'id': self.shelter.pk, 'username': 'shelter', 'first_name': 'Happy', 'last_name': ''},
+        })
+        self.assertNotIn('"description"', sql)
+
+        # The full representation is cached separately.
+        data, sql = self.get(f'/api/pets/{self.rex.pk}/')
+        self.assertEqual(data['description'], 'A very long story')
+        self.assertEqual(self.get(f'/api/pets/{self.rex.pk}/', fields='name')[0], {'name': 'Rex'})
+
+
+@override_settings(PET_DEFERRED_WORK_INLINE=True)
+class PetBatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.rex = Pet.objects.create(name='Rex', pet_type='dog', age=2, gender='male')
+        cls.ivy = Pet.objects.create(name='Ivy', pet_type='cat', age=1, gender='female')
+
+    def test_batch_preserves_order_reports_missing_and_shares_detail_cache(self):
+        detail = self.client.get(f'/api/pets/{self.rex.pk}/')
+        response = self.client.get('/api/pets/batch/', {'ids': f'{self.ivy.pk},999999,{self.rex.pk},{self.ivy.pk}'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([pet['name'] for pet in response.json()['results']], ['Ivy', 'Rex'])
+        self.assertEqual(response.json()['results'][1], detail.json())
+        self.assertEqual(response.json()['missing'], [999999])
+        self.assertEqual(self.client.get(f'/api/pets/{self.ivy.pk}/')['X-Cache'], 'HIT')
+
+        # Everything is cached now: no pet is read from the database.
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                '/api/pets/batch/?fields=name', {'ids': [self.rex.pk]}, content_type='application/json'
+            )
+            response = self.client.post('/api/pets/batch/', {'ids': [self.rex.pk, self.ivy.pk]}, content_type='application/json')
+        self.assertEqual(len([q for q in queries if 'FROM "pets_pet"' in q['sql']]), 1)
+        self.assertEqual([pet['name'] for pet in response.json()['results']], ['Rex', 'Ivy'])
+
+    def test_invalid_ids(self):
+        for ids in ['', 'a,b', '0', ','.join(str(i) for i in range(1, 300))]:
+            with self.subTest(ids=ids[:20]):
+                self.assertEqual(self.client.get('/api/pets/batch/', {'ids': ids}).status_code, 400)
+        response = self.client.post('/api/pets/batch/', {'ids': 5}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+def png(width, height, color='red'):
+    buffer = BytesIO()
+    Image.new('RGB', (width, height), color).save(buffer, 'PNG')
+    return ContentFile(buffer.getvalue(), name='photo.png')
+
+
+@override_settings(PET_DEFERRED_WORK_INLINE=False)
+class ImageDerivativeTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        self.pet = Pet.objects.create(name='Rex', pet_type='dog', age=2, gender='male')
+
+    def etag(self):
+        return self.client.get(f'/api/pets/{self.pet.pk}/')['ETag']
+
+    def set_image(self, image):
+        """Save the pet's new photo; the worker cuts its variants in process_work()"""
+        self.pet.image = image
+        self.pet.save()
+        self.assertTrue(PendingPetWork.objects.filter(kind='derivatives', pet_id=self.pet.pk).exists())
+
+    def test_variants_are_cut_without_upscaling_and_move_the_etag(self):
+        self.set_image(png(800, 400))
+        before = self.etag()
+        self.assertEqual(process_work(['derivatives']), {'derivatives': 1})
+
+        self.pet.refresh_from_db()
+        self.assertEqual((self.pet.image_width, self.pet.image_height), (800, 400))
+        variants = PetImageVariant.objects.filter(pet=self.pet)
+        self.assertEqual(
+            sorted(variants.values_list('format', 'width', 'height')),
+            [('jpeg', 320, 160), ('jpeg', 640, 320), ('webp', 320, 160), ('webp', 640, 320)],
+        )
+        self.assertTrue(all(variant.source == self.pet.image.name for variant in variants))
+        self.assertNotEqual(self.etag(), before)
+        srcset = self.client.get('/api/pets/').json()['results'][0]['image_srcset']
+        self.assertEqual(sorted(srcset['webp']), ['320', '640'])
+        self.assertFalse(PendingPetWork.objects.filter(kind='derivatives').exists())
+
+    def test_removing_the_image_drops_variants_and_dimensions(self):
+        self.set_image(png(200, 100))
+        process_work()
+        self.assertEqual(PetImageVariant.objects.filter(pet=self.pet).count(), 2)
+
+        self.set_image(None)
+        before = self.etag()
+        process_work()
+        self.pet.refresh_from_db()
+        self.assertEqual((self.pet.image_width, self.pet.image_height), (None, None))
+        self.assertFalse(PetImageVariant.objects.filter(pet=self.pet).exists())
+        self.assertNotEqual(self.etag(), before)
+
+    def test_pets_sharing_a_photo_share_its_variants(self):
+        self.set_image(png(400, 200))
+        other = Pet.objects.create(name='Ivy', pet_type='cat', age=1, gender='female')
+        with self.captureOnCommitCallbacks(execute=True):
+            other.image = png(400, 200)
+            other.save()
+        call_command('process_pet_work', kind=['derivatives'], stdout=StringIO())
+
+        names = set(PetImageVariant.objects.filter(pet=self.pet).values_list('image', flat=True))
+        self.assertEqual(names, set(PetImageVariant.objects.filter(pet=other).values_list('image', flat=True)))
+        self.assertEqual(
+            set(StoredBlob.objects.filter(name__in=names).values_list('ref_count', flat=True)), {2}
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            other.delete()
+        self.assertEqual(
+            set(StoredBlob.objects.filter(name__in=names).values_list('ref_count', flat=True)), {1}
+        )
+
+    def test_failed_work_stays_queued_and_is_retried(self):
+        self.set_image(png(200, 100))
+        with mock.patch('pets.images.generate_derivatives', side_effect=OSError('disk full')):
+            with self.assertLogs('pets.deferred', 'ERROR'):
+                self.assertEqual(process_work(['derivatives']), {'derivatives': 0})
+        work = PendingPetWork.objects.get(kind='derivatives')
+        self.assertEqual((work.attempts, work.last_error), (1, 'OSError: disk full'))
+
+        self.assertEqual(process_work(['derivatives']), {'derivatives': 1})
+        self.assertEqual(PetImageVariant.objects.filter(pet=self.pet).count(), 2)
+        self.assertFalse(PendingPetWork.objects.filter(kind='derivatives').exists())
+
+    def test_work_queued_again_while_running_is_kept(self):
+        def save_again(pet_ids):
+            # The pet's photo changes again while its variants are being cut.
+            queue_work('derivatives', pet_ids)
+
+        queue_work('derivatives', [self.pet.pk])
+        with mock.patch.dict(deferred._handlers, {'derivatives': (save_again, 1)}):
+            self.assertEqual(run_batch('derivatives'), (1, []))
+        self.assertEqual(PendingPetWork.objects.get(kind='derivatives').version, 1)
+
+
+@override_settings(PET_DEFERRED_WORK_INLINE=False)
+class SimilarityRefreshTests(TestCase):
+    def test_saves_are_refreshed_in_one_batch(self):
+        rex = Pet.objects.create(name='Rex', pet_type='dog', age=2, gender='male')
+        ivy = Pet.objects.create(name='Ivy', pet_type='cat', age=1, gender='female')
+        rex.name = 'Rex II'
+        rex.save(update_fields=['name'])
+        similarity.schedule_similarity_refresh([], [ivy.pk])
+        self.assertEqual(
+            sorted(PendingPetWork.objects.filter(kind='similarity').values_list('pet_id', flat=True)),
+            [rex.pk, ivy.pk],
+        )
+
+        with mock.patch.object(similarity, 'refresh_similarity') as refresh:
+            call_command('build_similar_pets', incremental=True, stdout=StringIO())
+        refresh.assert_called_once_with([rex.pk, ivy.pk])
+        self.assertFalse(PendingPetWork.objects.filter(kind='similarity').exists())
+
+
+@override_settings(PET_DEFERRED_WORK_INLINE=True)
+class ConditionalRequestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.rex = Pet.objects.create(name='Rex', pet_type='dog', age=2, gender='male')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_unchanged_listing_and_detail_revalidate_to_304(self):
+        for url in ['/api/pets/', f'/api/pets/{self.rex.pk}/']:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                revalidated = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(revalidated.status_code, 304)
+                self.assertEqual(revalidated['ETag'], response['ETag'])
+
+    def test_listing_etag_follows_the_last_pet_change(self):
+        etag = self.client.get('/api/pets/')['ETag']
+        # A change that leaves the listing's newest updated_at and count alone.
+        cache.set(LISTING_CHANGED_AT_KEY, int(timezone.now().timestamp()) + 60, None)
+        response = self.client.get('/api/pets/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_listing_revalidates_without_querying_pets(self):
+        etag = self.client.get('/api/pets/', {'pet_type': 'dog'})['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/pets/', {'pet_type': 'dog'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse([q for q in queries if 'pets_pet' in q['sql']])
+        # Other filters are other listings.
+        self.assertNotEqual(self.client.get('/api/pets/', {'pet_type': 'cat'})['ETag'], etag)
+
+    def test_listing_etag_changes_when_a_pet_is_saved(self):
+        etag = self.client.get('/api/pets/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rex.status = 'adopted'
+            self.rex.save()
+        response = self.client.get('/api/pets/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_detail_etag_changes_when_the_pet_is_saved(self):
+        etag = self.client.get(f'/api/pets/{self.rex.pk}/')['ETag']
+        self.rex.description = 'Loves long walks.'
+        self.rex.save()
+        response = self.client.get(f'/api/pets/{self.rex.pk}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+@override_settings(PET_DEFERRED_WORK_INLINE=True)
+class FullTextSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.biscuit = Pet.objects.create(name='Biscuit', pet_type='dog', age=2, gender='male')
+        cls.rex = Pet.objects.create(
+            name='Rex', pet_type='dog', age=3, gender='male', description='Will do anything for a biscuit.'
+        )
+        cls.tom = Pet.objects.create(name='Tom', pet_type='cat', age=4, gender='male', breed='Biscuit Tabby')
+
+    def names(self, query):
+        return [pet['name'] for pet in self.client.get('/api/pets/', {'search': query}).json()['results']]
+
+    def test_name_hits_outrank_breed_hits_outrank_description_hits(self):
+        self.assertEqual(self.names('biscuit'), ['Biscuit', 'Tom', 'Rex'])
+
+    def test_prefixes_match_and_every_token_is_required(self):
+        self.assertEqual(self.names('bisc'), ['Biscuit', 'Tom', 'Rex'])
+        self.assertEqual(self.names('biscuit tabby'), ['Tom'])
+        self.assertEqual(self.names('biscuit poodle'), [])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.rex.description = 'Quiet and gentle.'
+        self.rex.save()
+        self.assertEqual(self.names('biscuit'), ['Biscuit', 'Tom'])
+        self.assertEqual(self.names('gentle'), ['Rex'])
+        self.tom.delete()
+        self.assertEqual(self.names('tabby'), [])
+
+    def test_rebuild_indexes_every_pet(self):
+        self.assertEqual(get_search_backend().rebuild(batch_size=2), 3)
+        self.assertEqual(self.names('biscuit'), ['Biscuit', 'Tom', 'Rex'])
+
+    def test_index_writes_go_through_the_routed_connection(self):
+        with mock.patch('pets.search.router') as router:
+            router.db_for_write.return_value = 'default'
+            self.rex.save()
+            self.tom.delete()
+        self.assertEqual(router.db_for_write.call_count, 2)
+        self.assertEqual({call.args[0] for call in router.db_for_write.call_args_list}, {Pet})
+
+    def test_backends_must_implement_filter(self):
+        class IndexOnlyBackend(BaseSearchBackend):
+            pass
+
+        with self.assertRaises(TypeError):
+            IndexOnlyBackend()
+
+
+@override_settings(PET_DEFERRED_WORK_INLINE=True)
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(10):
+            Pet.objects.create(name=f'Pet {i}', pet_type='dog', age=i % 3, gender='male')
+
+    def walk(self, url):
+        seen, pages = [], 0
+        while url:
+            data = self.client.get(url).json()
+            seen.extend(pet['id'] for pet in data['results'])
+            url, pages = data['next'], pages + 1
+        return seen, pages
+
+    def test_ties_on_the_sort_key_are_broken_by_id(self):
+        for ordering in ['age', '-age', 'name', '-created_at']:
+            with self.subTest(ordering=ordering):
+                seen, pages = self.walk(f'/api/pets/?ordering={ordering}&page_size=3')
+                self.assertEqual(sorted(seen), sorted(Pet.objects.values_list('id', flat=True)))
+                self.assertEqual(len(seen), len(set(seen)))
+                self.assertEqual(pages, 4)
+
+        seen, _ = self.walk('/api/pets/?ordering=-age&page_size=3')
+        expected = Pet.objects.order_by('-age', '-id').values_list('id', flat=True)
+        self.assertEqual(seen, list(expected))
+
+    def test_inserts_do_not_shift_later_pages(self):
+        first = self.client.get('/api/pets/?ordering=-created_at&page_size=5').json()
+        Pet.objects.create(name='Newcomer', pet_type='cat', age=1, gender='female')
+        second = self.client.get(first['next']).json()
+        ids = [pet['id'] for pet in first['results'] + second['results']]
+        self.assertEqual(len(set(ids)), 10)
+
+    def test_search_results_page_by_offset(self):
+        seen, pages = self.walk('/api/pets/?search=pet&page_size=4')
+        self.assertEqual((len(set(seen)), pages), (10, 3))
+
+    def test_foreign_or_garbled_cursors_are_rejected(self):
+        next_url = self.client.get('/api/pets/?ordering=age&page_size=3').json()['next']
+        cursor = next_url.split('cursor=')[1].split('&')[0]
+        for query in [f'ordering=name&cursor={cursor}', 'cursor=not-a-cursor']:
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(f'/api/pets/?{query}').status_code, 404)
+
+
+@override_settings(PET_DEFERRED_WORK_INLINE=True)
+class PetStatisticsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def statistics(self):
+        return self.client.get('/api/pets/statistics/').json()
+
+    def test_counters_follow_creates_changes_and_deletes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            rex = Pet.objects.create(name='Rex', pet_type='dog', age=2, gender='male')
+            Pet.objects.create(name='Ivy', pet_type='cat', age=1, gender='female')
+        self.assertEqual(self.statistics()['available_pets'], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            rex.status = 'adopted'
+            rex.save()
+        data = self.statistics()
+        self.assertEqual((data['total_pets'], data['available_pets'], data['adopted_pets']), (2, 1, 1))
+        self.assertEqual((data['pet_types']['dog'], data['pet_types']['cat']), (1, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            rex.delete()
+        data = self.statistics()
+        self.assertEqual((data['total_pets'], data['adopted_pets'], data['pet_types']['dog']), (1, 0, 0))
+
+    def test_payload_is_served_from_cache_until_a_counter_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Pet.objects.create(name='Rex', pet_type='dog', age=2, gender='male')
+        self.statistics()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.statistics()['total_pets'], 1)
+
+    def test_reconcile_repairs_drifted_counters(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Pet.objects.create(name='Rex', pet_type='dog', age=2, gender='male')
+        PetCounter.objects.filter(status='available', pet_type='dog').update(count=7)
+        PetCounter.objects.create(status='pending', pet_type='bird', count=3)
+        self.assertEqual(reconcile_counters(), 2)
+        self.assertEqual(reconcile_counters(), 0)
+        data = self.statistics()
+        self.assertEqual((data['total_pets'], data['pending_pets']), (1, 0))
+
+
+@override_settings(PET_DEFERRED_WORK_INLINE=True)
+class PetResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rex = Pet.objects.create(name='Rex', pet_type='dog', age=2, gender='male')
+
+    def test_detail_is_cached_until_the_pet_changes(self):
+        url = f'/api/pets/{self.rex.pk}/'
+        self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rex.name = 'Rex II'
+            self.rex.save()
+        response = self.client.get(url)
+        self.assertEqual((response['X-Cache'], response.json()['name']), ('MISS', 'Rex II'))
+
+    def test_featured_is_cached_until_any_pet_changes(self):
+        self.assertEqual(self.client.get('/api/pets/featured/')['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get('/api/pets/featured/')['X-Cache'], 'HIT')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Pet.objects.create(name='Ivy', pet_type='cat', age=1, gender='female')
+        response = self.client.get('/api/pets/featured/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual([pet['name'] for pet in response.json()], ['Ivy', 'Rex'])
+
+    def test_rolled_back_changes_do_not_expire_entries(self):
+        url = f'/api/pets/{self.rex.pk}/'
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                self.rex.save()
+                raise RuntimeError
+        self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+
+
+@override_settings(PET_DEFERRED_WORK_INLINE=True)
+class FacetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for name, pet_type, gender, age, breed in [
+            ('Rex', 'dog', 'male', 1, 'Labrador'), ('Max', 'dog', 'male', 5, 'labrador '),
+            ('Bella', 'dog', 'female', 9, 'Poodle'), ('Ivy', 'cat', 'female', 2, ''),
+        ]:
+            Pet.objects.create(name=name, pet_type=pet_type, gender=gender, age=age, breed=breed)
+        Pet.objects.create(name='Gone', pet_type='dog', gender='male', age=3, status='adopted')
+
+    def setUp(self):
+        cache.clear()
+
+    def facets(self, **params):
+        return self.client.get('/api/pets/', {'facets': 'true', **params}).json()['facets']
+
+    def test_counts_cover_available_pets(self):
+        facets = self.facets()
+        self.assertEqual(facets['pet_type']['dog'], 3)
+        self.assertEqual(facets['gender'], {'male': 2, 'female': 2, 'unknown': 0})
+        self.assertEqual(facets['age'], {'0-1': 1, '2-3': 1, '4-7': 1, '8+': 1})
+        # Spellings of one breed are counted together.
+        breeds = [(item['name'], item['count']) for item in facets['breed']]
+        self.assertEqual(breeds, [('Labrador Retriever', 2), ('Poodle', 1)])
+
+    def test_each_facet_ignores_its_own_filter(self):
+        facets = self.facets(pet_type='dog', gender='female')
+        self.assertEqual(facets['pet_type']['dog'], 1)
+        self.assertEqual(facets['pet_type']['cat'], 1)
+        self.assertEqual(facets['gender'], {'male': 2, 'female': 1, 'unknown': 0})
+        self.assertEqual(facets['age']['8+'], 1)
+
+    def test_search_narrows_counts_and_changes_expire_them(self):
+        self.assertEqual(self.facets(search='labrador')['pet_type']['dog'], 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            Pet.objects.create(name='Duke', pet_type='dog', gender='male', age=4, breed='Labrador')
+        self.assertEqual(self.facets(search='labrador')['pet_type']['dog'], 3)
+
+    def test_facets_are_omitted_unless_asked_for(self):
+        self.assertNotIn('facets', self.client.get('/api/pets/').json())
+
+
+@override_settings(PET_DEFERRED_WORK_INLINE=True)
+class FastListSerializerTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        Pet.objects.create(name='Ivy', pet_type='cat', age=1, gender='female', breed='Siamese')
+        with self.captureOnCommitCallbacks(execute=True), override_settings(PET_DEFERRED_WORK_INLINE=True):
+            Pet.objects.create(name='Rex', pet_type='dog', age=2, gender='male', image=png(700, 350))
+        self.request = RequestFactory().get('/api/pets/')
+
+    def assertSameOutput(self, fields=None, request=None):
+        queryset = Pet.objects.prefetch_related('image_variants').order_by('id')
+        context = {'request': request, 'fields': fields}
+        expected = PetListSerializer(queryset, many=True, context=context).data
+        fast = PetListFastSerializer(PetListFastSerializer.values(queryset, fields), context=context).data
+        self.assertEqual(fast, [dict(item) for item in expected])
+
+    def test_output_matches_the_model_serializer(self):
+        for fields in [None, ['name', 'image_srcset'], ['gender_display', 'created_at']]:
+            with self.subTest(fields=fields):
+                self.assertSameOutput(fields, self.request)
+        # Without a request there are no absolute URLs to build.
+        self.assertSameOutput()
+
+    def test_variants_come_from_one_query(self):
+        queryset = PetListFastSerializer.values(Pet.objects.order_by('id'))
+        rows = list(queryset)
+        with self.assertNumQueries(1):
+            data = PetListFastSerializer(rows, context={'request': self.request}).data
+        self.assertEqual(sorted(data[1]['image_srcset']['jpeg']), ['320', '640'])
+        self.assertTrue(data[1]['image_url'].startswith('http://testserver/'))
+
+
+def zip_archive(**members):
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name, content in members.items():
+            archive.writestr(name, content)
+    return SimpleUploadedFile('images.zip', buffer.getvalue(), content_type='application/zip')
+
+
+@override_settings(PET_DEFERRED_WORK_INLINE=True)
+class BulkImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.shelter = User.objects.create_user('shelter', password='password')
+        cls.shelter.profile.is_shelter = True
+        cls.shelter.profile.save()
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        self.client.force_login(self.shelter)
+
+    def upload(self, name, content, **data):
+        data['file'] = SimpleUploadedFile(name, content)
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/api/pets/bulk-import/', data)
+
+    def test_imports_valid_rows_and_reports_invalid_ones(self):
+        content = (
+            'name,pet_type,age,gender,breed\n'
+            'Rex,dog,2,male,Labrador\n'
+            'X,dog,2,male,\n'
+            'Ivy,cat,40,female,\n'
+            'Tom,cat,3,male,\n'
+        ).encode('utf-8-sig')
+        response = self.upload('pets.csv', content)
+        self.assertEqual(response.status_code, 201)
+        report = response.json()
+        self.assertEqual((report['created'], report['failed']), (2, 2))
+        self.assertEqual([(error['row'], *error['errors']) for error in report['errors']], [(2, 'name'), (3, 'age')])
+
+        pets = Pet.objects.filter(owner=self.shelter)
+        self.assertEqual(sorted(pets.values_list('name', flat=True)), ['Rex', 'Tom'])
+        # Bulk inserts reach the derived data the signals maintain.
+        self.assertEqual(PetCatalogEntry.objects.filter(pk__in=pets.values('pk')).count(), 2)
+        self.assertEqual(self.client.get('/api/pets/', {'search': 'labrador'}).json()['results'][0]['name'], 'Rex')
+        self.assertEqual(self.client.get('/api/pets/statistics/').json()['total_pets'], 2)
+
+    def test_jsonl_with_images_from_the_archive(self):
+        photo = png(40, 20).read()
+        content = b'\n'.join([
+            b'{"name": "Rex", "pet_type": "dog", "age": 2, "gender": "male", "image": "photos/rex.png"}',
+            b'{"name": "Ivy", "pet_type": "cat", "age": 1, "gender": "female", "image": "missing.png"}',
+            b'[1, 2]',
+            b'not json',
+        ])
+        response = self.upload('pets.jsonl', content, images=zip_archive(**{'photos/rex.png': photo}))
+        report = response.json()
+        self.assertEqual((report['created'], report['failed']), (1, 3))
+        self.assertEqual([error['row'] for error in report['errors']], [2, 3, 4])
+        rex = Pet.objects.get(name='Rex')
+        with rex.image.open('rb') as stored:
+            self.assertEqual(stored.read(), photo)
+
+    def test_chunks_hold_stored_photo_names_not_bytes(self):
+        flush = PetImporter.flush
+        held = []
+
+        def record(importer, batch):
+            held.extend((pet.image.name, pet.image._committed) for pet in batch)
+            return flush(importer, batch)
+
+        content = b'name,pet_type,age,gender,image\nRex,dog,2,male,rex.png\n'
+        with mock.patch.object(PetImporter, 'flush', autospec=True, side_effect=record):
+            self.upload('pets.csv', content, images=zip_archive(**{'rex.png': png(40, 20).read()}))
+        self.assertEqual(held, [(Pet.objects.get(name='Rex').image.name, True)])
+
+    def test_corrupt_archives_are_reported(self):
+        # The member's bytes no longer match its CRC.
+        corrupt = zip_archive(**{'rex.png': png(40, 20).read()}).read().replace(b'PNG', b'PNX', 1)
+        content = b'name,pet_type,age,gender,image\nRex,dog,2,male,rex.png\n'
+        report = self.upload('pets.csv', content, images=SimpleUploadedFile('photos.zip', corrupt)).json()
+        self.assertEqual(report['errors'], [
+            {'row': 1, 'errors': {'image': ['Image "rex.png" is corrupt in the archive.']}},
+        ])
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        paths = {}
+        for name, data in [('pets.csv', content), ('photos.zip', b'not a zip')]:
+            paths[name] = os.path.join(directory, name)
+            with open(paths[name], 'wb') as file:
+                file.write(data)
+        with self.assertRaisesMessage(CommandError, 'is not a zip archive'):
+            call_command('import_pets', paths['pets.csv'], owner='shelter', images=paths['photos.zip'])
+
+    def test_dry_run_validates_without_inserting(self):
+        response = self.upload('pets.csv', b'name,pet_type,age,gender\nRex,dog,2,male\n', dry_run='true')
+        self.assertEqual((response.status_code, response.json()['created']), (200, 1))
+        self.assertFalse(Pet.objects.exists())
+
+    def test_images_are_typed_from_their_content(self):
+        content = (
+            'name,pet_type,age,gender,image\n'
+            'Rex,dog,2,male,rex.jpg\n'
+            'Ivy,cat,1,female,notes.png\n'
+        ).encode('utf-8')
+        images = zip_archive(**{'rex.jpg': png(40, 20).read(), 'notes.png': b'not an image'})
+        report = self.upload('pets.csv', content, images=images).json()
+        self.assertEqual(report['created'], 1)
+        self.assertEqual(report['errors'], [{'row': 2, 'errors': {'image': ['"notes.png" is not a valid image.']}}])
+
+    def test_non_utf8_files_are_a_format_error(self):
+        content = 'name,pet_type,age,gender\nRex,dog,2,male\nZoë,cat,1,female\n'.encode('latin-1')
+        response = self.upload('pets.csv', content)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'The file must be UTF-8 encoded.')
+
+    def test_rejects_unknown_formats_and_non_shelters(self):
+        self.assertEqual(self.upload('pets.xlsx', b'').status_code, 400)
+        self.client.force_login(User.objects.create_user('adopter', password='password'))
+        self.assertEqual(self.upload('pets.csv', b'name\n').status_code, 403)
+
+
+@override_settings(PET_DEFERRED_WORK_INLINE=True)
+class ShelterExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.shelter = User.objects.create_user('shelter', password='password')
+        cls.shelter.profile.is_shelter = True
+        cls.shelter.profile.save()
+        cls.adopter = User.objects.create_user('adopter', password='password', email='a@example.com')
+        cls.pets = [
+            Pet.objects.create(name=f'Pet {i}', pet_type='dog', age=i, gender='male', owner=cls.shelter)
+            for i in range(5)
+        ]
+        Pet.objects.create(name='Elsewhere', pet_type='cat', age=1, gender='female', owner=cls.adopter)
+
+    def setUp(self):
+        self.client.force_login(self.shelter)
+
+    def export(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode('utf-8'), response
+
+    def test_ndjson_streams_the_shelters_pets_in_id_order(self):
+        body, response = self.export('/api/pets/shelter/export/')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertIn('attachment; filename="shelter-pets-', response['Content-Disposition'])
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([row['id'] for row in rows], [pet.pk for pet in self.pets])
+        self.assertEqual(list(rows[0]), list(PET_EXPORT_FIELDS))
+
+    def test_csv_has_a_header_and_one_line_per_pet(self):
+        body, response = self.export('/api/pets/shelter/export/', export_format='csv')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.reader(body.splitlines()))
+        self.assertEqual(rows[0], list(PET_EXPORT_FIELDS))
+        self.assertEqual([row[1] for row in rows[1:]], [pet.name for pet in self.pets])
+
+    def test_rows_are_read_in_seek_chunks(self):
+        queryset = Pet.objects.filter(owner=self.shelter)
+        with CaptureQueriesContext(connection) as queries:
+            rows = list(iter_values(queryset, ['id', 'name'], chunk_size=2))
+        self.assertEqual([row['id'] for row in rows], [pet.pk for pet in self.pets])
+        self.assertEqual(len(queries), 3)
+        self.assertTrue(all('OFFSET' not in query['sql'] for query in queries))
+
+    def test_adoption_requests_include_archived_ones(self):
+        live = AdoptionRequest.objects.create(user=self.adopter, pet=self.pets[0], reason='Yard')
+        adopted = self.pets[1]
+        old = AdoptionRequest.objects.create(user=self.adopter, pet=adopted, reason='Love', status='approved')
+        adopted.status = 'adopted'
+        adopted.save()
+        Pet.objects.filter(pk=adopted.pk).update(updated_at=timezone.now() - timedelta(days=365))
+        self.assertEqual(archive_adopted_pets(), 1)
+
+        body, _ = self.export('/api/pets/shelter/adoptions/export/')
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([(row['id'], row['user__email']) for row in rows], [
+            (live.pk, 'a@example.com'), (old.pk, 'a@example.com'),
+        ])
+
+    def test_rejects_unknown_formats_and_non_shelters(self):
+        response = self.client.get('/api/pets/shelter/export/', {'export_format': 'xml'})
+        self.assertEqual(response.status_code, 400)
+        self.client.force_login(self.adopter)
+        self.assertEqual(self.client.get('/api/pets/shelter/adoptions/export/').status_code, 403)
+
+
+@override_settings(PET_DEFERRED_WORK_INLINE=True)
+class ProximitySearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for username, zip_code in [('manhattan', '10001'), ('brooklyn', '11201'), ('hollywood', '90210')]:
+            shelter = User.objects.create_user(username, password='password')
+            shelter.profile.is_shelter = True
+            shelter.profile.zip_code = zip_code
+            shelter.profile.save()
+            Pet.objects.create(name=f'{username} dog', pet_type='dog', age=2, gender='male', owner=shelter)
+            Pet.objects.create(
+                name=f'{username} cat', pet_type='cat', age=2, gender='female', owner=shelter, status='pending'
+            )
+
+    def search(self, **criteria):
+        response = self.client.post('/api/pets/search/', criteria, content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.content)
+        return [(pet['name'], pet.get('distance_km')) for pet in response.json()['results']]
+
+    def test_nearest_first_within_the_radius(self):
+        # 10002 is about 2.4 km from 11201 and 3.8 km from 10001.
+        for status in ['available', None]:
+            with self.subTest(status=status):
+                criteria = {'near_zip': '10002', 'radius_km': 10, 'pet_type': 'dog'}
+                if status:
+                    criteria['status'] = status
+                results = self.search(**criteria)
+                self.assertEqual(results, [('brooklyn dog', 2.4), ('manhattan dog', 3.8)])
+
+    def test_radius_excludes_far_shelters(self):
+        self.assertEqual(self.search(near_zip='10002', radius_km=3, status='available'), [('brooklyn dog', 2.4)])
+        self.assertEqual(self.search(near_zip='90210', radius_km=1, status='available'), [('hollywood dog', 0.0)])
+
+    def test_moving_a_shelter_moves_its_pets(self):
+        profile = User.objects.get(username='hollywood').profile
+        profile.zip_code = '07030'
+        profile.save()
+        names = [name for name, _ in self.search(near_zip='10002', radius_km=10, status='available')]
+        self.assertEqual(names, ['brooklyn dog', 'manhattan dog', 'hollywood dog'])
+
+    def test_distance_can_be_requested_as_a_sparse_field(self):
+        for status in ['available', None]:
+            for fast in [True, False]:
+                with self.subTest(status=status, fast=fast), self.settings(PET_LIST_FAST_SERIALIZER=fast):
+                    criteria = {'near_zip': '10002', 'radius_km': 3, 'pet_type': 'dog'}
+                    if status:
+                        criteria['status'] = status
+                    response = self.client.post(
+                        '/api/pets/search/?fields=name,distance_km', criteria, content_type='application/json'
+                    )
+                    self.assertEqual(response.status_code, 200, response.content)
+                    self.assertEqual(response.json()['results'], [{'name': 'brooklyn dog', 'distance_km': 2.4}])
+                    response = self.client.post(
+                        '/api/pets/search/?fields=distance_km', criteria, content_type='application/json'
+                    )
+                    self.assertEqual(response.json()['results'], [{'distance_km': 2.4}])
+
+    def test_unknown_zip_codes_are_rejected(self):
+        response = self.client.post('/api/pets/search/', {'near_zip': '00000'}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('near_zip', response.json())
+
+
+@override_settings(PET_DEFERRED_WORK_INLINE=True)
+class SimilarPetsTests(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rex = Pet.objects.create(name='Rex', pet_type='dog', breed='Labrador', age=2, gender='male')
+            self.max = Pet.objects.create(name='Max', pet_type='dog', breed='Labrador', age=3, gender='male')
+            self.bella = Pet.objects.create(name='Bella', pet_type='dog', breed='Poodle', age=9, gender='female')
+            self.ivy = Pet.objects.create(name='Ivy', pet_type='cat', breed='Persian', age=2, gender='female')
+            self.gone = Pet.objects.create(
+                name='Gone', pet_type='dog', breed='Labrador', age=2, gender='male', status='adopted'
+            )
+
+    def similar(self, pet):
+        return [item['name'] for item in self.client.get(f'/api/pets/{pet.pk}/similar/').json()]
+
+    def lists(self):
+        return sorted(PetNeighbor.objects.values_list('pet_id', 'neighbor_id', 'rank'))
+
+    def test_suggestions_are_ranked_and_only_adoptable(self):
+        self.assertEqual(self.similar(self.rex), ['Max', 'Bella', 'Ivy'])
+        response = self.client.get(f'/api/pets/{self.gone.pk}/similar/').json()
+        self.assertEqual([item['name'] for item in response], ['Max', 'Rex', 'Bella', 'Ivy'])
+        scores = [item['similarity'] for item in response]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        self.assertEqual(self.client.get('/api/pets/999999/similar/').status_code, 404)
+
+    def test_saves_and_deletes_keep_lists_equal_to_a_rebuild(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ivy.pet_type, self.ivy.breed, self.ivy.gender = 'dog', 'Labrador', 'male'
+            self.ivy.save()
+        self.assertEqual(self.similar(self.rex)[0], 'Ivy')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.max.status = 'adopted'
+            self.max.save()
+            self.bella.delete()
+        self.assertEqual(self.similar(self.rex), ['Ivy'])
+
+        incremental = self.lists()
+        rebuild_similarity()
+        self.assertEqual(self.lists(), incremental)
+
+
+@override_settings(PET_DEFERRED_WORK_INLINE=True)
+class RecommendationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.adopter = User.objects.create_user('adopter', password='password')
+        cls.newcomer = User.objects.create_user('newcomer', password='password')
+        cls.pets = {
+            name: Pet.objects.create(name=name, pet_type=pet_type, breed=breed, age=age, gender=gender)
+            for name, pet_type, breed, age, gender in [
+                ('Rex', 'dog', 'Labrador', 2, 'male'), ('Max', 'dog', 'Labrador', 3, 'male'),
+                ('Duke', 'dog', 'Poodle', 9, 'female'), ('Ivy', 'cat', 'Persian', 2, 'female'),
+                ('Tom', 'cat', 'Persian', 10, 'male'),
+            ]
+        }
+        AdoptionRequest.objects.create(user=cls.adopter, pet=cls.pets['Rex'], reason='Yard')
+
+    def recommended(self, user):
+        self.client.force_login(user)
+        data = self.client.get('/api/pets/recommended/').json()
+        return data['personalized'], [pet['name'] for pet in data['results']]
+
+    def test_history_ranks_similar_pets_first_and_skips_applied_ones(self):
+        self.assertEqual(build_recommendations(workers=1), 1)
+        personalized, names = self.recommended(self.adopter)
+        self.assertTrue(personalized)
+        self.assertEqual(names[:2], ['Max', 'Duke'])
+        self.assertNotIn('Rex', names)
+
+        # Pets adopted since the build are dropped when the list is served.
+        Pet.objects.filter(pk=self.pets['Max'].pk).update(status='adopted')
+        self.assertEqual(self.recommended(self.adopter)[1][0], 'Duke')
+
+    def test_history_whose_pets_are_all_gone_gets_the_newest_pets(self):
+        build_recommendations(workers=1)
+        recommended = PetRecommendation.objects.get(user=self.adopter).pet_ids
+        Pet.objects.filter(pk__in=recommended).update(status='adopted')
+        self.assertEqual(self.recommended(self.adopter), (False, ['Rex']))
+
+    def test_worker_processes_store_the_same_lists(self):
+        build_recommendations(workers=1)
+        expected = dict(PetRecommendation.objects.values_list('user_id', 'pet_ids'))
+        PetRecommendation.objects.all().delete()
+        build_recommendations(workers=2, chunk_size=1)
+        self.assertEqual(dict(PetRecommendation.objects.values_list('user_id', 'pet_ids')), expected)
+
+    def test_users_without_history_get_the_newest_pets(self):
+        build_recommendations(workers=1)
+        self.assertEqual(self.recommended(self.newcomer), (False, ['Tom', 'Ivy', 'Duke', 'Max', 'Rex']))
+
+        AdoptionRequest.objects.filter(user=self.adopter).delete()
+        self.assertEqual(build_recommendations(workers=1), 0)
+        self.assertFalse(PetRecommendation.objects.exists())
+
+
+@override_settings(PET_DEFERRED_WORK_INLINE=True)
+class SavedSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('searcher', password='password')
+        shelter = User.objects.create_user('shelter', password='password')
+        shelter.profile.is_shelter = True
+        shelter.profile.zip_code = '10001'
+        shelter.profile.save()
+        cls.shelter = shelter
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def save_search(self, **criteria):
+        response = self.client.post(
+            '/api/pets/saved-searches/', {'name': 'mine', 'criteria': criteria}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()['id']
+
+    def list_pet(self, **fields):
+        fields = {'pet_type': 'dog', 'gender': 'male', 'age': 2, 'owner': self.shelter, **fields}
+        with self.captureOnCommitCallbacks(execute=True):
+            return Pet.objects.create(**fields)
+
+    def feed(self):
+        results = self.client.get('/api/pets/saved-searches/feed/').json()['results']
+        return [(item['search'], item['pet']['name']) for item in results]
+
+    def test_new_pets_reach_the_feeds_of_matching_searches(self):
+        dogs = self.save_search(pet_type='dog', max_age=3)
+        near = self.save_search(near_zip='10002', radius_km=5, search='labrador')
+        self.list_pet(name='Rex', breed='Labrador')
+        self.list_pet(name='Old', age=9)
+        self.list_pet(name='Ivy', pet_type='cat', breed='Labrador mix', gender='female')
+        self.assertEqual(sorted(self.feed()), [(dogs, 'Rex'), (near, 'Ivy'), (near, 'Rex')])
+
+    def test_pets_becoming_available_are_matched_once(self):
+        search = self.save_search(pet_type='dog')
+        pet = self.list_pet(name='Rex', status='pending')
+        self.assertEqual(self.feed(), [])
+        for status in ['available', 'pending', 'available']:
+            with self.captureOnCommitCallbacks(execute=True):
+                pet.status = status
+                pet.save()
+        self.assertEqual(self.feed(), [(search, 'Rex')])
+
+    def test_editing_criteria_reindexes_the_search(self):
+        search = self.save_search(pet_type='cat')
+        response = self.client.patch(
+            f'/api/pets/saved-searches/{search}/', {'criteria': {'pet_type': 'dog'}}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.list_pet(name='Rex')
+        self.assertEqual(self.feed(), [(search, 'Rex')])
+
+    @override_settings(PET_DEFERRED_WORK_INLINE=False)
+    def test_matching_runs_off_the_request_thread(self):
+        self.save_search(pet_type='dog')
+        pet = self.list_pet(name='Rex')
+        self.assertEqual(self.feed(), [])
+        self.assertEqual(process_work(['saved_searches']), {'saved_searches': 1})
+        self.assertEqual([name for _, name in self.feed()], [pet.name])
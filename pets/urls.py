@@ -8,15 +8,28 @@ urlpatterns = [
     path('', views.PetListView.as_view(), name='pet-list'),
     path('featured/', views.featured_pets, name='featured-pets'),
     path('statistics/', views.pet_statistics, name='pet-statistics'),
+    path('cache-stats/', views.cache_statistics, name='pet-cache-statistics'),
     path('search/', views.search_pets, name='search-pets'),
+    path('autocomplete/', views.autocomplete_pets, name='pet-autocomplete'),
+    path('changes/', views.pet_changes, name='pet-changes'),
+    path('batch/', views.pets_batch, name='pet-batch'),
+    path('recommended/', views.recommended_pets, name='recommended-pets'),
+    path('saved-searches/', views.SavedSearchListView.as_view(), name='saved-search-list'),
+    path('saved-searches/feed/', views.SavedSearchFeedView.as_view(), name='saved-search-feed'),
+    path('saved-searches/<int:pk>/', views.SavedSearchDetailView.as_view(), name='saved-search-detail'),
     path('<int:pk>/', views.PetDetailView.as_view(), name='pet-detail'),
+    path('<int:pk>/similar/', views.similar_pets, name='similar-pets'),
     
     # Admin endpoints
     path('create/', views.PetCreateView.as_view(), name='pet-create'),
+    path('bulk-import/', views.PetBulkImportView.as_view(), name='pet-bulk-import'),
     path('<int:pk>/update/', views.PetUpdateView.as_view(), name='pet-update'),
     path('<int:pk>/delete/', views.PetDeleteView.as_view(), name='pet-delete'),
     
     # Shelter endpoints
     path('shelter/', views.shelter_pets, name='shelter-pets'),
+    path('shelter/inventory/', views.ShelterInventoryView.as_view(), name='shelter-inventory'),
     path('shelter/adoptions/', views.shelter_adoption_requests, name='shelter-adoption-requests'),
+    path('shelter/export/', views.shelter_pets_export, name='shelter-pets-export'),
+    path('shelter/adoptions/export/', views.shelter_adoption_requests_export, name='shelter-adoption-requests-export'),
 ] 
\ No newline at end of file
@@ -1,20 +1,87 @@
+import zipfile
+
 from rest_framework import generics, permissions, filters, status
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.parsers import MultiPartParser
+from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q
-from .models import Pet
+from django.conf import settings
+from django.db.models import Count
+from django.shortcuts import get_object_or_404
+from core.geo import distance_km, within_radius, zip_centroid
+from core.sparse import SparseFieldsViewMixin, readable_fields, requested_fields, sparse_queryset
+from .archive import with_archived
+from .autocomplete import DEFAULT_LIMIT, KINDS, MAX_LIMIT, suggest
+from .cache import (
+    featured_pets_key, get_cache_stats, get_listing_generation, get_or_build, get_or_build_many,
+    pet_detail_key, pet_detail_keys
+)
+from .catalog import catalog_enabled
+from .changes import (
+    DEFAULT_LIMIT as CHANGES_LIMIT, MAX_LIMIT as CHANGES_MAX_LIMIT, CursorExpired, changes_since, latest_cursor
+)
+from .conditional import (
+    listing_validators, not_modified, pet_validators, rows_validators, set_validators
+)
+from .exports import ADOPTION_EXPORT_FIELDS, EXPORT_FORMATS, PET_EXPORT_FIELDS, streaming_export
+from .facets import get_facets, wants_facets
+from .models import Pet, PetCatalogEntry, PetNeighbor, SavedSearch, SavedSearchMatch
+from .pagination import PetKeysetPagination
+from .recommendations import TOP_N, recommended_pet_ids
+from .search import PetSearchFilter, pets_near, search_pets_queryset
+from .statistics import get_statistics
 from .serializers import (
     PetSerializer, PetCreateSerializer, PetUpdateSerializer, 
-    PetListSerializer, PetSearchSerializer
+    PetListSerializer, PetListFastSerializer, PetCatalogSerializer, PetSearchSerializer,
+    SavedSearchMatchSerializer, SavedSearchSerializer
 )
 
+
+def list_fields(request, catalog=False, extra=()):
+    """The list fields named by ``?fields=`` (see core.sparse), or None for all of them"""
+    serializer = PetCatalogSerializer if catalog else PetListFastSerializer
+    return requested_fields(request, [*serializer.field_columns, *extra])
+
+
+def list_serializer(rows, request, catalog=False, fields=None):
+    """Serializer for a page of pets; ``rows`` come from list_rows() with the same ``fields``"""
+    context = {'request': request, 'fields': fields}
+    if catalog:
+        return PetCatalogSerializer(rows, context=context)
+    if settings.PET_LIST_FAST_SERIALIZER:
+        return PetListFastSerializer(rows, context=context)
+    return PetListSerializer(rows, many=True, context=context)
+
+
+def list_rows(queryset, fields=None):
+    """Prepare a Pet or PetCatalogEntry queryset for list_serializer(), selecting only what ``fields`` need"""
+    if queryset.model is PetCatalogEntry:
+        return PetCatalogSerializer.values(queryset, fields)
+    if settings.PET_LIST_FAST_SERIALIZER:
+        return PetListFastSerializer.values(queryset, fields)
+    return sparse_queryset(queryset, PetListSerializer, fields)
+
+
+def filter_breed(queryset, breed_id):
+    """Equality filter on the resolved breed of a Pet or PetCatalogEntry queryset"""
+    field = 'breed_id' if queryset.model is PetCatalogEntry else 'breed_ref_id'
+    return queryset.filter(**{field: breed_id})
+
+
+def available_pets():
+    """Every listed pet: catalog entries when the read model is enabled"""
+    if catalog_enabled():
+        return PetCatalogEntry.objects.all()
+    return Pet.objects.filter(status='available').prefetch_related('image_variants')
+
 class PetListView(generics.ListAPIView):
     """List all pets with search and filtering"""
     queryset = Pet.objects.all()
     serializer_class = PetListSerializer
     permission_classes = [permissions.AllowAny]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    pagination_class = PetKeysetPagination
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, PetSearchFilter]
     filterset_fields = ['pet_type', 'gender', 'status']
     search_fields = ['name', 'breed', 'description']
     ordering_fields = ['name', 'age', 'created_at']
@@ -22,7 +89,7 @@ class PetListView(generics.ListAPIView):
 
     def get_queryset(self):
         # Only show available pets by default
-        queryset = Pet.objects.filter(status='available')
+        queryset = available_pets()
         
         # Custom filtering
         min_age = self.request.query_params.get('min_age')
@@ -32,15 +99,93 @@ class PetListView(generics.ListAPIView):
             queryset = queryset.filter(age__gte=min_age)
         if max_age:
             queryset = queryset.filter(age__lte=max_age)
+
+        breed_id = self.request.query_params.get('breed_id')
+        if breed_id and breed_id.isdigit():
+            queryset = filter_breed(queryset, breed_id)
             
         return queryset
 
-class PetDetailView(generics.RetrieveAPIView):
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        catalog = queryset.model is PetCatalogEntry
+        fields = list_fields(request, catalog)
+        include_facets = wants_facets(request.query_params.get('facets'))
+        etag, last_modified = listing_validators(request)
+        cached = not_modified(request, etag, last_modified)
+        if cached is not None:
+            return set_validators(cached, etag, last_modified)
+
+        page = self.paginate_queryset(list_rows(queryset, fields))
+        serializer = list_serializer(page, request, catalog=catalog, fields=fields)
+        response = self.get_paginated_response(serializer.data)
+        if include_facets:
+            response.data['facets'] = get_facets(
+                request.query_params,
+                search=request.query_params.get('search'),
+                available_only=True,
+            )
+        return set_validators(response, etag, last_modified)
+
+class PetDetailView(SparseFieldsViewMixin, generics.RetrieveAPIView):
     """Get detailed information about a specific pet"""
-    queryset = Pet.objects.all()
+    queryset = Pet.objects.select_related('owner').prefetch_related('image_variants')
     serializer_class = PetSerializer
     permission_classes = [permissions.AllowAny]
 
+    def retrieve(self, request, *args, **kwargs):
+        pk = kwargs[self.lookup_field]
+        fields = self.get_sparse_fields()
+        etag, last_modified = pet_validators(pk)
+        cached = not_modified(request, etag, last_modified)
+        if cached is not None:
+            return set_validators(cached, etag, last_modified)
+
+        data, hit = get_or_build(
+            'detail', pet_detail_key(request, pk, fields),
+            lambda: dict(self.get_serializer(self.get_object()).data)
+        )
+        response = Response(data)
+        response['X-Cache'] = 'HIT' if hit else 'MISS'
+        return set_validators(response, etag, last_modified)
+
+BATCH_MAX_IDS = 200
+
+
+@api_view(['GET', 'POST'])
+@permission_classes([permissions.AllowAny])
+def pets_batch(request):
+    """Several pets by id (``?ids=1,2,3`` or ``{"ids": [...]}``), sharing the pet detail cache"""
+    source = request.data if request.method == 'POST' else request.query_params
+    raw = source.get('ids', '') if hasattr(source, 'get') else None
+    if isinstance(raw, str):
+        raw = [part for part in raw.split(',') if part.strip()]
+    try:
+        # Duplicates are dropped; the first occurrence keeps its place.
+        ids = list(dict.fromkeys(int(pk) for pk in raw))
+    except (TypeError, ValueError):
+        ids = []
+    if not ids or len(ids) > BATCH_MAX_IDS or min(ids) < 1:
+        return Response(
+            {'error': f'ids must list 1 to {BATCH_MAX_IDS} positive integer pet ids'},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    fields = requested_fields(request, readable_fields(PetSerializer))
+
+    def build(missing):
+        queryset = sparse_queryset(
+            Pet.objects.select_related('owner').prefetch_related('image_variants'), PetSerializer, fields
+        )
+        context = {'request': request, 'fields': fields}
+        return {pk: dict(PetSerializer(pet, context=context).data) for pk, pet in queryset.in_bulk(missing).items()}
+
+    # Entries are the ones PetDetailView caches, so either endpoint warms the other.
+    pets = get_or_build_many('detail', pet_detail_keys(request, ids, fields), build)
+    return Response({
+        'results': [pets[pk] for pk in ids if pk in pets],
+        'missing': [pk for pk in ids if pk not in pets],
+    })
+
 class PetCreateView(generics.CreateAPIView):
     """Create a new pet (shelter admin only)"""
     queryset = Pet.objects.all()
@@ -53,6 +198,45 @@ class PetCreateView(generics.CreateAPIView):
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
 
+class PetBulkImportView(APIView):
+    """Import many pets at once from a CSV/JSONL file and an optional zip of images (shelter only)"""
+    parser_classes = [MultiPartParser]
+
+    def get_permissions(self):
+        from core.permissions import IsShelterAdmin
+        return [IsShelterAdmin()]
+
+    def post(self, request):
+        from .bulk_import import ImportFormatError, PetImporter, detect_format
+
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({
+                'error': 'A CSV or JSONL file is required in the "file" field.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            fmt = detect_format(upload.name, request.data.get('format'))
+            importer = PetImporter(
+                owner=request.user,
+                images=request.FILES.get('images'),
+                dry_run=str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes'),
+            )
+        except ImportFormatError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        except zipfile.BadZipFile:
+            return Response({
+                'error': 'The "images" upload must be a zip archive.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            report = importer.run(upload.file, fmt)
+        except ImportFormatError as exc:
+            # Chunks inserted before the bad bytes stay; the report says how many.
+            return Response({'error': str(exc), **importer.report()}, status=status.HTTP_400_BAD_REQUEST)
+        response_status = status.HTTP_201_CREATED if report['created'] and not report['dry_run'] else status.HTTP_200_OK
+        return Response(report, status=response_status)
+
 class PetUpdateView(generics.UpdateAPIView):
     """Update pet information (owner only)"""
     queryset = Pet.objects.all()
@@ -79,31 +263,111 @@ class PetDeleteView(generics.DestroyAPIView):
 @permission_classes([permissions.AllowAny])
 def featured_pets(request):
     """Get featured pets for homepage"""
-    featured = Pet.objects.filter(status='available').order_by('-created_at')[:6]
-    serializer = PetListSerializer(featured, many=True, context={'request': request})
-    return Response(serializer.data)
+    featured = available_pets().order_by('-created_at')[:6]
+    etag, last_modified = rows_validators(featured.values_list('id', 'updated_at'))
+    cached = not_modified(request, etag, last_modified)
+    if cached is not None:
+        return set_validators(cached, etag, last_modified)
+
+    def build():
+        catalog = featured.model is PetCatalogEntry
+        return list(list_serializer(list_rows(featured), request, catalog=catalog).data)
+
+    data, hit = get_or_build('featured', featured_pets_key(request), build)
+    response = Response(data)
+    response['X-Cache'] = 'HIT' if hit else 'MISS'
+    return set_validators(response, etag, last_modified)
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def similar_pets(request, pk):
+    """Precomputed "you might also like" suggestions for a pet"""
+    get_object_or_404(Pet.objects.only('id'), pk=pk)
+    scores = dict(PetNeighbor.objects.filter(pet_id=pk).values_list('neighbor_id', 'score'))
+    neighbors = Pet.objects.filter(pk__in=scores, status='available').prefetch_related('image_variants')
+    data = list(list_serializer(list_rows(neighbors), request).data)
+    for item in data:
+        item['similarity'] = round(scores[item['id']], 4)
+    data.sort(key=lambda item: -item['similarity'])
+    return Response(data)
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def recommended_pets(request):
+    """Pets picked for the user from their adoption-request history"""
+    try:
+        limit = min(max(int(request.query_params.get('limit', 12)), 1), TOP_N)
+    except ValueError:
+        limit = 12
+    pet_ids = recommended_pet_ids(request.user, limit)
+    personalized = bool(pet_ids)
+    if personalized:
+        rank = {pet_id: i for i, pet_id in enumerate(pet_ids)}
+        pets = Pet.objects.filter(pk__in=pet_ids)
+    else:
+        # No history yet, or every recommended pet has been adopted since
+        # the last build: fall back to the newest arrivals.
+        pets = Pet.objects.filter(status='available').order_by('-created_at')[:limit]
+    data = list(list_serializer(list_rows(pets.prefetch_related('image_variants')), request).data)
+    if personalized:
+        data.sort(key=lambda item: rank[item['id']])
+    return Response({'personalized': personalized, 'results': data})
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def cache_statistics(request):
+    """Hit/miss counters for the pet response cache"""
+    return Response(get_cache_stats())
 
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
 def pet_statistics(request):
     """Get pet statistics for admin dashboard"""
-    total_pets = Pet.objects.count()
-    available_pets = Pet.objects.filter(status='available').count()
-    adopted_pets = Pet.objects.filter(status='adopted').count()
-    pending_pets = Pet.objects.filter(status='pending').count()
-    
-    # Pet type distribution
-    pet_types = {}
-    for pet_type, _ in Pet.PET_TYPES:
-        pet_types[pet_type] = Pet.objects.filter(pet_type=pet_type).count()
-    
-    return Response({
-        'total_pets': total_pets,
-        'available_pets': available_pets,
-        'adopted_pets': adopted_pets,
-        'pending_pets': pending_pets,
-        'pet_types': pet_types
-    })
+    return Response(get_statistics())
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def pet_changes(request):
+    """Pets created, updated, adopted or deleted since a change-feed cursor"""
+    try:
+        since = int(request.query_params.get('since', 0))
+        limit = min(max(int(request.query_params.get('limit', CHANGES_LIMIT)), 1), CHANGES_MAX_LIMIT)
+    except ValueError:
+        since = -1
+    if since < 0:
+        return Response({'error': 'since and limit must be non-negative integers'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        changes, cursor, has_more = changes_since(since, limit)
+    except CursorExpired:
+        return Response({
+            'error': 'This cursor has expired; reload the pets and sync from the returned cursor',
+            'cursor': latest_cursor(),
+        }, status=status.HTTP_410_GONE)
+
+    pet_ids = [pet_id for action, pet_id in changes if action != 'deleted']
+    pets = Pet.objects.filter(pk__in=pet_ids).prefetch_related('image_variants')
+    current = {item['id']: item for item in list_serializer(list_rows(pets), request).data}
+    results = []
+    for action, pet_id in changes:
+        pet = current.get(pet_id)
+        # Deleted pets, including any removed since changes_since() looked, become tombstones.
+        results.append({'id': pet_id, 'action': action if pet else 'deleted', 'pet': pet})
+    return Response({'cursor': cursor, 'has_more': has_more, 'changes': results})
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def autocomplete_pets(request):
+    """Name and breed suggestions for the search box, answered from memory"""
+    query = request.query_params.get('q', '')
+    try:
+        limit = min(max(int(request.query_params.get('limit', DEFAULT_LIMIT)), 1), MAX_LIMIT)
+    except ValueError:
+        limit = DEFAULT_LIMIT
+    kind = request.query_params.get('kind')
+    if kind not in KINDS:
+        kind = None
+    return Response({'query': query, 'results': suggest(query, limit, kind)})
 
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
@@ -112,16 +376,15 @@ def search_pets(request):
     serializer = PetSearchSerializer(data=request.data)
     serializer.is_valid(raise_exception=True)
     
-    queryset = Pet.objects.all()
+    # Searches over available pets only can be answered from the catalog.
+    status_filter = serializer.validated_data.get('status')
+    catalog = status_filter == 'available' and catalog_enabled()
+    queryset = PetCatalogEntry.objects.all() if catalog else Pet.objects.prefetch_related('image_variants')
     
-    # Search in name, breed, or description
+    # Full-text search in name, breed, or description
     search = serializer.validated_data.get('search')
     if search:
-        queryset = queryset.filter(
-            Q(name__icontains=search) |
-            Q(breed__icontains=search) |
-            Q(description__icontains=search)
-        )
+        queryset = search_pets_queryset(queryset, search)
     
     # Filter by pet type
     pet_type = serializer.validated_data.get('pet_type')
@@ -132,10 +395,14 @@ def search_pets(request):
     gender = serializer.validated_data.get('gender')
     if gender:
         queryset = queryset.filter(gender=gender)
+
+    # Filter by normalized breed
+    breed_id = serializer.validated_data.get('breed_id')
+    if breed_id:
+        queryset = filter_breed(queryset, breed_id)
     
     # Filter by status
-    status_filter = serializer.validated_data.get('status')
-    if status_filter:
+    if status_filter and not catalog:
         queryset = queryset.filter(status=status_filter)
     
     # Filter by age range
@@ -147,15 +414,75 @@ def search_pets(request):
     if max_age is not None:
         queryset = queryset.filter(age__lte=max_age)
     
+    # Proximity to the owning shelter's ZIP code
+    near = None
+    near_zip = serializer.validated_data.get('near_zip')
+    if near_zip:
+        near = (*zip_centroid(near_zip), serializer.validated_data['radius_km'])
+        # Catalog entries carry their shelter's location.
+        queryset = within_radius(queryset, '', *near) if catalog else pets_near(queryset, *near)
+    
     # Ordering
     ordering = serializer.validated_data.get('ordering')
     if ordering:
         queryset = queryset.order_by(ordering)
+    elif near:
+        queryset = queryset.order_by('distance', *(['search_rank'] if search else []), '-created_at')
+    elif search:
+        queryset = queryset.order_by('search_rank', '-created_at')
     else:
         queryset = queryset.order_by('-created_at')
     
-    serializer_result = PetListSerializer(queryset, many=True, context={'request': request})
-    return Response(serializer_result.data)
+    fields = list_fields(request, catalog, extra=['distance_km'] if near else [])
+    with_distance = near and (fields is None or 'distance_km' in fields)
+    if fields is not None:
+        # distance_km is added below, from the distance the query already selects.
+        fields = [name for name in fields if name != 'distance_km']
+    paginator = PetKeysetPagination()
+    page = paginator.paginate_queryset(list_rows(queryset, fields), request)
+    serializer_result = list_serializer(page, request, catalog=catalog, fields=fields)
+    results = serializer_result.data
+    if with_distance:
+        for item, row in zip(results, page):
+            distance = row['distance'] if isinstance(row, dict) else row.distance
+            item['distance_km'] = round(distance_km(distance), 1)
+    response = paginator.get_paginated_response(results)
+    if serializer.validated_data.get('facets'):
+        response.data['facets'] = get_facets(serializer.validated_data, search=search, near=near)
+    return response
+
+class SavedSearchListView(generics.ListCreateAPIView):
+    """List and create the user's saved searches"""
+    serializer_class = SavedSearchSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = None
+
+    def get_queryset(self):
+        return SavedSearch.objects.filter(user=self.request.user)
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+class SavedSearchDetailView(generics.RetrieveUpdateDestroyAPIView):
+    """Get, change or delete one of the user's saved searches"""
+    serializer_class = SavedSearchSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return SavedSearch.objects.filter(user=self.request.user)
+
+class SavedSearchFeedView(generics.ListAPIView):
+    """Newly available pets that match the user's saved searches, newest first"""
+    serializer_class = SavedSearchMatchSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = PetKeysetPagination
+
+    def get_queryset(self):
+        return (
+            SavedSearchMatch.objects.filter(user=self.request.user, pet__status='available')
+            .select_related('search', 'pet').prefetch_related('pet__image_variants')
+            .order_by('-created_at')
+        )
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
@@ -170,10 +497,38 @@ def shelter_pets(request):
         }, status=status.HTTP_403_FORBIDDEN)
     
     # Get pets owned by this shelter
-    pets = Pet.objects.filter(owner=request.user)
+    pets = Pet.objects.filter(owner=request.user).prefetch_related('image_variants')
     serializer = PetListSerializer(pets, many=True, context={'request': request})
     return Response(serializer.data)
 
+class ShelterInventoryView(generics.ListAPIView):
+    """Paginated, filterable list of every pet owned by the authenticated shelter"""
+    serializer_class = PetListSerializer
+    pagination_class = PetKeysetPagination
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['status', 'pet_type', 'gender']
+    ordering_fields = ['name', 'age', 'created_at']
+    ordering = ['-created_at']
+
+    def get_permissions(self):
+        from core.permissions import IsShelterAdmin
+        return [IsShelterAdmin()]
+
+    def get_queryset(self):
+        # Served by the (owner, created_at) and (owner, status, created_at) indexes.
+        return Pet.objects.filter(owner=self.request.user).prefetch_related('image_variants')
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(list_rows(queryset))
+        response = self.get_paginated_response(list_serializer(page, request).data)
+        status_counts = dict.fromkeys((value for value, _ in Pet.STATUS_CHOICES), 0)
+        status_counts.update(
+            self.get_queryset().order_by().values_list('status').annotate(count=Count('id'))
+        )
+        response.data['status_counts'] = status_counts
+        return response
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def shelter_adoption_requests(request):
@@ -187,9 +542,56 @@ def shelter_adoption_requests(request):
         }, status=status.HTTP_403_FORBIDDEN)
     
     # Get adoption requests for pets owned by this shelter
-    from adoption.models import AdoptionRequest
-    adoption_requests = AdoptionRequest.objects.filter(pet__owner=request.user)
+    from adoption.models import AdoptionRequest, ArchivedAdoptionRequest
+    adoption_requests = with_archived(
+        AdoptionRequest.objects.filter(pet__owner=request.user).select_related('user', 'pet'),
+        ArchivedAdoptionRequest.objects.filter(pet__owner=request.user).select_related('user', 'pet'),
+    )
     
     from adoption.serializers import AdoptionRequestSerializer
     serializer = AdoptionRequestSerializer(adoption_requests, many=True)
     return Response(serializer.data)
+
+def _export_format(request):
+    export_format = request.query_params.get('export_format', 'ndjson').lower()
+    return export_format if export_format in EXPORT_FORMATS else None
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def shelter_pets_export(request):
+    """Stream all pets owned by the authenticated shelter as NDJSON or CSV"""
+    if not hasattr(request.user, 'profile') or not request.user.profile.is_shelter:
+        return Response({
+            'error': 'Access denied. Only shelter accounts can view this endpoint.'
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    export_format = _export_format(request)
+    if export_format is None:
+        return Response({
+            'error': 'export_format must be "ndjson" or "csv".'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    pets = Pet.objects.filter(owner=request.user)
+    return streaming_export(pets, PET_EXPORT_FIELDS, export_format, 'shelter-pets')
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def shelter_adoption_requests_export(request):
+    """Stream adoption requests for the authenticated shelter's pets as NDJSON or CSV"""
+    if not hasattr(request.user, 'profile') or not request.user.profile.is_shelter:
+        return Response({
+            'error': 'Access denied. Only shelter accounts can view this endpoint.'
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    export_format = _export_format(request)
+    if export_format is None:
+        return Response({
+            'error': 'export_format must be "ndjson" or "csv".'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    from adoption.models import AdoptionRequest, ArchivedAdoptionRequest
+    adoption_requests = AdoptionRequest.objects.filter(pet__owner=request.user)
+    return streaming_export(
+        adoption_requests, ADOPTION_EXPORT_FIELDS, export_format, 'shelter-adoption-requests',
+        archived=ArchivedAdoptionRequest.objects.filter(pet__owner=request.user),
+    )